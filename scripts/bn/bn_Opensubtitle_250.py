@@ -15,32 +15,49 @@
 """
 
 import os
-import csv
-import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from xbench.bloom import cross_corpus_filter
+from xbench.checkpoint import Checkpoint
+from xbench.merge_engine import merge_filter
+from xbench.opus import iter_moses_rows
+from xbench.rule_stats import RuleStats, write_rule_report
+from xbench.sampler import draw_sample, draw_sample_from_tsv, write_sample
+from xbench.script_class import BENGALI, ScriptTable
 
 # === 路径按你的实际情况修改 ===
 BASE_DIR   = r"<PATH_TO_XBENCH_ROOT>/bn\Opensubtitle"  # 自己改
 INPUT_TSV  = os.path.join(BASE_DIR, "OpenSubtitles.bn-en.merged.tsv")
 OUTPUT_TSV = os.path.join(BASE_DIR, "OpenSubtitles.en-bn.sample250.tsv")
 
+# 直接从 Moses 原始文件抽样（FROM_MOSES = True）时用，不需要先跑合并脚本
+EN_FILE  = os.path.join(BASE_DIR, "OpenSubtitles.bn-en.en")
+BN_FILE  = os.path.join(BASE_DIR, "OpenSubtitles.bn-en.bn")
+ZIP_FILE = os.path.join(BASE_DIR, "bn-en.txt.zip")
+FROM_MOSES       = False  # True：跳过 *.merged.tsv，两侧文件直接流式送进过滤和抽样
+DEBUG_MERGED_TSV = None   # 调试用：给一个路径就顺带写出实际读过的 merged 行
+
 MAX_LINES   = 10000   # 只看前 10000 行（不含表头）
-SAMPLE_SIZE = 350     # 最多抽 200 句
+SAMPLE_SIZE = 250     # 抽 250 句（MERGE_FILTER 下抽中的句对合并时都保留，不用多抽）
+SAMPLE_MODE = "prefix"  # prefix：只看前 MAX_LINES 行；reservoir：整份语料蓄水池抽样（忽略 MAX_LINES；蓄水池 O(SAMPLE_SIZE)，但去重集合随不同句子数增长，大语料配 DEDUP = "digest64"）
+                        # offset：随机跳到字节偏移处取行，不扫描整个文件（只用于 merged.tsv，适合 GB 级大文件）
+                        # index：按行偏移索引（<merged.tsv>.idx，首次自动建好）均匀抽行号直接取行，重复抽样不再扫文件
+SEED        = 42      # 抽样随机种子，同一个种子结果可复现
+DEDUP       = "set"   # 去重集合：set（原来的做法）；digest64 / digest128：只存句子摘要，整份语料时省内存；exact：摘要 + 原文核对
+BLOOM_FILE  = None    # 跨语料去重：设成原始合并脚本登记过的 bn.bloom，也出现在本语言排在前面的语料里的句子直接拒绝（重复句只留一份）
+RULE_REPORT = True    # True：在输出旁边写 <输出>.rules.json，记下每条过滤规则通过 / 拒绝了多少行、各花了多少时间
+CHECKPOINT_SECONDS = 60      # prefix / reservoir：每隔多少秒把读取位置、候选和去重集合存到 <输出>.ckpt（None：不存）
+RESUME             = "--resume" in sys.argv  # 加 --resume 运行：进程中途被杀后从断点接着抽，结果和一次跑完相同
+MERGE_FILTER = True   # True：抽样时就按 bn_merge.py 的规则（两侧清洗后的句长 / 数字比例）过滤，抽中的句对合并时不会再被删
 MIN_TOKENS  = 8       # 词数 > 7 => 至少 8 个词
 MIN_BN_RATIO = 1   # 孟加拉文字符占全部字母的比例 > 80%
 
+# 字母分类表：孟加拉字母 vs 其它字母（见 xbench.script_class）
+BN_TABLE = ScriptTable({"bn": BENGALI})
 
-def bn_char_ratio(text: str) -> float:
-    """
-    计算文本中“孟加拉语字符”的比例（只统计字母，忽略空格和标点）。
-    粗略判断是不是孟加拉语句子。
-    孟加拉文 Unicode 范围：U+0980 ~ U+09FF
-    """
-    letters = [c for c in text if c.isalpha()]
-    if not letters:
-        return 0.0
-
-    bn_letters = [c for c in letters if '\u0980' <= c <= '\u09FF']
-    return len(bn_letters) / len(letters)
+# 每条过滤规则的通过 / 拒绝数和耗时（见 xbench.rule_stats）
+RULES = RuleStats()
 
 
 def process_line(row, candidates, seen_bn):
@@ -48,71 +65,75 @@ def process_line(row, candidates, seen_bn):
     处理单行：row = [id, en, bn]
     符合条件则加入 candidates。
     """
-    if len(row) < 3:
+    if not RULES.step("columns", len(row) >= 3):
         return
 
     orig_id, en, bn = row[0], row[1], row[2]
     bn = bn.strip()
-    if not bn:
+    if not RULES.step("empty", bool(bn)):
         return
 
     # 词数过滤
     tokens = bn.split()
-    if len(tokens) < MIN_TOKENS:
+    if not RULES.step("min_tokens", len(tokens) >= MIN_TOKENS):
         return
 
     # 去重（同一个 bn 句子只保留一次）
-    if bn in seen_bn:
+    if not RULES.step("dedup", bn not in seen_bn):
         return
 
     # 孟加拉语字符比例过滤
-    ratio = bn_char_ratio(bn)
-    if ratio < MIN_BN_RATIO:
+    if not RULES.step("script_ratio", BN_TABLE.at_least(bn, "bn", MIN_BN_RATIO)):
+        return
+
+    # 合并阶段的过滤（bn_merge.py 的阈值）
+    if MERGE_FILTER and not RULES.step("merge_filter", merge_filter("bn").accept_raw(en, bn)):
         return
 
     seen_bn.add(bn)
     candidates.append((orig_id, en, bn))
 
 
-def sample_from_merged(input_tsv: str, output_tsv: str):
-    candidates = []
-    seen_bn = set()
+def write_result(result, output_tsv: str):
+    """写出抽样结果并打印统计；result 为 None 表示输入为空。"""
+    if result is None:
+        print("输入文件为空。")
+        return
+    n_candidates, sampled = result
 
-    with open(input_tsv, "r", encoding="utf-8") as fin:
-        reader = csv.reader(fin, delimiter="\t")
+    # 写出结果
+    write_sample(output_tsv, ["id", "en", "bn"], sampled)
 
-        # 处理表头：如果第一列是 "id" 就跳过
-        first_row = next(reader, None)
-        if first_row is None:
-            print("输入文件为空。")
-            return
+    print(f"候选句子数量：{n_candidates}")
+    print(f"实际抽取：{len(sampled)} 句")
+    print(f"已写入：{output_tsv}")
 
-        if not first_row[0].lower().startswith("id"):
-            # 没表头，把第一行当数据
-            process_line(first_row, candidates, seen_bn)
+    if RULE_REPORT:
+        write_rule_report(output_tsv + ".rules.json", "sample", {RULES.corpus: RULES.as_dict(n_candidates)},
+                          output=output_tsv, sampled=len(sampled))
 
-        # 继续读剩下的行
-        for i, row in enumerate(reader, start=1):
-            if i > MAX_LINES:
-                break
-            process_line(row, candidates, seen_bn)
 
-    # 随机抽样
-    random.seed(42)
-    random.shuffle(candidates)
-    sampled = candidates[:SAMPLE_SIZE]
+def sample_from_rows(rows, output_tsv: str):
+    """对 [id, en, bn] 行流做过滤 + 随机抽样（方式见 SAMPLE_MODE），并写出结果。"""
+    line_filter = RULES.wrap(cross_corpus_filter(process_line, BLOOM_FILE, INPUT_TSV, RULES), INPUT_TSV)
+    write_result(draw_sample(rows, line_filter, SAMPLE_MODE, MAX_LINES, SAMPLE_SIZE, SEED, DEDUP), output_tsv)
 
-    # 写出结果
-    with open(output_tsv, "w", encoding="utf-8", newline="\n") as fout:
-        writer = csv.writer(fout, delimiter="\t")
-        writer.writerow(["id", "en", "bn"])
-        for new_id, (orig_id, en, bn) in enumerate(sampled, start=1):
-            writer.writerow([new_id, en, bn])
 
-    print(f"候选句子数量：{len(candidates)}")
-    print(f"实际抽取：{len(sampled)} 句")
-    print(f"已写入：{output_tsv}")
+def sample_from_merged(input_tsv: str, output_tsv: str):
+    line_filter = RULES.wrap(cross_corpus_filter(process_line, BLOOM_FILE, input_tsv, RULES), input_tsv)
+    checkpoint = Checkpoint(output_tsv, CHECKPOINT_SECONDS, RESUME, __file__, RULES)
+    result = draw_sample_from_tsv(input_tsv, line_filter, SAMPLE_MODE, MAX_LINES, SAMPLE_SIZE, SEED, DEDUP, checkpoint)
+    write_result(result, output_tsv)
+
+
+def sample_from_moses(en_path: str, bn_path: str, output_tsv: str, zip_path=None, debug_tsv=None):
+    """不落地 *.merged.tsv：把 Moses 两侧文件直接拼成行流送进过滤和抽样。"""
+    rows = iter_moses_rows(en_path, bn_path, "bn", zip_path, debug_tsv)
+    sample_from_rows(rows, output_tsv)
 
 
 if __name__ == "__main__":
-    sample_from_merged(INPUT_TSV, OUTPUT_TSV)
\ No newline at end of file
+    if FROM_MOSES:
+        sample_from_moses(EN_FILE, BN_FILE, OUTPUT_TSV, ZIP_FILE, DEBUG_MERGED_TSV)
+    else:
+        sample_from_merged(INPUT_TSV, OUTPUT_TSV)
\ No newline at end of file
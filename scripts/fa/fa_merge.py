@@ -23,10 +23,12 @@
 id <TAB> en <TAB> fa
 """
 
-import csv
 import os
-import re
-from typing import List, Tuple
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from xbench.merge_engine import merge_language
 
 # ======= 根据你机器上的实际路径改这里即可 =======
 BASE_DIR = r"<PATH_TO_XBENCH_ROOT>/fa/all_new"
@@ -45,133 +47,25 @@ OUTPUT_FILE = os.path.join(BASE_DIR, "fa_all_merged_clean.tsv")
 MIN_WORDS = 8
 MAX_WORDS = 55
 
+# 句对去重集合：set（原来的做法）；digest64 / digest128：只存摘要，省内存；exact：摘要 + 原文核对（见 xbench.dedup）
+DEDUP = "set"
 
-def clean_text(text: str) -> str:
-    """对句子做轻量清洗：首尾垃圾符号、控制字符、空白折叠。"""
-    if text is None:
-        return ""
-
-    text = text.strip()
-
-    # 去掉首尾的一些“无用符号”（括号、引号、破折号、点点点等）
-    text = re.sub(r'^[\s\-\–\—\·\•\(\)\[\]\{\}"“”‘’\'`…·。？！?!,.;:·]+', '', text)
-    text = re.sub(r'[\s\-\–\—\·\•\(\)\[\]\{\}"“”‘’\'`…·。？！?!,.;:·]+$', '', text)
-
-    # 去掉控制字符
-    text = ''.join(ch for ch in text if (ord(ch) >= 32 and ord(ch) != 127))
-
-    # 把连续空白压成一个空格
-    text = re.sub(r'\s+', ' ', text)
-
-    return text.strip()
-
+# 清洗 / 过滤用几个进程（1 = 不开子进程）；输出和单进程完全相同，只在大候选池上有意义
+JOBS = 1
 
-def count_words(text: str) -> int:
-    """按空格简单统计单词数（fa 也直接按空格粗略计数）。"""
-    if not text:
-        return 0
-    return len(text.split())
+# 清洗缓存文件（SQLite），例如 os.path.join(BASE_DIR, "clean_cache.sqlite")；None = 不用缓存。
+# 只改上面的阈值重跑时，已经清洗过的句子直接查表（见 xbench.clean_cache）
+CLEAN_CACHE = None
 
-
-def detect_en_fa_indices(header: List[str]) -> Tuple[int, int]:
-    """
-    从表头里找 'en' / 'fa' 两列的位置。
-    找不到就默认最后两列（倒数第二是 en，最后一列是 fa）。
-    """
-    lower = [h.lower().strip() for h in header]
-
-    en_idx = None
-    fa_idx = None
-    for i, name in enumerate(lower):
-        if name == "en":
-            en_idx = i
-        elif name == "fa":
-            fa_idx = i
-
-    if en_idx is not None and fa_idx is not None:
-        return en_idx, fa_idx
-
-    # 找不到就默认最后两列
-    if len(header) >= 2:
-        return len(header) - 2, len(header) - 1
-
-    raise ValueError("无法从表头中识别 en / fa 列，请检查输入 TSV 的列名。")
+# True：在输出旁边写 <输出>.rules.json，记下每个输入文件上每条过滤规则通过 / 拒绝了多少行、各花了多少时间
+RULE_REPORT = True
 
 
 def main():
-    seen_pairs = set()  # 去重：(en_lower, fa_lower)
-    rows_out = []
-
-    next_id = 1
-    header_written = False
-
-    for path in INPUT_FILES:
-        if not os.path.isfile(path):
-            print(f"[WARN] 找不到文件: {path}，跳过。")
-            continue
-
-        print(f"[INFO] 读取: {path}")
-        with open(path, "r", encoding="utf-8", newline="") as f:
-            reader = csv.reader(f, delimiter="\t")
-
-            first_row = True
-            en_idx = None
-            fa_idx = None
-
-            for row in reader:
-                if not row:
-                    continue
-
-                if first_row:
-                    first_row = False
-                    # 第一行当表头，尝试检测 en/fa 列
-                    try:
-                        en_idx, fa_idx = detect_en_fa_indices(row)
-                    except Exception as e:
-                        print(f"[WARN] {path} 自动检测表头失败: {e}")
-                        # 当成无表头文件处理：默认最后两列
-                        en_idx, fa_idx = len(row) - 2, len(row) - 1
-
-                    if not header_written:
-                        rows_out.append(["id", "en", "fa"])
-                        header_written = True
-                    continue
-
-                if en_idx >= len(row) or fa_idx >= len(row):
-                    continue
-
-                en_raw = row[en_idx]
-                fa_raw = row[fa_idx]
-
-                en_clean = clean_text(en_raw)
-                fa_clean = clean_text(fa_raw)
-
-                if not en_clean or not fa_clean:
-                    continue
-
-                en_len = count_words(en_clean)
-                fa_len = count_words(fa_clean)
-
-                # 过滤过短或过长
-                if (
-                    en_len < MIN_WORDS or en_len > MAX_WORDS or
-                    fa_len < MIN_WORDS or fa_len > MAX_WORDS
-                ):
-                    continue
-
-                key = (en_clean.lower(), fa_clean.lower())
-                if key in seen_pairs:
-                    continue
-                seen_pairs.add(key)
-
-                rows_out.append([str(next_id), en_clean, fa_clean])
-                next_id += 1
-
-    print(f"[INFO] 写出 {len(rows_out) - 1} 行数据到: {OUTPUT_FILE}")
-    with open(OUTPUT_FILE, "w", encoding="utf-8", newline="") as f_out:
-        writer = csv.writer(f_out, delimiter="\t")
-        writer.writerows(rows_out)
+    # 清洗 / 过滤规则见 xbench/profiles.py 里的 PROFILES["fa"]，合并流程见 xbench/merge_engine.py
+    merge_language("fa", INPUT_FILES, OUTPUT_FILE, dedup=DEDUP, jobs=JOBS, clean_cache=CLEAN_CACHE,
+                   rule_report=RULE_REPORT, min_words=MIN_WORDS, max_words=MAX_WORDS)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
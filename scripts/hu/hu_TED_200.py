@@ -15,31 +15,58 @@
 """
 
 import os
-import csv
-import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from xbench.line_index import merged_rows_by_id
+from xbench.bloom import cross_corpus_filter
+from xbench.checkpoint import Checkpoint
+from xbench.merge_engine import merge_filter
+from xbench.opus import iter_moses_rows
+from xbench.rule_stats import RuleStats, write_rule_report
+from xbench.sampler import draw_sample, draw_sample_from_tsv, write_sample
+from xbench.script_class import ScriptTable
 
 # === 路径按你的实际情况修改 ===
 BASE_DIR   = r"<PATH_TO_XBENCH_ROOT>/hu\TED"
 INPUT_TSV  = os.path.join(BASE_DIR, "TED2020.en-hu.merged.tsv")
 OUTPUT_TSV = os.path.join(BASE_DIR, "TED.en-hu.sample200.tsv")
 
+# 直接从 Moses 原始文件抽样（FROM_MOSES = True）时用，不需要先跑合并脚本
+EN_FILE  = os.path.join(BASE_DIR, "TED2020.en-hu.en")
+HU_FILE  = os.path.join(BASE_DIR, "TED2020.en-hu.hu")
+ZIP_FILE = os.path.join(BASE_DIR, "en-hu.txt.zip")
+FROM_MOSES       = False  # True：跳过 *.merged.tsv，两侧文件直接流式送进过滤和抽样
+DEBUG_MERGED_TSV = None   # 调试用：给一个路径就顺带写出实际读过的 merged 行
+
 MAX_LINES         = 100000   # 只看前 1000 条（不含表头）
 SAMPLE_SIZE       = 200    # 最多抽 200 句
+SAMPLE_MODE       = "prefix"  # prefix：只看前 MAX_LINES 行；reservoir：整份语料蓄水池抽样（忽略 MAX_LINES；蓄水池 O(SAMPLE_SIZE)，但去重集合随不同句子数增长，大语料配 DEDUP = "digest64"）
+                              # offset：随机跳到字节偏移处取行，不扫描整个文件（只用于 merged.tsv，适合 GB 级大文件）
+                              # index：按行偏移索引（<merged.tsv>.idx，首次自动建好）均匀抽行号直接取行，重复抽样不再扫文件
+SEED              = 42     # 抽样随机种子，同一个种子结果可复现
+DEDUP             = "set"  # 去重集合：set（原来的做法）；digest64 / digest128：只存句子摘要，整份语料时省内存；exact：摘要 + 原文核对
+BLOOM_FILE        = None   # 跨语料去重：设成原始合并脚本登记过的 hu.bloom，也出现在本语言排在前面的语料里的句子直接拒绝（重复句只留一份）
+RULE_REPORT       = True   # True：在输出旁边写 <输出>.rules.json，记下每条过滤规则通过 / 拒绝了多少行、各花了多少时间
+CHECKPOINT_SECONDS = 60     # prefix / reservoir：每隔多少秒把读取位置、候选和去重集合存到 <输出>.ckpt（None：不存）
+RESUME             = "--resume" in sys.argv  # 加 --resume 运行：进程中途被杀后从断点接着抽，结果和一次跑完相同
+MERGE_FILTER      = True   # True：抽样时就按 hu_merge.py 的规则（两侧清洗后的句长 / 数字比例）过滤，抽中的句对合并时不会再被删
+REJOIN_EN         = False  # True：按原始 id 从 merged.tsv 的行偏移索引取回 en，输出 id / en / hu 三列
 MIN_TOKENS        = 8      # 词数下限
 MIN_HU_SPEC_RATIO = 0.02   # 匈牙利重音字母占所有字母的比例下限
 
 # 匈牙利语特有重音字母
 HU_ACCENTED = set("áéíóöőúüűÁÉÍÓÖŐÚÜŰ")
+HU_TABLE = ScriptTable({"hu": HU_ACCENTED})
+
+# 每条过滤规则的通过 / 拒绝数和耗时（见 xbench.rule_stats）
+RULES = RuleStats()
 
 
 # ========= 工具函数 =========
 def hu_specific_ratio(text: str) -> float:
     """计算文本中匈牙利重音字母比例，用于粗过滤“不是 hu 语言”的句子。"""
-    letters = [c for c in text if c.isalpha()]
-    if not letters:
-        return 0.0
-    hu_spec = [c for c in letters if c in HU_ACCENTED]
-    return len(hu_spec) / len(letters)
+    return HU_TABLE.ratio(text, "hu")
 
 
 def has_foreign_like_word(text: str) -> bool:
@@ -79,74 +106,92 @@ def process_line(row, candidates, seen_hu):
     处理 TSV 中的一行 row = [id, en, hu]，
     符合所有条件就把 (orig_id, hu) 加到候选列表。
     """
-    if len(row) < 3:
+    if not RULES.step("columns", len(row) >= 3):
         return
 
     orig_id, en, hu = row[0], row[1], row[2]
     hu = hu.strip()
-    if not hu:
+    if not RULES.step("empty", bool(hu)):
         return
 
     # 1) 词数过滤
     tokens = hu.split()
-    if len(tokens) < MIN_TOKENS:
+    if not RULES.step("min_tokens", len(tokens) >= MIN_TOKENS):
         return
 
     # 2) 去重
-    if hu in seen_hu:
+    if not RULES.step("dedup", hu not in seen_hu):
         return
 
     # 3) 匈牙利重音比例过滤
     ratio = hu_specific_ratio(hu)
-    if ratio < MIN_HU_SPEC_RATIO:
+    if not RULES.step("script_ratio", ratio >= MIN_HU_SPEC_RATIO):
         return
 
     # 4) 检查是否含有“疑似外语长单词”
-    if has_foreign_like_word(hu):
+    if not RULES.step("foreign_word", not has_foreign_like_word(hu)):
+        return
+
+    # 合并阶段的过滤（hu_merge.py 的阈值）
+    if MERGE_FILTER and not RULES.step("merge_filter", merge_filter("hu").accept_raw(en, hu)):
         return
 
     seen_hu.add(hu)
     candidates.append((orig_id, hu))
 
 
-def sample_hu_only(input_tsv: str, output_tsv: str):
-    candidates = []
-    seen_hu = set()
-
-    with open(input_tsv, "r", encoding="utf-8") as fin:
-        reader = csv.reader(fin, delimiter="\t")
-
-        # 处理表头：如果第一列是 "id" 就跳过
-        first_row = next(reader, None)
-        if first_row is None:
-            print("输入文件为空。")
-            return
-
-        if not first_row[0].lower().startswith("id"):
-            # 没有表头，把第一行当数据
-            process_line(first_row, candidates, seen_hu)
-
-        for i, row in enumerate(reader, start=1):
-            if i > MAX_LINES:
-                break
-            process_line(row, candidates, seen_hu)
-
-    # 随机抽样
-    random.seed(42)
-    random.shuffle(candidates)
-    sampled = candidates[:SAMPLE_SIZE]
-
-    # ===== 写出文件：id + hu 两列 =====
-    with open(output_tsv, "w", encoding="utf-8", newline="\n") as fout:
-        writer = csv.writer(fout, delimiter="\t")
-        writer.writerow(["id", "hu"])
-        for new_id, (_, hu) in enumerate(sampled, start=1):
-            writer.writerow([new_id, hu])
-
-    print(f"候选句子数量（全部过滤后）：{len(candidates)}")
+def write_result(result, output_tsv: str, header=("id", "hu")):
+    """写出抽样结果并打印统计；result 为 None 表示输入为空。"""
+    if result is None:
+        print("输入文件为空。")
+        return
+    n_candidates, sampled = result
+
+    # ===== 写出文件：默认 id + hu 两列 =====
+    write_sample(output_tsv, header, sampled)
+
+    print(f"候选句子数量（全部过滤后）：{n_candidates}")
     print(f"实际抽取：{len(sampled)} 句")
     print(f"已写入：{output_tsv}")
 
+    if RULE_REPORT:
+        write_rule_report(output_tsv + ".rules.json", "sample", {RULES.corpus: RULES.as_dict(n_candidates)},
+                          output=output_tsv, sampled=len(sampled))
+
+
+def sample_from_rows(rows, output_tsv: str):
+    """对 [id, en, hu] 行流做过滤 + 随机抽样（方式见 SAMPLE_MODE），并写出结果。"""
+    line_filter = RULES.wrap(cross_corpus_filter(process_line, BLOOM_FILE, INPUT_TSV, RULES), INPUT_TSV)
+    write_result(draw_sample(rows, line_filter, SAMPLE_MODE, MAX_LINES, SAMPLE_SIZE, SEED, DEDUP), output_tsv)
+
+
+def rejoin_en(input_tsv: str, result):
+    """(orig_id, hu) -> (orig_id, en, hu)：en 按原始 id 直接从 merged.tsv 取行，不重新扫描文件。"""
+    n_candidates, sampled = result
+    rows = merged_rows_by_id(input_tsv, [cand[0] for cand in sampled])
+    return n_candidates, [(cand[0], row[1], cand[1]) for cand, row in zip(sampled, rows)]
+
+
+def sample_hu_only(input_tsv: str, output_tsv: str):
+    line_filter = RULES.wrap(cross_corpus_filter(process_line, BLOOM_FILE, input_tsv, RULES), input_tsv)
+    checkpoint = Checkpoint(output_tsv, CHECKPOINT_SECONDS, RESUME, __file__, RULES)
+    result = draw_sample_from_tsv(input_tsv, line_filter, SAMPLE_MODE, MAX_LINES, SAMPLE_SIZE, SEED, DEDUP, checkpoint)
+    if REJOIN_EN and result is not None:
+        write_result(rejoin_en(input_tsv, result), output_tsv, ("id", "en", "hu"))
+    else:
+        write_result(result, output_tsv)
+
+
+def sample_from_moses(en_path: str, hu_path: str, output_tsv: str, zip_path=None, debug_tsv=None):
+    """不落地 *.merged.tsv：把 Moses 两侧文件直接拼成行流送进过滤和抽样。"""
+    rows = iter_moses_rows(en_path, hu_path, "hu", zip_path, debug_tsv)
+    sample_from_rows(rows, output_tsv)
+
 
 if __name__ == "__main__":
-    sample_hu_only(INPUT_TSV, OUTPUT_TSV)
\ No newline at end of file
+    if FROM_MOSES:
+        if REJOIN_EN:
+            print("[WARN] REJOIN_EN 需要 *.merged.tsv 的行偏移索引，FROM_MOSES 模式下忽略")
+        sample_from_moses(EN_FILE, HU_FILE, OUTPUT_TSV, ZIP_FILE, DEBUG_MERGED_TSV)
+    else:
+        sample_hu_only(INPUT_TSV, OUTPUT_TSV)
\ No newline at end of file
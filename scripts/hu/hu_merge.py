@@ -27,8 +27,10 @@
 """
 
 import os
-import csv
-import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from xbench.merge_engine import merge_language
 
 # ==== 路径 & 文件名，根据你的实际目录调整 ====
 BASE_DIR = r"<PATH_TO_XBENCH_ROOT>/hu\all_new"
@@ -45,121 +47,26 @@ FILES = [
 # 输出文件
 OUTPUT_TSV = os.path.join(BASE_DIR, "hu_all_merged_clean.tsv")
 
-# 认为 en 在第 2 列（索引 1），hu 在最后一列
-EN_COL_IDX = 1
-HU_COL_IDX = -1
-
 # hu 最小词数（小于这个就丢弃）
 HU_MIN_TOKENS = 8
 
+# 清洗 / 过滤用几个进程（1 = 不开子进程）；输出和单进程完全相同，只在大候选池上有意义
+JOBS = 1
 
-def clean_sentence(text: str) -> str:
-    """
-    清洗句子：
-    - strip 两端空白
-    - 去掉开头/结尾的括号、引号、破折号等无用字符（可按需要增减）
-    - 去掉孤立的空括号 "()" "[]" "{}"
-    - 压缩多个空格为一个
-    """
-    if not text:
-        return ""
-
-    s = text.strip()
-
-    # 去除孤立的空括号
-    s = s.replace("()", "").replace("[]", "").replace("{}", "")
-
-    # 去除开头/结尾的杂字符：括号、引号、破折号等
-    # 可以按需要把正则里的符号加多一点或删减
-    s = re.sub(r'^[\s\(\)\[\]\{\}"“”\'«»„‚…\-–—]+', '', s)
-    s = re.sub(r'[\s\(\)\[\]\{\}"“”\'«»„‚…\-–—]+$', '', s)
-
-    # 再压缩多余空格
-    s = re.sub(r'\s+', ' ', s).strip()
-    return s
-
+# 清洗缓存文件（SQLite），例如 os.path.join(BASE_DIR, "clean_cache.sqlite")；None = 不用缓存。
+# 只改上面的阈值重跑时，已经清洗过的句子直接查表（见 xbench.clean_cache）
+CLEAN_CACHE = None
 
-def is_header(row):
-    """
-    简单判断这一行是不是表头：如果第一列包含 'id' 字样，就认为是表头。
-    """
-    if not row:
-        return False
-    first = row[0].strip().lower()
-    return first == "id" or first.startswith("#")
+# True：在输出旁边写 <输出>.rules.json，记下每个输入文件上每条过滤规则通过 / 拒绝了多少行、各花了多少时间
+RULE_REPORT = True
 
 
 def merge_and_clean():
-    merged_rows = []
-
-    for fname in FILES:
-        path = os.path.join(BASE_DIR, fname)
-        if not os.path.exists(path):
-            # 尝试补 .tsv 后缀
-            if os.path.exists(path + ".tsv"):
-                path = path + ".tsv"
-            else:
-                print(f"⚠ 找不到文件：{path}，跳过")
-                continue
-
-        print(f"读取文件: {path}")
-        with open(path, "r", encoding="utf-8") as fin:
-            reader = csv.reader(fin, delimiter="\t")
-
-            first_row = next(reader, None)
-            if first_row is None:
-                continue
-
-            # 跳过表头
-            if not is_header(first_row):
-                # 第一行就是数据，需要处理
-                rows_iter = [first_row] + list(reader)
-            else:
-                rows_iter = list(reader)
-
-            for row in rows_iter:
-                if not row:
-                    continue
-
-                # 防御：如果行太短，跳过
-                if len(row) <= max(EN_COL_IDX if EN_COL_IDX >= 0 else 0,
-                                   len(row) + HU_COL_IDX):
-                    continue
-
-                # 定位 en / hu 字段
-                en = row[EN_COL_IDX]
-                hu = row[HU_COL_IDX]
-
-                # 清洗 en / hu
-                en_clean = clean_sentence(en)
-                hu_clean = clean_sentence(hu)
-
-                # 按 hu 词数过滤
-                if not hu_clean:
-                    continue
-                hu_tokens = hu_clean.split()
-                if len(hu_tokens) < HU_MIN_TOKENS:
-                    continue
-
-                # 把清洗后的句子放回 row 中
-                row[EN_COL_IDX] = en_clean
-                row[HU_COL_IDX] = hu_clean
-
-                merged_rows.append(row)
-
-    # 重新编号 id，从 1 开始
-    print(f"合并后，符合条件的句子总数：{len(merged_rows)}")
-    with open(OUTPUT_TSV, "w", encoding="utf-8", newline="\n") as fout:
-        writer = csv.writer(fout, delimiter="\t")
-        writer.writerow(["id", "en", "hu"])
-
-        for new_id, row in enumerate(merged_rows, start=1):
-            en = row[EN_COL_IDX]
-            hu = row[HU_COL_IDX]
-            writer.writerow([new_id, en, hu])
-
-    print(f"已写出到: {OUTPUT_TSV}")
+    # en 在第 2 列、hu 在最后一列；清洗规则见 xbench/profiles.py 里的 PROFILES["hu"]，合并流程见 xbench/merge_engine.py
+    input_files = [os.path.join(BASE_DIR, fname) for fname in FILES]
+    merge_language("hu", input_files, OUTPUT_TSV, jobs=JOBS, clean_cache=CLEAN_CACHE, rule_report=RULE_REPORT,
+                   min_words=HU_MIN_TOKENS)
 
 
 if __name__ == "__main__":
-    merge_and_clean()
\ No newline at end of file
+    merge_and_clean()
@@ -30,10 +30,12 @@ id <TAB> en <TAB> ms
 - 删除句中省略号（"…" 或连续的多个 "."）
 """
 
-import csv
 import os
-import re
-from typing import List, Tuple
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from xbench.merge_engine import merge_language
 
 BASE_DIR = r"<PATH_TO_XBENCH_ROOT>/ms/all_new"
 
@@ -51,180 +53,25 @@ MIN_WORDS = 8
 MAX_WORDS = 45
 MAX_DIGIT_RATIO = 0.3  # 数字 / (字母+数字) > 0.5 就删
 
+# 句对去重集合：set（原来的做法）；digest64 / digest128：只存摘要，省内存；exact：摘要 + 原文核对（见 xbench.dedup）
+DEDUP = "set"
 
-def is_emoji(ch: str) -> bool:
-    cp = ord(ch)
-    if (
-        0x1F300 <= cp <= 0x1F5FF
-        or 0x1F600 <= cp <= 0x1F64F
-        or 0x1F680 <= cp <= 0x1F6FF
-        or 0x1F900 <= cp <= 0x1F9FF
-        or 0x2600 <= cp <= 0x26FF
-        or 0x2700 <= cp <= 0x27BF
-    ):
-        return True
-    return False
-
-
-def remove_leading_numbering(text: str) -> str:
-    # 句首编号：1. / 2) / (3) / [4] / 5、 等
-    text = re.sub(
-        r'^\s*(?:[\(\[\{]?\d+(?:\.\d+)*[\)\]\}\.\)\-、:]+)\s*',
-        '',
-        text
-    )
-    return text
-
-
-def clean_text(text: str) -> str:
-    """去编号、首尾垃圾符号、非法字符、emoji、句中省略号、空白折叠"""
-    if text is None:
-        return ""
-
-    text = text.strip()
-
-    # 1) 删除句首编号
-    text = remove_leading_numbering(text)
-
-    # 2) 去掉首尾无用符号
-    text = re.sub(r'^[\s\-\–\—\·\•\(\)\[\]\{\}"“”‘’\'`…·。？！?!,.;:·]+', '', text)
-    text = re.sub(r'[\s\-\–\—\·\•\(\)\[\]\{\}"“”‘’\'`…·。？！?!,.;:·]+$', '', text)
-
-    # 3) 删除控制字符
-    text = ''.join(ch for ch in text if (ord(ch) >= 32 and ord(ch) != 127))
-
-    # 4) 删除 emoji
-    text = ''.join(ch for ch in text if not is_emoji(ch))
-
-    # 5) 删除句中省略号：
-    #    - Unicode 省略号 “…” 全部删
-    #    - 连续三个及以上的点号 "..." "...." 等也删掉
-    text = text.replace("…", "")
-    text = re.sub(r'\.{3,}', '', text)
-
-    # 6) 压缩空白
-    text = re.sub(r'\s+', ' ', text)
-
-    return text.strip()
-
-
-def count_words(text: str) -> int:
-    if not text:
-        return 0
-    return len(text.split())
-
-
-def digit_ratio(text: str) -> float:
-    if not text:
-        return 0.0
-    digits = 0
-    alnum = 0
-    for ch in text:
-        if ch.isdigit():
-            digits += 1
-            alnum += 1
-        elif ch.isalpha():
-            alnum += 1
-    if alnum == 0:
-        return 0.0
-    return digits / float(alnum)
-
-
-def detect_en_ms_indices(header: List[str]) -> Tuple[int, int]:
-    lower = [h.lower().strip() for h in header]
-    en_idx = None
-    ms_idx = None
-    for i, name in enumerate(lower):
-        if name == "en":
-            en_idx = i
-        elif name == "ms":
-            ms_idx = i
-    if en_idx is not None and ms_idx is not None:
-        return en_idx, ms_idx
-    if len(header) >= 2:
-        return len(header) - 2, len(header) - 1
-    raise ValueError("无法从表头中识别 en / ms 列，请检查输入 TSV 的列名。")
-
-
-def main():
-    seen_pairs = set()
-    rows_out = []
-    next_id = 1
-    header_written = False
-
-    for path in INPUT_FILES:
-        if not os.path.isfile(path):
-            print(f"[WARN] 找不到文件: {path}，跳过。")
-            continue
-
-        print(f"[INFO] 读取: {path}")
-        with open(path, "r", encoding="utf-8", newline="") as f:
-            reader = csv.reader(f, delimiter="\t")
-
-            first_row = True
-            en_idx = None
-            ms_idx = None
-
-            for row in reader:
-                if not row:
-                    continue
-
-                if first_row:
-                    first_row = False
-                    try:
-                        en_idx, ms_idx = detect_en_ms_indices(row)
-                    except Exception as e:
-                        print(f"[WARN] {path} 自动检测表头失败: {e}")
-                        en_idx, ms_idx = len(row) - 2, len(row) - 1
+# 清洗 / 过滤用几个进程（1 = 不开子进程）；输出和单进程完全相同，只在大候选池上有意义
+JOBS = 1
 
-                    if not header_written:
-                        rows_out.append(["id", "en", "ms"])
-                        header_written = True
-                    continue
+# 清洗缓存文件（SQLite），例如 os.path.join(BASE_DIR, "clean_cache.sqlite")；None = 不用缓存。
+# 只改上面的阈值重跑时，已经清洗过的句子直接查表（见 xbench.clean_cache）
+CLEAN_CACHE = None
 
-                if en_idx >= len(row) or ms_idx >= len(row):
-                    continue
+# True：在输出旁边写 <输出>.rules.json，记下每个输入文件上每条过滤规则通过 / 拒绝了多少行、各花了多少时间
+RULE_REPORT = True
 
-                en_raw = row[en_idx]
-                ms_raw = row[ms_idx]
 
-                en_clean = clean_text(en_raw)
-                ms_clean = clean_text(ms_raw)
-
-                if not en_clean or not ms_clean:
-                    continue
-
-                en_len = count_words(en_clean)
-                ms_len = count_words(ms_clean)
-
-                if (
-                    en_len < MIN_WORDS or en_len > MAX_WORDS or
-                    ms_len < MIN_WORDS or ms_len > MAX_WORDS
-                ):
-                    continue
-
-                if (
-                    digit_ratio(en_clean) > MAX_DIGIT_RATIO or
-                    digit_ratio(ms_clean) > MAX_DIGIT_RATIO
-                ):
-                    continue
-
-                key = (en_clean.lower(), ms_clean.lower())
-                if key in seen_pairs:
-                    continue
-                seen_pairs.add(key)
-
-                rows_out.append([str(next_id), en_clean, ms_clean])
-                next_id += 1
-
-    final_rows = len(rows_out) - 1  # 去掉表头
-    print(f"[INFO] 最终保留句对数：{final_rows}")
-    print(f"[INFO] 写出到: {OUTPUT_FILE}")
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8", newline="") as f_out:
-        writer = csv.writer(f_out, delimiter="\t")
-        writer.writerows(rows_out)
+def main():
+    # 清洗 / 过滤规则见 xbench/profiles.py 里的 PROFILES["ms"]，合并流程见 xbench/merge_engine.py
+    merge_language("ms", INPUT_FILES, OUTPUT_FILE, dedup=DEDUP, jobs=JOBS, clean_cache=CLEAN_CACHE,
+                   rule_report=RULE_REPORT, min_words=MIN_WORDS, max_words=MAX_WORDS, max_digit_ratio=MAX_DIGIT_RATIO)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
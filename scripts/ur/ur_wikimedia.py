@@ -13,35 +13,34 @@
 """
 
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from xbench.checkpoint import Checkpoint
+from xbench.opus import merge_moses
 
 # === 修改成你自己的路径 ===
 BASE_DIR = r"<PATH_TO_XBENCH_ROOT>/ur\wikimedia"
 EN_FILE  = os.path.join(BASE_DIR, "wikimedia.en-ur.en")
 UR_FILE  = os.path.join(BASE_DIR, "wikimedia.en-ur.ur")
 OUT_FILE = os.path.join(BASE_DIR, "wikimedia.en-ur.merged.tsv")
-
-def merge_parallel(en_path, ur_path, out_path):
-    with open(en_path, "r", encoding="utf-8") as f_en, \
-         open(ur_path, "r", encoding="utf-8") as f_ur, \
-         open(out_path, "w", encoding="utf-8", newline="\n") as fout:
-
-        # 写表头，如果不想要可以注释掉下一行
-        fout.write("id\ten\tur\n")
-
-        count = 0
-        for idx, (en_line, ur_line) in enumerate(zip(f_en, f_ur), start=1):
-            en_line = en_line.rstrip("\n\r")
-            ur_line = ur_line.rstrip("\n\r")
-
-            fout.write(f"{idx}\t{en_line}\t{ur_line}\n")
-            count += 1
-
-        # 检查两边行数是否一致
-        extra_en = f_en.readline()
-        extra_ur = f_ur.readline()
-        if extra_en or extra_ur:
-            print("警告：en 和 ur 文件行数不一致，请检查！")
-        print(f"已合并 {count} 行，输出到: {out_path}")
+ZIP_FILE = os.path.join(BASE_DIR, "en-ur.txt.zip")  # OPUS Moses 压缩包：没解压时直接从包里读
+BLOOM_FILE = None  # 跨语料去重：设成本语言共用的 Bloom 文件（如 os.path.join(BASE_DIR, "..", "ur.bloom")），合并时登记 ur 句子
+BLOOM_CAPACITY = 2_000_000  # 本语言所有语料加起来的句子数上限，和误判率一起决定新建的 .bloom 多大（1% 时约 18 MB）；本语言的原始合并要设成一样
+BLOOM_FP_RATE = 0.01  # 误判率：本来唯一的句子被当成跨语料重复拒绝的概率
+CHECKPOINT_SECONDS = 60  # 每隔多少秒把合并进度存到 <OUT_FILE>.ckpt（None：不存）；成功结束后删掉
+RESUME = "--resume" in sys.argv  # 加 --resume 运行：进程中途被杀后从断点接着合并，结果和一次跑完相同
+
+def merge_parallel(en_path, ur_path, out_path, zip_path=None, bloom_file=None):
+    # 第 4 个参数是表头，如果不想要可以改成 None
+    checkpoint = Checkpoint(out_path, CHECKPOINT_SECONDS, RESUME, __file__)
+    count, same_length = merge_moses(en_path, ur_path, out_path, "id\ten\tur\n", zip_path, bloom_file, checkpoint,
+                                     BLOOM_CAPACITY, BLOOM_FP_RATE)
+
+    # 检查两边行数是否一致
+    if not same_length:
+        print("警告：en 和 ur 文件行数不一致，请检查！")
+    print(f"已合并 {count} 行，输出到: {out_path}")
 
 if __name__ == "__main__":
-    merge_parallel(EN_FILE, UR_FILE, OUT_FILE)
\ No newline at end of file
+    merge_parallel(EN_FILE, UR_FILE, OUT_FILE, ZIP_FILE, BLOOM_FILE)
\ No newline at end of file
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+"""
+X-Bench 构建脚本共用的工具模块。
+
+scripts/<lang>/*.py 里的脚本通过把 scripts/ 加进 sys.path 来导入这里的函数，
+仍然可以像以前一样直接 `python scripts/bn/bn_QED.py` 运行。
+"""
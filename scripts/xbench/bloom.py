@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+
+"""
+跨语料去重：同一门语言的所有语料共用一个持久化的 Bloom filter 文件（如 hu.bloom）。
+
+同一句话经常出现在多个语料里（OpenSubtitles 和 QED 的字幕、Tanzil 里重复的经文……），
+但各抽样脚本只在自己的语料内部去重，*_merge.py 也只在最后几百行上去重。
+
+做法：
+  - 每个格子是 1 个字节，第 i 位表示“第 i 个语料里出现过映射到这个格子的句子”（最多 8 个语料）；
+  - 原始合并脚本（merge_parallel）写 *.merged.tsv 时，把每行的 xx 句子登记到本语料对应的位上；
+  - 抽样脚本在 process_line 之前查一下：句子的 k 个格子按位与之后，有比自己的位更低的语料的位，
+    就说明它（几乎肯定）也出现在排在前面的语料里，直接拒绝，不占抽样名额；
+    跨语料重复的句子只留在位最低的那个语料里（那里照常过滤、抽样），不会每个语料都丢掉。
+  - 语料的位按登记顺序分配。tools/build.py 在本语言第一个原始合并启动前按 PIPELINES 的顺序把各语料登记好，
+    所以句子留在哪个语料里是固定的，和原始合并谁先跑完无关；手工跑时按 build_one_lang.sh 的顺序跑原始合并即可。
+    只要本语言的原始合并都跑完了再抽样（tools/build.py 会这样排），结果也和抽样的顺序无关。
+
+读写都不把整个文件读进内存：
+  - 抽样脚本用 mmap 只读映射格子，只有查到的页才真正读盘；
+  - 原始合并登记句子时只在本进程里记下改过的页（每页 PAGE 个格子），save() 时持文件锁（<bloom>.lock）
+    把这些页按位或进盘上的格子，文件其余部分不动；给语料分配位也在锁里做，只改文件头。
+几个原始合并可以同时写同一个 .bloom：持锁的只是写回改过的页这一小段，谁先谁后都不会丢别的语料的位。
+
+文件大小只由容量和误判率决定（bloom_size），和语料大小无关；句子数超过容量时误判率会升高。
+容量和误判率在原始合并脚本里设（BLOOM_CAPACITY / BLOOM_FP_RATE，按本语言的语料大小），第一个建文件的原始合并说了算。
+误判只会让少量本来唯一的句子被多拒绝，不会让重复句子漏过。
+语料内容变了要删掉 .bloom 文件，重新跑一遍所有原始合并脚本（Bloom filter 没法删除元素）。
+"""
+
+import csv
+import math
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from hashlib import blake2b
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .sampler import ProcessLine
+
+try:
+    import fcntl
+except ImportError:  # Windows 上用 msvcrt 锁文件
+    fcntl = None
+    import msvcrt
+
+# 新建 .bloom 文件时的默认参数（约 190 MB）；原始合并脚本按本语言的语料大小设自己的 BLOOM_CAPACITY / BLOOM_FP_RATE
+BLOOM_CAPACITY = 20_000_000
+BLOOM_FP_RATE = 0.01
+
+MAGIC = b"XBBLOOM1"
+MAX_CORPORA = 8
+_HEADER = struct.Struct("<8sQII")  # magic, 格子数 m, 哈希个数 k, 语料数
+_NAME = struct.Struct("<64s")
+_CELLS = _HEADER.size + MAX_CORPORA * _NAME.size  # 格子在文件里的起始位置
+
+# 原始合并记录改动、写回的粒度（格子数）：只把改过的页按位或进文件
+PAGE = 1 << 12
+
+
+def bloom_size(capacity: int, fp_rate: float) -> Tuple[int, int]:
+    """按容量和误判率算出 (格子数 m, 哈希个数 k)。"""
+    m = max(64, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+    k = max(1, round(m / capacity * math.log(2)))
+    return m, k
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """对 <path>.lock 加排它锁（跨进程），退出时解锁；锁文件留在原地。"""
+    with open(path + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK 重试约 10 秒后放弃，接着等
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_header(f, path: str) -> Tuple[int, int, List[str]]:
+    """读 .bloom 的文件头：(格子数 m, 哈希个数 k, 语料名)。"""
+    f.seek(0)
+    magic, m, k, n = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} 不是 Bloom filter 文件")
+    names = [_NAME.unpack(f.read(_NAME.size))[0].rstrip(b"\0").decode("utf-8") for _ in range(MAX_CORPORA)]
+    return m, k, names[:n]
+
+
+def normalize_key(text: str) -> str:
+    """去重用的键：折叠空白、转小写。"""
+    return " ".join(text.split()).lower()
+
+
+class CorpusBloom:
+    """
+    一门语言共用的 Bloom filter，记录每个句子出现在哪些语料里。
+
+        bloom = CorpusBloom.open("hu.bloom")
+        bloom.add("Jó reggelt kívánok!", "TED2020.en-hu.merged.tsv")
+        bloom.save()
+        CorpusBloom.open("hu.bloom").seen_elsewhere("Jó reggelt kívánok!", "QED.en-hu.merged.tsv")  # -> True
+
+    add 记下的位在 save() 之前只在本进程里（查询时也算进去），盘上的格子按需 mmap 只读映射。
+    """
+
+    def __init__(self, path: str, m: int, k: int, corpora: List[str]):
+        self.path = path
+        self.m = m
+        self.k = k
+        self.corpora = corpora
+        self.cells: Optional[memoryview] = None  # 盘上的格子（只读映射），第一次查询时才映射
+        self._pages: Dict[int, bytearray] = {}  # 本进程改过、还没写回的页
+
+    @classmethod
+    def open(cls, path: str, capacity: Optional[int] = None, fp_rate: Optional[float] = None) -> "CorpusBloom":
+        """
+        打开 .bloom 文件（只读文件头）；不存在时按 capacity / fp_rate（默认 BLOOM_CAPACITY / BLOOM_FP_RATE）定大小，
+        登记语料或 save() 时才建文件。已有的文件大小不变，和给的 capacity / fp_rate 对不上时只提示。
+        """
+        m, k = bloom_size(capacity or BLOOM_CAPACITY, fp_rate or BLOOM_FP_RATE)
+        if not os.path.isfile(path):
+            return cls(path, m, k, [])
+        with open(path, "rb") as f:
+            bloom = cls(path, *_read_header(f, path))
+        if (capacity or fp_rate) and (bloom.m, bloom.k) != (m, k):
+            print(f"[WARN] {path} 是按别的容量 / 误判率建的（m={bloom.m}, k={bloom.k}），照原来的大小用；"
+                  f"要改大小先删掉它再重跑本语言的原始合并")
+        return bloom
+
+    @classmethod
+    def register_corpora(cls, path: str, corpora: List[str], capacity: Optional[int] = None,
+                         fp_rate: Optional[float] = None):
+        """按给定顺序登记语料（已登记的不动），文件不存在时按 capacity / fp_rate 新建；构建前固定各语料的位用。"""
+        with _locked(path):
+            bloom = cls.open(path, capacity, fp_rate)
+            bloom._attach()
+            new = [name for name in corpora if name not in bloom.corpora]
+            if not new:
+                return
+            if len(bloom.corpora) + len(new) > MAX_CORPORA:
+                raise ValueError(f"{path} 最多记录 {MAX_CORPORA} 个语料：{bloom.corpora + new}")
+            bloom.corpora.extend(new)
+            bloom._write_header()
+
+    def _header(self) -> bytes:
+        names = [self.corpora[i] if i < len(self.corpora) else "" for i in range(MAX_CORPORA)]
+        return _HEADER.pack(MAGIC, self.m, self.k, len(self.corpora)) + b"".join(
+            _NAME.pack(name.encode("utf-8")) for name in names)
+
+    def _write_header(self):
+        """（持锁时）只改写文件头（语料名），格子不动。"""
+        with open(self.path, "r+b") as f:
+            f.write(self._header())
+
+    def _attach(self):
+        """（持锁时）文件不存在就新建（格子全零，用 truncate 补出来）；存在时核对大小，读回盘上的语料名。"""
+        if not os.path.isfile(self.path):
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as out:
+                out.write(self._header())
+                out.truncate(_CELLS + self.m)
+            os.replace(tmp_path, self.path)
+            return
+        with open(self.path, "rb") as f:
+            m, k, names = _read_header(f, self.path)
+        if (m, k) != (self.m, self.k):
+            raise ValueError(f"{self.path} 的大小（m={m}, k={k}）和内存里的（m={self.m}, k={self.k}）不同")
+        # 盘上的语料名只会在后面追加，所以内存里的必须是它的前缀
+        if names[:len(self.corpora)] != self.corpora:
+            raise ValueError(f"{self.path} 里的语料 {names} 和内存里的 {self.corpora} 对不上")
+        self.corpora = names
+
+    def _disk_cells(self) -> Optional[memoryview]:
+        """盘上的格子，只读 mmap；文件还不存在时是 None。"""
+        if self.cells is None and os.path.isfile(self.path):
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(mapped) != _CELLS + self.m:
+                raise ValueError(f"{self.path} 不完整：应有 {self.m} 个格子，实际 {len(mapped) - _CELLS} 个")
+            self.cells = memoryview(mapped)[_CELLS:]
+        return self.cells
+
+    def save(self):
+        """写回：持锁，把本进程改过的页按位或进盘上的格子（别的进程写进去的位不受影响），其余部分不动。"""
+        with _locked(self.path):
+            self._attach()
+            if self._pages:
+                with open(self.path, "r+b") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE)
+                    try:
+                        for page, mine in self._pages.items():
+                            start = _CELLS + page * PAGE
+                            end = start + len(mine)
+                            merged = int.from_bytes(mapped[start:end], "little") | int.from_bytes(mine, "little")
+                            mapped[start:end] = merged.to_bytes(len(mine), "little")
+                    finally:
+                        mapped.close()
+        self._pages.clear()
+
+    def corpus_bit(self, corpus: str, register: bool = True) -> int:
+        """
+        语料对应的位（1 << i）；没登记过的语料 register=True 时登记，否则返回 0。
+        登记在文件锁里做：先读盘上已登记的语料，再追加并立刻写回文件头，同时跑的原始合并不会拿到同一个位。
+        """
+        if corpus not in self.corpora:
+            if not register:
+                return 0
+            with _locked(self.path):
+                self._attach()
+                if corpus not in self.corpora:
+                    if len(self.corpora) >= MAX_CORPORA:
+                        raise ValueError(f"{self.path} 最多记录 {MAX_CORPORA} 个语料：{self.corpora}")
+                    self.corpora.append(corpus)
+                    self._write_header()
+        return 1 << self.corpora.index(corpus)
+
+    def _positions(self, text: str) -> Iterator[int]:
+        d = blake2b(normalize_key(text).encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        m = self.m
+        return ((h1 + i * h2) % m for i in range(self.k))
+
+    def add(self, text: str, corpus: str):
+        self.add_bit(text, self.corpus_bit(corpus))
+
+    def add_bit(self, text: str, bit: int):
+        pages = self._pages
+        for pos in self._positions(text):
+            page, offset = divmod(pos, PAGE)
+            cells = pages.get(page)
+            if cells is None:
+                cells = pages[page] = bytearray(min(PAGE, self.m - page * PAGE))
+            cells[offset] |= bit
+
+    def mask(self, text: str) -> int:
+        """句子（可能）出现过的语料位掩码（盘上的格子加上本进程还没写回的）。"""
+        cells = self._disk_cells()
+        pages = self._pages
+        mask = 0xFF
+        for pos in self._positions(text):
+            cell = 0 if cells is None else cells[pos]
+            if pages:
+                page = pages.get(pos // PAGE)
+                if page is not None:
+                    cell |= page[pos % PAGE]
+            mask &= cell
+            if not mask:
+                break
+        return mask
+
+    def corpora_of(self, text: str) -> List[str]:
+        mask = self.mask(text)
+        return [name for i, name in enumerate(self.corpora) if mask >> i & 1]
+
+    def seen_elsewhere(self, text: str, corpus: str) -> bool:
+        """句子是否（几乎肯定）出现在 corpus 以外的语料里。"""
+        return bool(self.mask(text) & ~self.corpus_bit(corpus, register=False))
+
+    def seen_earlier(self, text: str, corpus: str) -> bool:
+        """句子是否（几乎肯定）出现在位比 corpus 低的语料里；corpus 没登记时算排在最后。"""
+        bit = self.corpus_bit(corpus, register=False)
+        return bool(self.mask(text) & (bit - 1 if bit else 0xFF))
+
+
+def _corpus_name(path: str) -> str:
+    return os.path.basename(path)
+
+
+def register_lines(lines: Iterable[str], bloom_file: Union[str, CorpusBloom, None], out_path: str,
+                   capacity: Optional[int] = None, fp_rate: Optional[float] = None) -> Iterable[str]:
+    """
+    原样转发 merged.tsv 的行，同时把每行的 xx 句子登记进 bloom_file（语料名取 out_path 的文件名）；
+    行全部转发完后写回 .bloom 文件。bloom_file 为 None 时直接返回 lines。
+    bloom_file 还不存在时按 capacity / fp_rate 新建（见 CorpusBloom.open）。
+    bloom_file 也可以是已经打开的 CorpusBloom（调用方要在中途 save() 时用，如存断点前）。
+    """
+    if not bloom_file:
+        return lines
+    bloom = bloom_file if isinstance(bloom_file, CorpusBloom) else CorpusBloom.open(bloom_file, capacity, fp_rate)
+    return _register(lines, bloom, _corpus_name(out_path))
+
+
+def _register(lines: Iterable[str], bloom: CorpusBloom, corpus: str) -> Iterator[str]:
+    bit = bloom.corpus_bit(corpus)
+    for line in lines:
+        row = next(csv.reader([line], delimiter="\t"), [])
+        if len(row) >= 3:
+            bloom.add_bit(row[2], bit)
+        yield line
+    bloom.save()
+    print(f"[INFO] 已把 {corpus} 登记到 {bloom.path}")
+
+
+def cross_corpus_filter(process_line: ProcessLine, bloom_file: Optional[str], input_tsv: str,
+                        rules=None) -> ProcessLine:
+    """
+    包一层 process_line：row[2]（xx 句子）出现在本语言位更低（登记得更早）的语料里时直接跳过，
+    所以跨语料重复的句子只在位最低的语料里留一份。
+    语料名取 input_tsv 的文件名，和原始合并脚本写出的 *.merged.tsv 对应。bloom_file 为 None 时原样返回。
+    rules（xbench.rule_stats.RuleStats）不为 None 时，这一步记作规则 "cross_corpus"。
+    """
+    if not bloom_file:
+        return process_line
+    if not os.path.isfile(bloom_file):
+        print(f"[WARN] 找不到 {bloom_file}，跳过跨语料去重（先跑各语料的原始合并脚本）")
+        return process_line
+    bloom = CorpusBloom.open(bloom_file)
+    corpus = _corpus_name(input_tsv)
+    if corpus not in bloom.corpora:
+        print(f"[WARN] {bloom_file} 里没有登记 {corpus}，它出现在别的语料里的句子全部拒绝，别的语料不会避开它的句子")
+
+    def filtered(row, candidates, seen):
+        earlier = len(row) >= 3 and bloom.seen_earlier(row[2], corpus)
+        if rules is not None:
+            rules.step("cross_corpus", not earlier)
+        if earlier:
+            return
+        process_line(row, candidates, seen)
+
+    return filtered
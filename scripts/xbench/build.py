@@ -0,0 +1,541 @@
+# -*- coding: utf-8 -*-
+
+"""
+构建流程的依赖图和并行执行器（tools/build.py 用）。
+
+每门语言的构建是一张小图：每个语料一条链「原始合并脚本 -> 抽样脚本」，各条链互不依赖，
+全部抽样完成后才跑 <lang>_merge.py：
+
+    bn/bn_TED -> bn/bn_TED_250 ──┐
+    bn/bn_QED -> bn/bn_QED_250 ──┼──> bn/bn_merge
+    ...                          ┘
+
+一门语言的脚本设了 BLOOM_FILE（跨语料去重，见 xbench.bloom）时，抽样要等本语言所有原始合并都登记完
+才能开始，否则拒绝哪些句子取决于 --jobs 和先后；这时每个抽样依赖本语言的全部原始合并
+（原始合并之间仍然并行，它们写同一个 .bloom 有文件锁）。
+本语言第一个原始合并启动前，先按 PIPELINES 的顺序把各语料登记进 .bloom（register_bloom_corpora），
+各语料的位因此是固定的：跨语料重复的句子只留在排在最前面的语料里，和原始合并的并行先后无关。
+
+run_graph 用 jobs 个工作进程执行这张图：依赖都完成的节点立刻开始（抽样优先于新的原始合并，
+语言合并优先于一切，尽早把一门语言做完）。stdout / stderr 写到 <log_dir>/<lang>/<脚本>.log。
+任何一个节点失败就停止：不再启动新节点，打印失败节点日志的最后几行。
+
+默认在进程池里直接调用各脚本的入口函数（run_stage：merge_parallel / sample_from_merged /
+sample_hu_only / main / merge_and_clean），工作进程跨节点复用：xbench 只导入一次，
+清洗正则、字母表、合并配置（get_profile / merge_filter）也只编译一次，省掉每个脚本一次的解释器启动。
+isolate 时每个节点是一个子进程 `python scripts/<lang>/<脚本>.py`（和原来的 shell 脚本一样），
+失败时正在跑的子进程被终止；进程内执行时正在跑的节点会跑完。
+
+每个执行过的节点还记下墙钟时间、CPU、峰值 RSS、读写字节和行数（NodeResult.perf，见 xbench.build_perf）。
+
+给了 BuildState（见 xbench.build_state）时是增量构建：节点开始前先比较它的代码、参数和输入输出文件
+（stage_spec 从脚本的路径常量里读出来）和上次成功时的记录，都没变就跳过，否则打印重跑的原因。
+
+resume 时原始合并和抽样脚本带 --resume 执行（进程内执行时是把脚本的 RESUME 设成 True）：
+上次被杀掉的节点从它留下的 <输出>.ckpt 接着跑（见 xbench.checkpoint）。
+"""
+
+import glob
+import hashlib
+import heapq
+import os
+import subprocess
+import sys
+import threading
+import time
+import types
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from .bloom import CorpusBloom
+from .build_perf import child_usage, input_bytes, measure, output_stats
+from .build_state import BuildState
+from .merge_engine import SCRIPTS_DIR
+
+PLACEHOLDER = "<PATH_TO_XBENCH_ROOT>"
+
+# 每门语言的 (原始合并脚本, 抽样脚本)，顺序和原来的 tools/build_one_lang.sh 相同
+PIPELINES: Dict[str, List[Tuple[str, str]]] = {
+    "bn": [
+        ("bn_Opensubtitles", "bn_Opensubtitle_250"),
+        ("bn_TED", "bn_TED_250"),
+        ("bn_QED", "bn_QED_250"),
+        ("bn_Tanzil", "bn_Tanzil_250"),
+        ("bn_wikimatrix", "bn_wikimatrix_250"),
+    ],
+    "fa": [
+        ("fa_TED", "fa_TED_250"),
+        ("fa_QED", "fa_QED_250"),
+        ("fa_Tanzil", "fa_Tanzil_250"),
+        ("fa_wikimatrix", "fa_wikimatrix_250"),
+        ("fa_TEP", "fa_TEP_250"),
+    ],
+    "hu": [
+        ("hu_opensubtitles", "hu_opensubtitle_200"),
+        ("hu_TED", "hu_TED_200"),
+        ("hu_QED", "hu_QED_200"),
+        ("hu_wikimatrix", "hu_wikimatrix_200"),
+        ("hu_Eurparl", "hu_Europarl_200"),
+        ("hu_wmt_news", "hu_wmt_200"),
+    ],
+    "id": [
+        ("id_Opensubtitle", "id_Opensubtitle_250"),
+        ("id_TED", "id_TED_250"),
+        ("id_QED", "id_QED_250"),
+        ("id_Tanzil", "id_Tanzil_250"),
+        ("id_wikimatrix", "id_wikimatrix_250"),
+    ],
+    "ms": [
+        ("ms_opensubtitle", "ms_opensubtitle_250"),
+        ("ms_TED", "ms_TED_250"),
+        ("ms_QED", "ms_QED_250"),
+        ("ms_Tanzil", "ms_Tanzil_250"),
+        ("ms_wikimedia", "ms_wikimedia_250"),
+    ],
+    "ur": [
+        ("ur_opensubtitle", "ur_opensubtitles_250"),
+        ("ur_TED", "ur_TED_250"),
+        ("ur_QED", "ur_QED_250"),
+        ("ur_Tanzil", "ur_Tanzil_250"),
+        ("ur_wikimedia", "ur_wikimedia_250"),
+    ],
+}
+LANGS = list(PIPELINES)
+
+# 节点类型；同时就绪时先启动排在后面的类型
+KINDS = ("corpus_merge", "sample", "lang_merge")
+
+# 失败时打印的日志行数
+LOG_TAIL = 20
+
+# 脚本里的输出路径常量；其余以 _FILE / _TSV 结尾的路径常量（以及 INPUT_FILES / FILES）算输入
+OUTPUT_CONSTANTS = ("OUT_FILE", "OUTPUT_FILE", "OUTPUT_TSV")
+NOT_INPUTS = ("DEBUG_MERGED_TSV",)
+
+# 原始合并共同写的文件（本语言共用的 .bloom）：对原始合并来说不是输入，而是共享输出，
+# 只检查它还在不在，不比指纹（别的语料的原始合并也会改它）；对抽样仍是输入
+SHARED_OUTPUTS = ("BLOOM_FILE",)
+
+# 抽样脚本只读一种行来源：FROM_MOSES 时是 Moses 两侧文件（EN_FILE / <XX>_FILE / ZIP_FILE），否则是 MERGED_INPUT；
+# SAMPLE_INPUTS 两种情况都读
+MERGED_INPUT = "INPUT_TSV"
+SAMPLE_INPUTS = ("BLOOM_FILE",)
+
+
+class Node:
+    """图里的一个节点：一个脚本，以及必须先完成的节点名。"""
+
+    def __init__(self, name: str, lang: str, kind: str, script: str, deps: List[str]):
+        self.name = name
+        self.lang = lang
+        self.kind = kind
+        self.script = script
+        self.deps = deps
+
+    def __repr__(self) -> str:
+        return f"Node({self.name!r}, deps={self.deps!r})"
+
+
+class NodeResult:
+    """一个节点的执行结果；status 是 ok / skipped（没有变化）/ failed / cancelled（因别的节点失败被终止）。"""
+
+    def __init__(self, name: str, status: str, seconds: float, returncode: Optional[int], log: str,
+                 usage: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.status = status
+        self.seconds = seconds
+        self.returncode = returncode
+        self.log = log
+        self.usage = usage or {}  # wall_s / user_s / sys_s / peak_rss（见 xbench.build_perf）
+        self.perf: Optional[Dict[str, Any]] = None  # run_graph 补上字节和行数后的性能记录
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("ok", "skipped")
+
+
+def build_graph(langs: List[str] = LANGS, scripts_dir: str = SCRIPTS_DIR) -> Dict[str, Node]:
+    """langs 的构建图 {节点名: Node}，节点名形如 bn/bn_TED；按拓扑顺序排列（依赖总在前面）。"""
+    nodes: Dict[str, Node] = {}
+    for lang in langs:
+        if lang not in PIPELINES:
+            raise ValueError(f"没有 {lang} 的构建流程（可选 {' / '.join(LANGS)}）")
+        merges = [_add(nodes, lang, "corpus_merge", merge_stem, [], scripts_dir) for merge_stem, _ in PIPELINES[lang]]
+        shared_bloom = any(_uses_bloom(node.script) for node in merges) or any(
+            _uses_bloom(os.path.join(scripts_dir, lang, sample_stem + ".py")) for _, sample_stem in PIPELINES[lang])
+        samples = []
+        for merge, (_, sample_stem) in zip(merges, PIPELINES[lang]):
+            deps = [m.name for m in merges] if shared_bloom else [merge.name]
+            samples.append(_add(nodes, lang, "sample", sample_stem, deps, scripts_dir).name)
+        _add(nodes, lang, "lang_merge", f"{lang}_merge", samples, scripts_dir)
+    return nodes
+
+
+def _uses_bloom(script: str) -> bool:
+    """脚本是否设了 BLOOM_FILE；读不出脚本时当作没设（错误留给它自己执行时报）。"""
+    try:
+        return bool(getattr(load_script(script), "BLOOM_FILE", None))
+    except Exception:
+        return False
+
+
+def _add(nodes: Dict[str, Node], lang: str, kind: str, stem: str, deps: List[str], scripts_dir: str) -> Node:
+    node = Node(f"{lang}/{stem}", lang, kind, os.path.join(scripts_dir, lang, stem + ".py"), deps)
+    nodes[node.name] = node
+    return node
+
+
+def with_root(source: str, root: str) -> str:
+    """把脚本源码里的 <PATH_TO_XBENCH_ROOT> 换成 root；POSIX 上这些行里的反斜杠也换成 /。"""
+    lines = []
+    for line in source.splitlines(keepends=True):
+        if PLACEHOLDER in line:
+            line = line.replace(PLACEHOLDER, root)
+            if os.sep == "/":
+                line = line.replace("\\", "/")
+        lines.append(line)
+    return "".join(lines)
+
+
+def _compile_script(path: str, root: Optional[str]):
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    if root:
+        source = with_root(source, root)
+    return compile(source, path, "exec")
+
+
+@contextmanager
+def _restored_sys_path():
+    # 每个脚本开头都 sys.path.insert(0, …/scripts)；同一个进程里反复加载 / 执行脚本时执行完还原，
+    # 否则每个节点都往 sys.path 前面再加一份（脚本的 import 都在顶层，执行完就不再需要它）
+    saved = list(sys.path)
+    try:
+        yield
+    finally:
+        sys.path[:] = saved
+
+
+def exec_script(path: str, root: Optional[str] = None, args: Optional[List[str]] = None):
+    """像 `python path args...` 一样执行一个构建脚本；给了 root 时先替换路径占位符（不改动磁盘上的脚本）。"""
+    sys.argv = [path, *(args or [])]
+    with _restored_sys_path():
+        exec(_compile_script(path, root), {"__name__": "__main__", "__file__": path, "__builtins__": __builtins__})
+
+
+def load_script(path: str, root: Optional[str] = None) -> types.ModuleType:
+    """把构建脚本当模块加载（不执行 __main__ 部分），用来读它的路径常量。"""
+    module = types.ModuleType(os.path.basename(path)[:-3])
+    module.__file__ = path
+    with _restored_sys_path():
+        exec(_compile_script(path, root), module.__dict__)
+    return module
+
+
+def stage_files(module: types.ModuleType, kind: str = "sample") -> Tuple[List[str], List[str], List[str]]:
+    """
+    脚本的 (输入文件, 输出文件, 共享输出文件)，按路径常量推断；值为 None 的常量（没开的功能）不算。
+    抽样脚本只算实际读的行来源（见 MERGED_INPUT）；共享输出只有原始合并有（SHARED_OUTPUTS）。
+    """
+    outputs = [getattr(module, name) for name in OUTPUT_CONSTANTS if isinstance(getattr(module, name, None), str)]
+    shared_names = SHARED_OUTPUTS if kind == "corpus_merge" else ()
+    shared = [getattr(module, name) for name in shared_names if isinstance(getattr(module, name, None), str)]
+    if hasattr(module, "INPUT_FILES"):
+        inputs = list(module.INPUT_FILES)
+    elif hasattr(module, "FILES"):
+        inputs = [os.path.join(module.BASE_DIR, name) for name in module.FILES]
+    else:
+        names = [
+            name for name, value in vars(module).items()
+            if name.endswith(("_FILE", "_TSV")) and isinstance(value, str)
+            and name not in OUTPUT_CONSTANTS and name not in NOT_INPUTS and name not in shared_names
+        ]
+        if kind == "sample":  # 和 run_stage 一样按 FROM_MOSES 选行来源
+            if getattr(module, "FROM_MOSES", False):
+                names = [name for name in names if name != MERGED_INPUT]
+            else:
+                names = [name for name in names if name == MERGED_INPUT or name in SAMPLE_INPUTS]
+        inputs = [getattr(module, name) for name in names]
+    return list(dict.fromkeys(inputs)), list(dict.fromkeys(outputs)), list(dict.fromkeys(shared))
+
+
+def _digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def library_digests() -> Tuple[Tuple[str, str], ...]:
+    """xbench 各模块源码的哈希（构建工具本身除外）：改了过滤 / 抽样代码，所有节点都要重跑。"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return tuple(
+        (os.path.relpath(path, SCRIPTS_DIR), _digest(path))
+        for path in sorted(glob.glob(os.path.join(here, "*.py")))
+        if not os.path.basename(path).startswith("build")
+    )
+
+
+def stage_spec(node: Node, root: Optional[str] = None
+               ) -> Tuple[Dict[str, str], Dict[str, Any], List[str], List[str], List[str]]:
+    """
+    节点的 (代码指纹, 参数, 输入文件, 输出文件, 共享输出文件)，交给 BuildState 比较。
+    抽样脚本（MERGE_FILTER）读 <lang>_merge.py 的阈值，所以它也算抽样节点的代码。
+    """
+    scripts = [node.script]
+    if node.kind == "sample":
+        scripts.append(os.path.join(os.path.dirname(node.script), f"{node.lang}_merge.py"))
+    code = {os.path.relpath(path, SCRIPTS_DIR): _digest(path) for path in scripts}
+    code.update(library_digests())
+    inputs, outputs, shared = stage_files(load_script(node.script, root), node.kind)
+    return code, {"root": root}, inputs, outputs, shared
+
+
+def register_bloom_corpora(lang: str, scripts_dir: str = SCRIPTS_DIR, root: Optional[str] = None):
+    """
+    按 PIPELINES 的顺序把 lang 各原始合并的语料（OUT_FILE 的文件名）登记进它们的 BLOOM_FILE，
+    这样语料的位（跨语料重复的句子留在哪个语料里）不取决于原始合并谁先开始写。读不出的脚本跳过。
+    文件还不存在时按第一个用它的原始合并的 BLOOM_CAPACITY / BLOOM_FP_RATE 新建。
+    """
+    blooms: Dict[str, List[str]] = {}
+    sizes: Dict[str, Tuple[Optional[int], Optional[float]]] = {}
+    for merge_stem, _ in PIPELINES[lang]:
+        try:
+            module = load_script(os.path.join(scripts_dir, lang, merge_stem + ".py"), root)
+        except Exception:
+            continue
+        bloom_file = getattr(module, "BLOOM_FILE", None)
+        if bloom_file and isinstance(getattr(module, "OUT_FILE", None), str):
+            blooms.setdefault(bloom_file, []).append(os.path.basename(module.OUT_FILE))
+            sizes.setdefault(bloom_file, (getattr(module, "BLOOM_CAPACITY", None), getattr(module, "BLOOM_FP_RATE", None)))
+    for bloom_file, corpora in blooms.items():
+        CorpusBloom.register_corpora(bloom_file, corpora, *sizes[bloom_file])
+
+
+def run_stage(node: Node, module: types.ModuleType):
+    """
+    调用脚本的入口函数，参数和脚本的 `if __name__ == "__main__":` 部分相同：
+      原始合并：merge_parallel(EN_FILE, <XX>_FILE, OUT_FILE, ZIP_FILE, BLOOM_FILE)
+      抽样：FROM_MOSES 时 sample_from_moses(...)，否则 sample_from_merged / sample_hu_only(INPUT_TSV, OUTPUT_TSV)
+      语言合并：main() / merge_and_clean()
+    """
+    m = module
+    if node.kind == "corpus_merge":
+        m.merge_parallel(m.EN_FILE, getattr(m, f"{node.lang.upper()}_FILE"), m.OUT_FILE, m.ZIP_FILE, m.BLOOM_FILE)
+    elif node.kind == "sample":
+        if m.FROM_MOSES:
+            if getattr(m, "REJOIN_EN", False):
+                print("[WARN] REJOIN_EN 需要 *.merged.tsv 的行偏移索引，FROM_MOSES 模式下忽略")
+            m.sample_from_moses(m.EN_FILE, getattr(m, f"{node.lang.upper()}_FILE"), m.OUTPUT_TSV, m.ZIP_FILE,
+                                m.DEBUG_MERGED_TSV)
+        else:
+            (getattr(m, "sample_from_merged", None) or m.sample_hu_only)(m.INPUT_TSV, m.OUTPUT_TSV)
+    else:
+        (getattr(m, "main", None) or m.merge_and_clean)()
+
+
+def run_in_process(node: Node, root: Optional[str], log: str, trace_python: bool = False,
+                   resume: bool = False) -> NodeResult:
+    """在当前进程里执行一个节点（进程池的工作进程调用），输出和异常都写进 log；resume 时从断点续跑。"""
+    os.makedirs(os.path.dirname(log), exist_ok=True)
+    status = "ok"
+    with open(log, "w", encoding="utf-8") as f, redirect_stdout(f), redirect_stderr(f):
+        print(f"+ run_stage({node.script})", flush=True)
+        with measure(trace_python) as usage:
+            try:
+                module = load_script(node.script, root)
+                if resume and hasattr(module, "RESUME"):
+                    module.RESUME = True
+                run_stage(node, module)
+            except (Exception, SystemExit):
+                traceback.print_exc()
+                status = "failed"
+    return NodeResult(node.name, status, usage["wall_s"], 0 if status == "ok" else 1, log, usage)
+
+
+def node_command(node: Node, root: Optional[str] = None, resume: bool = False) -> List[str]:
+    """执行节点的命令行；给了 root 时经由 `python -m xbench.build` 替换占位符，resume 时加 --resume。"""
+    args = ["--resume"] if resume and node.kind != "lang_merge" else []
+    if root:
+        return [sys.executable, "-m", "xbench.build", node.script, root, *args]
+    return [sys.executable, node.script, *args]
+
+
+def log_path(log_dir: str, node: Node) -> str:
+    return os.path.join(log_dir, node.lang, os.path.basename(node.script)[:-3] + ".log")
+
+
+def tail(path: str, lines: int = LOG_TAIL) -> List[str]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read().splitlines()[-lines:]
+
+
+class _Processes:
+    """正在运行的子进程；失败时 stop() 终止它们，之后也不再启动新的。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running: Dict[str, subprocess.Popen] = {}
+        self.stopped = False
+
+    def run(self, node: Node, cmd: List[str], log: str) -> NodeResult:
+        os.makedirs(os.path.dirname(log), exist_ok=True)
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [SCRIPTS_DIR, env.get("PYTHONPATH")]))
+        t0 = time.perf_counter()
+        with open(log, "w", encoding="utf-8") as f:
+            f.write("+ " + " ".join(cmd) + "\n")
+            f.flush()
+            with self._lock:
+                if self.stopped:
+                    return NodeResult(node.name, "cancelled", 0.0, None, log)
+                proc = subprocess.Popen(cmd, stdout=f, stderr=subprocess.STDOUT, env=env,
+                                        cwd=os.path.dirname(SCRIPTS_DIR))
+                self._running[node.name] = proc
+            usage = None
+            if hasattr(os, "wait4"):
+                # wait4 顺带给出这个子进程（含它的子进程）的 CPU 和峰值 RSS
+                _, wait_status, rusage = os.wait4(proc.pid, 0)
+                returncode = proc.returncode = os.waitstatus_to_exitcode(wait_status)
+                usage = child_usage(rusage, time.perf_counter() - t0)
+            else:
+                returncode = proc.wait()
+            with self._lock:
+                del self._running[node.name]
+                stopped = self.stopped
+        status = "ok" if returncode == 0 else ("cancelled" if stopped and returncode < 0 else "failed")
+        return NodeResult(node.name, status, time.perf_counter() - t0, returncode, log, usage)
+
+    def stop(self):
+        with self._lock:
+            self.stopped = True
+            for proc in self._running.values():
+                proc.terminate()
+
+
+def run_graph(nodes: Dict[str, Node], jobs: int = 1, log_dir: str = "build_logs",
+              root: Optional[str] = None, state: Optional[BuildState] = None,
+              force: bool = False, isolate: bool = False, trace_python: bool = False,
+              resume: bool = False, verbose: bool = True) -> Dict[str, NodeResult]:
+    """
+    按依赖关系执行 nodes，最多同时 jobs 个；返回已经开始过的节点的结果（按完成顺序）。
+    第一个失败的节点出现后不再启动新节点；isolate 时正在跑的子进程被终止（status 为 cancelled）。
+    state 不为 None 时跳过没有变化的节点（status 为 skipped），成功的节点记下新的指纹；
+    force 时照样全部重跑（并更新记录）。
+    执行过的节点的 NodeResult.perf 是它的性能记录；trace_python 时（只用于进程内执行）另记 Python 对象峰值。
+    resume 时有断点的节点从断点续跑（见 xbench.checkpoint）。
+    每门语言第一个要执行的原始合并启动前，先按 PIPELINES 的顺序登记本语言的 Bloom 语料（register_bloom_corpora）。
+    """
+    order = {name: i for i, name in enumerate(nodes)}
+    pending = {name: {dep for dep in node.deps if dep in nodes} for name, node in nodes.items()}
+    dependents: Dict[str, List[str]] = {name: [] for name in nodes}
+    for name, deps in pending.items():
+        for dep in deps:
+            dependents[dep].append(name)
+
+    ready: List[Tuple[int, int, str]] = []
+
+    def release(name: str):
+        heapq.heappush(ready, (-KINDS.index(nodes[name].kind), order[name], name))
+
+    for name, deps in pending.items():
+        if not deps:
+            release(name)
+
+    def finished(name: str):
+        for child in dependents[name]:
+            pending[child].discard(name)
+            if not pending[child]:
+                release(child)
+
+    procs = _Processes()
+    pool: Executor = ThreadPoolExecutor(max_workers=jobs) if isolate else ProcessPoolExecutor(max_workers=jobs)
+
+    def submit(node: Node) -> Future:
+        if isolate:
+            return pool.submit(procs.run, node, node_command(node, root, resume), log_path(log_dir, node))
+        return pool.submit(run_in_process, node, root, log_path(log_dir, node), trace_python, resume)
+
+    results: Dict[str, NodeResult] = {}
+    running: Dict[Future, str] = {}
+    specs: Dict[str, Tuple] = {}
+    bytes_in: Dict[str, int] = {}
+    registered = set()
+    failed: Optional[NodeResult] = None
+    with pool:
+        while ready or running:
+            while ready and len(running) < jobs and failed is None:
+                _, _, name = heapq.heappop(ready)
+                node = nodes[name]
+                reason = "--force" if force else None
+                try:
+                    specs[name] = stage_spec(node, root)
+                except Exception as e:  # 脚本读不出来就照常执行，错误留给它自己的日志
+                    reason = f"读不出脚本的输入输出（{e}）"
+                if state is not None:
+                    if name in specs:
+                        reason = reason or state.why(name, *specs[name])
+                    if reason is None:
+                        state.refresh(name)
+                        results[name] = NodeResult(name, "skipped", 0.0, None, log_path(log_dir, node))
+                        if verbose:
+                            print(f"[SKIP] {name}：没有变化", flush=True)
+                        finished(name)
+                        continue
+                if verbose:
+                    print(f"[START] {name}" + (f"：{reason}" if reason else ""), flush=True)
+                if node.kind == "corpus_merge" and node.lang not in registered:
+                    registered.add(node.lang)
+                    register_bloom_corpora(node.lang, os.path.dirname(os.path.dirname(node.script)), root)
+                if name in specs:
+                    bytes_in[name] = input_bytes(specs[name][2])
+                running[submit(node)] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result = results[name] = future.result()
+                result.perf = _perf_record(nodes[name], result, bytes_in.get(name), specs.get(name))
+                if verbose:
+                    print(f"[{'OK' if result.ok else result.status.upper()}] {name} ({result.seconds:.2f}s)", flush=True)
+                if state is not None:
+                    if result.ok and name in specs:
+                        state.record(name, *specs[name])
+                    else:
+                        state.forget(name)
+                if result.ok:
+                    finished(name)
+                elif failed is None and result.status == "failed":
+                    failed = result
+                    procs.stop()
+
+    if failed is not None and verbose:
+        print(f"[FAIL] {failed.name} 退出码 {failed.returncode}，日志：{failed.log}")
+        for line in tail(failed.log):
+            print("    " + line)
+    return results
+
+
+def _perf_record(node: Node, result: NodeResult, bytes_in: Optional[int], spec: Optional[Tuple]) -> Dict[str, Any]:
+    record: Dict[str, Any] = {"stage": node.name, "lang": node.lang, "kind": node.kind, "status": result.status,
+                              "wall_s": result.seconds, "user_s": None, "sys_s": None, "peak_rss": None}
+    record.update(result.usage)
+    record["bytes_in"] = bytes_in
+    if spec and result.ok:
+        record.update(output_stats(node.kind, spec[3]))
+    else:  # 失败 / 被终止的节点：输出可能只写了一半，或是上一次构建留下的，不统计
+        record.update({"bytes_out": None, "rows_in": None, "rows_out": None})
+    for key in ("wall_s", "user_s", "sys_s"):
+        if record[key] is not None:
+            record[key] = round(record[key], 3)
+    return record
+
+
+if __name__ == "__main__":
+    # 子进程入口：python -m xbench.build <脚本> [root] [--resume]
+    positional = [arg for arg in sys.argv[1:] if arg != "--resume"]
+    exec_script(positional[0], positional[1] if len(positional) > 1 else None,
+                ["--resume"] if "--resume" in sys.argv[1:] else [])
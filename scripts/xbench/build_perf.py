@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+"""
+构建的性能报告：每个节点的墙钟时间、用户 / 系统 CPU、峰值 RSS、读写字节数和行数，
+写成 JSON（机器读、和上一次构建比较）和一张按耗时排序的文本表。
+
+  - CPU：进程内执行时是 getrusage(RUSAGE_SELF + RUSAGE_CHILDREN) 在节点前后的差
+    （节点里 JOBS > 1 的子进程也算进去）；子进程执行（isolate）时是 os.wait4 返回的子进程用量；
+  - 峰值 RSS：Linux 上节点开始前写 /proc/self/clear_refs 把高水位清零，结束后读 VmHWM，
+    所以同一个工作进程里的每个节点各算各的；其它系统上只有 ru_maxrss，是工作进程到目前为止的最高值，不是这个节点的，
+    记录里另加 peak_rss_cumulative: true，表里的数字后面标 *；Windows 上没有这两项；
+    进程内执行、节点里 JOBS > 1 时，进程池子进程的内存不在 peak_rss 里（RUSAGE_CHILDREN 的 ru_maxrss
+    是单个子进程的最高值，和节点对不上，不计），这时的 peak_rss 只是工作进程自己的；要看全部请用 isolate；
+  - trace_python 时另用 tracemalloc 记下节点里 Python 对象的峰值（会让节点变慢，默认关）；
+  - 字节：节点的输入文件（开始前）和输出文件（结束后）的大小之和；
+  - 行数：输出是输出 TSV 的数据行数（原始合并的 *.merged.tsv 可能有几 GB，只数换行）；输入取节点自己写的 <输出>.rules.json 里的 rows，
+    原始合并每个句对正好一行，输入行数就等于输出行数。
+没成功的节点（status 是 failed / cancelled）不统计输出（bytes_out / rows_in / rows_out 为 None），
+也不和上一次比较耗时：只有这次和上一次都是 ok 的节点才有 vs_last。
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows 上没有 resource，CPU / RSS 记为 None
+    resource = None
+
+# 计数行数时每次读的字节数
+COUNT_BLOCK = 1 << 20
+
+# ru_maxrss 的单位：macOS 是字节，Linux 等是 KB
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+MB = 1 << 20
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss(per_stage: bool) -> Optional[int]:
+    if per_stage:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+def _cpu() -> List[Optional[float]]:
+    if resource is None:
+        return [None, None]
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return [own.ru_utime + children.ru_utime, own.ru_stime + children.ru_stime]
+
+
+@contextmanager
+def measure(trace_python: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    在当前进程里量一段代码：结束时往产出的 dict 里填 wall_s / user_s / sys_s / peak_rss（/ py_peak）；
+    高水位清不了零时 peak_rss 是进程到目前为止的最高值，另填 peak_rss_cumulative = True。
+    """
+    usage: Dict[str, Any] = {}
+    per_stage = _reset_peak_rss()
+    if trace_python:
+        tracemalloc.start()
+    user0, sys0 = _cpu()
+    t0 = time.perf_counter()
+    try:
+        yield usage
+    finally:
+        user1, sys1 = _cpu()
+        usage["wall_s"] = time.perf_counter() - t0
+        usage["user_s"] = None if user0 is None else user1 - user0
+        usage["sys_s"] = None if sys0 is None else sys1 - sys0
+        usage["peak_rss"] = _peak_rss(per_stage)
+        if usage["peak_rss"] is not None and not per_stage:
+            usage["peak_rss_cumulative"] = True
+        if trace_python:
+            usage["py_peak"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+
+def child_usage(rusage, wall_s: float) -> Dict[str, Any]:
+    """os.wait4 返回的子进程用量。"""
+    return {
+        "wall_s": wall_s,
+        "user_s": rusage.ru_utime,
+        "sys_s": rusage.ru_stime,
+        "peak_rss": rusage.ru_maxrss * _MAXRSS_UNIT,
+    }
+
+
+def count_lines(path: str) -> int:
+    """按换行数数 TSV 的数据行数（首行以 id 开头时当表头不算）；原始合并逐行写出的 *.merged.tsv 用，不解析 CSV。"""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        head = f.read(2)
+        f.seek(0)
+        for block in iter(lambda: f.read(COUNT_BLOCK), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(0, lines - (1 if head.lower() == b"id" else 0))
+
+
+def count_rows(path: str) -> int:
+    """按 CSV 解析数 TSV 的数据行数（字段里可以有引号括起来的换行）；抽样结果、合并结果这些小文件用。"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, delimiter="\t")
+        first = next(reader, None)
+        if first is None:
+            return 0
+        return sum(1 for _ in reader) + (0 if first and first[0].lower().startswith("id") else 1)
+
+
+def _file_bytes(paths: List[str]) -> int:
+    return sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+
+
+def _report_rows(outputs: List[str]) -> Optional[int]:
+    rows = None
+    for path in outputs:
+        report = path + ".rules.json"
+        if os.path.isfile(report):
+            with open(report, "r", encoding="utf-8") as f:
+                corpora = json.load(f)["corpora"]
+            rows = (rows or 0) + sum(c["rows"] for c in corpora.values())
+    return rows
+
+
+def input_bytes(inputs: List[str]) -> int:
+    return _file_bytes(inputs)
+
+
+def output_stats(kind: str, outputs: List[str]) -> Dict[str, Any]:
+    """节点结束后的 bytes_out / rows_in / rows_out。"""
+    existing = [p for p in outputs if os.path.isfile(p)]
+    count = count_lines if kind == "corpus_merge" else count_rows
+    rows_out = sum(count(p) for p in existing)
+    rows_in = rows_out if kind == "corpus_merge" else _report_rows(existing)
+    return {"bytes_out": _file_bytes(existing), "rows_in": rows_in, "rows_out": rows_out}
+
+
+def _mb(n: Optional[int]) -> str:
+    return "-" if n is None else f"{n / MB:.1f}"
+
+
+def _rss(s: Dict[str, Any]) -> str:
+    """峰值 RSS 一栏；不是节点自己的（进程到目前为止的最高值）时后面标 *。"""
+    return _mb(s.get("peak_rss")) + ("*" if s.get("peak_rss_cumulative") else "")
+
+
+def _s(x: Optional[float]) -> str:
+    return "-" if x is None else f"{x:.2f}"
+
+
+def _languages(stages: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    langs: Dict[str, Dict[str, Any]] = {}
+    for s in stages:
+        total = langs.setdefault(s["lang"], {"stages": 0, "wall_s": 0.0, "user_s": 0.0, "sys_s": 0.0,
+                                             "peak_rss": 0, "bytes_in": 0, "bytes_out": 0})
+        total["stages"] += 1
+        if s.get("peak_rss_cumulative"):
+            total["peak_rss_cumulative"] = True
+        for key in ("wall_s", "user_s", "sys_s", "bytes_in", "bytes_out"):
+            total[key] += s.get(key) or 0
+        total["peak_rss"] = max(total["peak_rss"], s.get("peak_rss") or 0)
+    return langs
+
+
+def _compared(s: Dict[str, Any], last: Optional[Dict[str, Any]]) -> str:
+    """vs_last 一栏：两次都跑完（status 为 ok）才比较；跳过的节点只查了指纹，失败的没跑完，耗时都没有可比性。"""
+    if not last or not last.get("wall_s") or s.get("status", "ok") != "ok" or last.get("status", "ok") != "ok":
+        return "-"
+    return f"{(s['wall_s'] / last['wall_s'] - 1) * 100:+.0f}%"
+
+
+def _count(n: Optional[int]) -> str:
+    return "-" if n is None else str(n)
+
+
+def format_table(stages: List[Dict[str, Any]], previous: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """按墙钟时间从长到短排列的文本表；previous 是上一次报告里的 {节点名: 记录}，给出耗时变化。"""
+    previous = previous or {}
+    traced = any("py_peak" in s for s in stages)
+    header = ["stage", "status", "wall_s", "vs_last", "user_s", "sys_s", "rss_mb", *(["py_mb"] if traced else []),
+              "in_mb", "out_mb", "rows_in", "rows_out"]
+    rows = [header]
+    for s in sorted(stages, key=lambda s: -s["wall_s"]):
+        rows.append([
+            s["stage"], s.get("status", "ok"), _s(s["wall_s"]), _compared(s, previous.get(s["stage"])),
+            _s(s.get("user_s")), _s(s.get("sys_s")), _rss(s), *([_mb(s.get("py_peak"))] if traced else []),
+            _mb(s.get("bytes_in")), _mb(s.get("bytes_out")), _count(s.get("rows_in")), _count(s.get("rows_out")),
+        ])
+    for lang, t in sorted(_languages(stages).items(), key=lambda kv: -kv[1]["wall_s"]):
+        rows.append([f"{lang} (total)", "", _s(t["wall_s"]), "", _s(t["user_s"]), _s(t["sys_s"]),
+                     _rss(t), *([""] if traced else []), _mb(t["bytes_in"]), _mb(t["bytes_out"]), "", ""])
+    widths = [max(len(r[i]) for r in rows) for i in range(len(header))]
+    table = "\n".join(
+        "  ".join(cell.ljust(w) if i == 0 else cell.rjust(w) for i, (cell, w) in enumerate(zip(r, widths))).rstrip()
+        for r in rows
+    ) + "\n"
+    if any(s.get("peak_rss_cumulative") for s in stages):
+        table += "* rss_mb 是工作进程到这个节点结束为止的最高值，不是节点自己的（清不了高水位）\n"
+    return table
+
+
+def load_report(path: str) -> Dict[str, Dict[str, Any]]:
+    """上一次的报告，{节点名: 记录}；没有时返回空。"""
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {s["stage"]: s for s in json.load(f).get("stages", [])}
+
+
+def write_perf_report(path: str, stages: List[Dict[str, Any]], wall_s: float, **extra) -> str:
+    """写出 JSON 报告和同名 .txt 表（和上一次报告比较耗时），返回文本表。"""
+    table = format_table(stages, load_report(path))
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "wall_s": round(wall_s, 3), **extra,
+              "languages": _languages(stages), "stages": stages}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as f:
+        f.write(table)
+    return table
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""
+增量构建的记录：每个节点上次成功时的代码、参数、输入和输出的指纹，存成一个 JSON
+（默认 <log_dir>/build_state.json）。下次构建时这些都没变的节点直接跳过（像 make 一样），
+变了的节点重跑，并说明是哪一样变了。
+
+  - 代码：脚本本身、它依赖的其它脚本和 xbench 模块的源码，按内容哈希（改一个常量就会变）；
+  - 参数：--root 等影响脚本行为的命令行参数；
+  - 输入 / 输出文件：大小 + mtime_ns；hash_files 时再加内容哈希，
+    大小或 mtime 变了但内容没变（例如上游重跑出同样的结果）仍然算没变；
+  - 共享输出（几个节点一起写的文件，如原始合并共用的 .bloom）：只检查还在不在，
+    别的节点改了它不算这个节点的输出被改过。在不在按本次构建第一次检查时为准：
+    第一个重跑的节点把它重新建出来之后，写它的其它节点照样要重跑。
+
+上游节点重跑后它的输出变了，下游的输入指纹也就跟着变，所以下游会自动重跑。
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+STATE_VERSION = 1
+
+# 内容哈希每次读的字节数
+HASH_BLOCK = 1 << 20
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_stamp(path: str, with_hash: bool = False) -> Optional[List[Any]]:
+    """[大小, mtime_ns, 内容哈希或 None]；文件不存在时返回 None。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, file_digest(path) if with_hash else None]
+
+
+def _same_file(path: str, old: Optional[List[Any]], with_hash: bool) -> bool:
+    new = file_stamp(path)
+    if old is None or new is None:
+        return old is None and new is None
+    if new[:2] == old[:2]:
+        return True
+    return with_hash and old[2] is not None and new[0] == old[0] and file_digest(path) == old[2]
+
+
+class BuildState:
+    """{节点名: 上次成功构建时的指纹}；why() 判断要不要重跑，record() 在节点成功后记下新的指纹。"""
+
+    def __init__(self, path: str, hash_files: bool = False):
+        self.path = path
+        self.hash_files = hash_files
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._shared_existed: Dict[str, bool] = {}  # 共享输出第一次检查时在不在
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == STATE_VERSION:
+                self.stages = data["stages"]
+
+    def why(self, name: str, code: Dict[str, str], params: Dict[str, Any],
+            inputs: List[str], outputs: List[str], shared: Sequence[str] = ()) -> Optional[str]:
+        """节点需要重跑的原因；什么都没变时返回 None。"""
+        old = self.stages.get(name)
+        if old is None:
+            return "没有成功构建的记录"
+        changed = sorted(f for f in code.keys() | old["code"].keys() if code.get(f) != old["code"].get(f))
+        if changed:
+            return "代码改了：" + ", ".join(changed)
+        if params != old["params"]:
+            return "参数改了：" + ", ".join(sorted(k for k in params.keys() | old["params"].keys()
+                                                 if params.get(k) != old["params"].get(k)))
+        if sorted(inputs) != sorted(old["inputs"]):
+            return "输入文件列表变了"
+        for path in inputs:
+            if not _same_file(path, old["inputs"][path], self.hash_files):
+                return f"输入变了：{path}"
+        if sorted(outputs) != sorted(old["outputs"]):
+            return "输出文件列表变了"
+        for path in outputs:
+            if file_stamp(path) is None:
+                return f"输出不见了：{path}"
+            if not _same_file(path, old["outputs"][path], self.hash_files):
+                return f"输出被改过：{path}"
+        if sorted(shared) != sorted(old.get("shared", [])):
+            return "共享输出文件列表变了"
+        for path in shared:
+            if not self._shared_existed.setdefault(path, os.path.exists(path)):
+                return f"共享输出不见了：{path}"
+        return None
+
+    def record(self, name: str, code: Dict[str, str], params: Dict[str, Any],
+               inputs: List[str], outputs: List[str], shared: Sequence[str] = ()):
+        self.stages[name] = {
+            "code": code,
+            "params": params,
+            "inputs": {path: file_stamp(path, self.hash_files) for path in inputs},
+            "outputs": {path: file_stamp(path, self.hash_files) for path in outputs},
+            "shared": list(shared),
+        }
+        self.save()
+
+    def refresh(self, name: str):
+        """
+        hash_files 时，把跳过的节点里 mtime 变了（内容没变）或还没有内容哈希的文件重新记一次，
+        下次不用再算哈希。
+        """
+        if not self.hash_files:
+            return
+        changed = False
+        for files in (self.stages[name]["inputs"], self.stages[name]["outputs"]):
+            for path, old in files.items():
+                new = file_stamp(path)
+                if old is not None and new is not None and (new[:2] != old[:2] or old[2] is None):
+                    files[path] = file_stamp(path, True)
+                    changed = True
+        if changed:
+            self.save()
+
+    def forget(self, name: str):
+        if self.stages.pop(name, None) is not None:
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": STATE_VERSION, "stages": self.stages}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
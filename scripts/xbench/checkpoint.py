@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+长跑的流式节点的断点续跑：原始合并（xbench.opus.merge_moses）和从 *.merged.tsv 抽样
+（prefix / reservoir，见 xbench.sampler.draw_sample_from_tsv）每隔 every 秒把进度存到输出旁边的 <输出>.ckpt。
+进程中途被杀掉（OOM、抢占式机器被回收）后，带 --resume（脚本里 RESUME = True）重跑就从断点接着读，
+结果和一次跑完逐字节相同，所以大规模重建可以放到抢占式机器上跑。
+
+断点里存的东西：
+  - 原始合并：两侧 Moses 文件的读取位置、已合并的行数、输出文件当时的长度（续跑时先把输出截回这个长度再追加）；
+    登记 Bloom 时先把 .bloom 写回再存断点（断点之后的句子续跑时再登记一次，结果不变）；
+  - 抽样：*.merged.tsv 的读取位置和已读行数、候选容器（蓄水池连同它的随机数状态）、去重集合、规则计数（RuleStats）。
+
+断点还记下脚本、同目录的 *_merge.py 和 xbench 源码的哈希、输入文件的大小 / mtime 和参数；
+对不上（改过代码、输入重新生成过、参数改了）时不续跑，从头开始。不带 --resume 时旧断点直接删掉。
+成功结束后删掉断点。断点用 pickle 存，先写 .tmp 再改名，存到一半被杀也不会留下坏文件。
+
+读取位置是文本文件的 tell()，只在整行（抽样时是整条 CSV 记录）读完时取；
+.gz / 压缩包里的文件 seek 时要从头解压到那里，比重新处理快得多，但不是零成本。
+存一次断点的时间随去重集合变大而变长（set 模式下是所有见过的句子），
+所以两次断点之间至少隔存一次所用时间的 SAVE_RATIO 倍，存断点的开销不超过总时间的约 1 / SAVE_RATIO。
+"""
+
+import glob
+import os
+import pickle
+import time
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional
+
+CKPT_VERSION = 1
+CKPT_SUFFIX = ".ckpt"
+
+# 每处理这么多行看一次时间
+CHECK_INTERVAL = 4096
+
+# 两次断点之间至少隔「存一次所用时间」的这么多倍
+SAVE_RATIO = 10
+
+XBENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def source_digest(script: str) -> str:
+    """脚本、同目录的 *_merge.py（MERGE_FILTER 的阈值）和 xbench 各模块（构建工具除外）源码的哈希。"""
+    paths = [script, *sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(script)), "*_merge.py")))]
+    paths += [p for p in sorted(glob.glob(os.path.join(XBENCH_DIR, "*.py"))) if not os.path.basename(p).startswith("build")]
+    h = blake2b(digest_size=16)
+    for path in dict.fromkeys(paths):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _stamp(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class Checkpoint:
+    """
+    一个节点的断点文件 <output>.ckpt。every 为 None 时不存断点。
+    用法：state = begin(inputs, params) 取回上次的进度（没有能续的断点时是 None）；
+    每处理一行调一次 due()，为 True 时 save(state)；全部完成后 done()。
+    rules（xbench.rule_stats.RuleStats）不为 None 时，它的计数随断点一起存下和恢复。
+    """
+
+    def __init__(self, output: str, every: Optional[float], resume: bool = False,
+                 script: Optional[str] = None, rules=None):
+        self.path = output + CKPT_SUFFIX
+        self.every = every
+        self.resume = resume
+        self.script = script
+        self.rules = rules
+        self._key: Dict[str, Any] = {}
+        self._ticks = 0
+        self._wait = every or 0.0
+        self._last = time.monotonic()
+        self._due_at: Optional[float] = None
+
+    def begin(self, inputs: List[str], params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """记下这次的代码 / 输入 / 参数；resume 且有对得上的断点时返回断点里的 state，否则返回 None。"""
+        self._key = {
+            "version": CKPT_VERSION,
+            "code": source_digest(self.script) if self.script else None,
+            "inputs": {path: _stamp(path) for path in inputs},
+            "params": params,
+        }
+        self._last = time.monotonic()
+        if not os.path.isfile(self.path):
+            if self.resume:
+                print(f"[INFO] 没有断点 {self.path}，从头开始")
+            return None
+        if not self.resume:
+            self.done()
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                saved = pickle.load(f)
+        except Exception as e:
+            print(f"[WARN] 读不出断点 {self.path}（{e}），从头开始")
+            return None
+        reason = self._mismatch(saved.get("key", {}))
+        if reason:
+            print(f"[WARN] 断点 {self.path} 对不上（{reason}），从头开始")
+            return None
+        if self.rules is not None:
+            self.rules.rows, self.rules.rules = saved["rules"]
+        print(f"[INFO] 从断点 {self.path} 继续（已处理 {saved['state']['rows']} 行）")
+        return saved["state"]
+
+    def _mismatch(self, old: Dict[str, Any]) -> Optional[str]:
+        for name, what in (("version", "断点格式"), ("code", "代码改了"), ("inputs", "输入文件变了"), ("params", "参数改了")):
+            if old.get(name) != self._key[name]:
+                return what
+        return None
+
+    def due(self) -> bool:
+        """该存断点了：每 CHECK_INTERVAL 行看一次离上次存断点过了多久。"""
+        if self.every is None:
+            return False
+        self._ticks += 1
+        if self._ticks < CHECK_INTERVAL:
+            return False
+        self._ticks = 0
+        now = time.monotonic()
+        if now - self._last < self._wait:
+            return False
+        self._due_at = now
+        return True
+
+    def save(self, state: Dict[str, Any]):
+        """
+        原子地写出断点；state 里的 rows 是已处理的行数（续跑时打印）。
+        下次断点的间隔按这次从 due() 到存完的时间算，调用方在两者之间做的 flush / 写回 .bloom 也算在内。
+        """
+        t0 = self._due_at or time.monotonic()
+        self._due_at = None
+        rules = None if self.rules is None else (self.rules.rows, self.rules.rules)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"key": self._key, "state": state, "rules": rules}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._last = time.monotonic()
+        self._wait = max(self.every or 0.0, SAVE_RATIO * (self._last - t0))
+
+    def done(self):
+        """节点完成（或不续跑）：删掉断点。"""
+        for path in (self.path, self.path + ".tmp"):
+            if os.path.isfile(path):
+                os.remove(path)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""
+合并阶段的清洗结果缓存（SQLite 文件）。
+
+调 MIN_WORDS / MAX_WORDS / MAX_DIGIT_RATIO 时，每跑一次 *_merge.py 都要把所有句子重新清洗一遍，
+但清洗结果和词数、数字比例都和这些阈值无关。这里把它们存下来：
+
+    键：blake2b(清洗配置版本 + 原句)，16 字节
+    值：清洗后的句子、词数、数字比例
+
+清洗配置版本（profile_version）由 PROFILES[lang] 里影响清洗的字段、清洗 / 特征代码的源码哈希（code_digest：
+xbench/cleaning.py、script_class.py，以及 merge_engine 里的 count_words / digit_ratio / MergeProfile 的
+__init__ 和 features）和 FEATURES_VERSION 算出来。改了清洗规则或这些代码就自动换一批键，
+旧结果不会被误用；几门语言可以共用同一个缓存文件。
+重跑时只剩查表和阈值比较。
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+# (清洗后的句子, 词数, 数字比例)
+Features = Tuple[str, int, float]
+
+# 清洗 / 特征的实现改了（结果会变）时加 1，让旧缓存全部失效（下面列出的代码改了不用手动加）
+FEATURES_VERSION = 1
+
+# 清洗结果和特征取决于这些模块（整份源码）和 merge_engine 里的这些函数（各自的源码）
+CLEANING_MODULES = ("cleaning.py", "script_class.py")
+FEATURE_FUNCTIONS = ("count_words", "digit_ratio", "MergeProfile.__init__", "MergeProfile.features")
+
+# 影响清洗结果的配置字段（阈值不在里面）
+CLEANING_FIELDS = ("edge", "numbering", "empty_brackets", "drop", "dot_runs")
+
+# SQLite 一条语句里参数个数的上限是 999
+_BATCH = 900
+
+# SQLite 页缓存大小（KB）
+CACHE_PAGES_KB = 65536
+
+
+@lru_cache(maxsize=None)
+def code_digest() -> str:
+    """清洗 / 特征代码的源码哈希（CLEANING_MODULES 和 FEATURE_FUNCTIONS），和 build.library_digests 一样按内容算。"""
+    from . import merge_engine  # merge_engine 导入了本模块，这里用到时再导入
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.blake2b(digest_size=16)
+    for name in CLEANING_MODULES:
+        with open(os.path.join(here, name), "rb") as f:
+            h.update(f.read())
+    for qualname in FEATURE_FUNCTIONS:
+        obj = merge_engine
+        for part in qualname.split("."):
+            obj = getattr(obj, part)
+        h.update(inspect.getsource(obj).encode("utf-8"))
+    return h.hexdigest()
+
+
+def profile_version(spec: Dict) -> bytes:
+    """清洗配置的版本号（8 字节），拼在每个键前面。"""
+    fields = {name: spec.get(name) for name in CLEANING_FIELDS}
+    text = json.dumps([FEATURES_VERSION, code_digest(), fields], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+class CleanCache:
+    """
+    原句 -> Features 的持久化缓存。
+
+        cache = CleanCache("clean_cache.sqlite")
+        keys = cache.keys(version, texts)          # {键: 原句}
+        found = cache.get_many(keys)               # {原句: Features}，只含命中的
+        cache.put_many([(键, Features), ...])      # 没命中的清洗完写回去
+        cache.close()
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute(f"PRAGMA cache_size=-{CACHE_PAGES_KB}")
+        # 普通 rowid 表 + 主键索引：值（清洗后的句子）不进索引页，随机键插入比 WITHOUT ROWID 快得多
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS clean ("
+            "key BLOB PRIMARY KEY, text TEXT NOT NULL, words INTEGER NOT NULL, digit REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def keys(version: bytes, texts: Iterable[str]) -> Dict[bytes, str]:
+        """每个原句的键：{键: 原句}。"""
+        blake2b = hashlib.blake2b
+        return {blake2b(version + raw.encode("utf-8", "surrogatepass"), digest_size=16).digest(): raw
+                for raw in texts}
+
+    def get_many(self, keys: Dict[bytes, str]) -> Dict[str, Features]:
+        """查 keys（CleanCache.keys 的结果），返回命中的 {原句: Features}。"""
+        key_list: List[bytes] = list(keys)
+        rows = []
+        for i in range(0, len(key_list), _BATCH):
+            batch = key_list[i:i + _BATCH]
+            marks = ",".join("?" * len(batch))
+            rows += self.conn.execute(
+                f"SELECT key, text, words, digit FROM clean WHERE key IN ({marks})", batch
+            ).fetchall()
+        found = {keys[key]: (text, words, digit) for key, text, words, digit in rows}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[bytes, Features]]):
+        """写入 (键, Features)；按键排好序再插入，索引页的访问是顺序的。"""
+        rows = sorted((key, text, words, digit) for key, (text, words, digit) in items)
+        self.conn.executemany("INSERT OR IGNORE INTO clean (key, text, words, digit) VALUES (?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self) -> "CleanCache":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
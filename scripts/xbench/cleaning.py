@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+编译好的句子清洗：*_merge.py 里的 clean_text 原来是 6 个 re.sub、两遍逐字符的生成器
+（控制字符、is_emoji 的一串范围比较）再加一个 .replace。
+
+Cleaner 在创建时（每门语言一次）把这些步骤编译好：
+  - 句首编号：一个预编译的正则，只在句首 match 一次；
+  - 孤立的空括号 "()" "[]" "{}"（hu_merge 的 clean_sentence）：三次 str.replace；
+  - 首尾无用符号：把正则字符类（含 \\s）展开成字符集合，用 str.strip(chars) 一次去掉两端；
+  - 控制字符 / emoji / “…”：合成一个字符类，一次 sub 全部删掉；
+  - 连续 3 个以上的点号：原来的正则；
+  - 空白折叠：" ".join(text.split())，和 re.sub(r'\\s+', ' ', ...).strip() 结果相同。
+步骤顺序和原来一致，输出逐字节相同。
+"""
+
+import re
+from typing import Iterable, List, Tuple
+
+# 句首编号：1. / 2) / (3) / [4] / 5、 / 1.2. 等
+NUMBERING = r'^\s*(?:[\(\[\{]?\d+(?:\.\d+)*[\)\]\}\.\)\-、:]+)\s*'
+
+# 要整段删掉的字符（闭区间）
+CONTROL = [(0x00, 0x1F), (0x7F, 0x7F)]
+EMOJI = [
+    (0x1F300, 0x1F5FF),
+    (0x1F600, 0x1F64F),
+    (0x1F680, 0x1F6FF),
+    (0x1F900, 0x1F9FF),
+    (0x2600, 0x26FF),
+    (0x2700, 0x27BF),
+]
+ELLIPSIS = [(0x2026, 0x2026)]  # “…”
+
+# 首尾无用符号（正则字符类的写法，和原来各脚本里的一致）
+EDGE_CHARS = r'\s\-\–\—\·\•\(\)\[\]\{\}"“”‘’\'`…·。？！?!,.;:·'
+
+
+def _class_chars(body: str) -> str:
+    """正则字符类 [body] 能匹配的所有字符（\\s 之类的转义都在 BMP 内，逐个试一遍）。"""
+    rx = re.compile(f"[{body}]")
+    candidates = set(map(chr, range(0x10000))) | set(body)
+    return "".join(sorted(ch for ch in candidates if rx.match(ch)))
+
+
+def _range_class(ranges: Iterable[Tuple[int, int]]) -> str:
+    return "".join(f"{re.escape(chr(lo))}-{re.escape(chr(hi))}" for lo, hi in ranges)
+
+
+class Cleaner:
+    """
+    一门语言的 clean_text，创建时编译好，之后直接调用：
+
+        CLEANER = Cleaner(EDGE_CHARS, numbering=True, drop=CONTROL + EMOJI + ELLIPSIS, dot_runs=True)
+        CLEANER("1. “Hello…  world!”")   # -> "Hello world"
+
+    edge：首尾要去掉的符号，写成正则字符类的内容；numbering：是否去句首编号；
+    empty_brackets：是否删掉孤立的空括号；drop：要删掉的字符范围；dot_runs：是否删掉连续 3 个以上的点号。
+    """
+
+    def __init__(self, edge: str = EDGE_CHARS, numbering: bool = False, empty_brackets: bool = False,
+                 drop: List[Tuple[int, int]] = CONTROL, dot_runs: bool = False):
+        self.edge = _class_chars(edge)
+        self.numbering = re.compile(NUMBERING) if numbering else None
+        self.empty_brackets = empty_brackets
+        self.drop = re.compile(f"[{_range_class(drop)}]+") if drop else None
+        self.dot_runs = re.compile(r'\.{3,}') if dot_runs else None
+
+    def __call__(self, text: str) -> str:
+        if text is None:
+            return ""
+        text = text.strip()
+        if self.numbering is not None:
+            m = self.numbering.match(text)
+            if m:
+                text = text[m.end():]
+        if self.empty_brackets:
+            text = text.replace("()", "").replace("[]", "").replace("{}", "")
+        text = text.strip(self.edge)
+        if self.drop is not None:
+            text = self.drop.sub('', text)
+        if self.dot_runs is not None:
+            text = self.dot_runs.sub('', text)
+        return " ".join(text.split())
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""
+去重用的“已见集合”：抽样脚本 process_line 里的 seen_bn / seen_hu / ...（句子字符串），
+合并脚本里的 seen_pairs（(en_lower, xx_lower) 元组）。
+
+普通 set 存的是完整的 Python 字符串 / 元组，整份语料跑下来内存主要花在这里。
+DigestSet 只存每个键的 blake2b 摘要（64 或 128 位），放在 array('Q') 做的开放寻址表里，
+每个键只占 16 ~ 32 字节（负载因子 <= 0.5）；用法和 set 一样（in / add / len）。
+
+  - 64 位摘要：几千万个键时误判（把没见过的键当成见过）的概率仍在 1e-5 量级以下；
+  - 128 位摘要：误判概率可以忽略；
+  - exact=True：另外把键的 UTF-8 原文存进一块 bytearray，摘要相同时再比对原文，结果和 set 完全一致，
+    内存仍比 set 小得多（没有每个字符串对象的开销）。
+
+new_seen(mode) 按脚本里的 DEDUP 常量创建：
+  "set"（默认，原来的做法）/ "digest64" / "digest128" / "exact"
+"""
+
+from array import array
+from hashlib import blake2b
+from typing import Iterable, Tuple, Union
+
+Key = Union[str, Tuple[str, ...]]
+
+DEDUP_MODES = ("set", "digest64", "digest128", "exact")
+
+
+def _encode(key: Key) -> bytes:
+    """键 -> 字节串，保证不同的键编码不同（首字节区分类型）。"""
+    if isinstance(key, str):
+        return b"s" + key.encode("utf-8", "surrogatepass")
+    joined = "\x00".join(key)
+    if joined.count("\x00") == len(key) - 1:
+        return b"t" + joined.encode("utf-8", "surrogatepass")
+    # 元素里本身带 \x00 时退回到“长度 + 内容”的写法
+    parts = []
+    for part in key:
+        b = part.encode("utf-8", "surrogatepass")
+        parts.append(len(b).to_bytes(4, "little"))
+        parts.append(b)
+    return b"T" + b"".join(parts)
+
+
+class DigestSet:
+    """只存摘要的集合，可以直接替换 seen_* 用的 set（支持 in / add / len / update）。"""
+
+    def __init__(self, bits: int = 64, exact: bool = False, capacity: int = 1024):
+        if bits not in (64, 128):
+            raise ValueError("bits 只能是 64 或 128")
+        self.bits = bits
+        self.exact = exact
+        self._width = bits // 64  # 每个槽占几个 uint64
+        size = 16
+        while size < capacity * 2:
+            size *= 2
+        self._init_table(size)
+        self._len = 0
+        self._last = None
+        if exact:
+            self._arena = bytearray()
+
+    def _init_table(self, size: int):
+        self._size = size
+        self._mask = size - 1
+        self._slots = array("Q", bytes(8 * size * self._width))
+        if self.exact:
+            self._refs = array("Q", bytes(8 * size))  # 原文在 arena 里的偏移 + 1，0 表示空
+
+    def _digest(self, data: bytes) -> Tuple[int, ...]:
+        d = blake2b(data, digest_size=8 * self._width).digest()
+        # 0 用来表示空槽，摘要的第一个字恰好是 0 时改成 1
+        if self._width == 1:
+            return (int.from_bytes(d, "little") or 1,)
+        return int.from_bytes(d[:8], "little") or 1, int.from_bytes(d[8:], "little")
+
+    def _key_at(self, slot: int) -> bytes:
+        start = self._refs[slot] - 1
+        n = int.from_bytes(self._arena[start:start + 4], "little")
+        return bytes(self._arena[start + 4:start + 4 + n])
+
+    def _find(self, words: Tuple[int, ...], data: bytes) -> Tuple[int, bool]:
+        """返回 (槽位, 是否已存在)；不存在时槽位是可以插入的空槽。"""
+        w = self._width
+        slots = self._slots
+        i = words[-1] & self._mask
+        while True:
+            base = i * w
+            first = slots[base]
+            if first == 0:
+                return i, False
+            if first == words[0] and (w == 1 or slots[base + 1] == words[1]):
+                if not self.exact or self._key_at(i) == data:
+                    return i, True
+            i = (i + 1) & self._mask
+
+    def _lookup(self, key: Key) -> Tuple[Tuple[int, ...], bytes, int, bool]:
+        # 脚本里总是先 `key in seen`，过完其它过滤再 seen.add(key)：记住上一次的查找结果，add 时不用再算一遍
+        last = self._last
+        if last is not None and last[0] is key:
+            return last[1]
+        data = _encode(key)
+        words = self._digest(data)
+        slot, found = self._find(words, data)
+        result = (words, data, slot, found)
+        self._last = (key, result)
+        return result
+
+    def __contains__(self, key: Key) -> bool:
+        return self._lookup(key)[3]
+
+    def add(self, key: Key):
+        words, data, slot, found = self._lookup(key)
+        self._last = None
+        if found:
+            return
+        self._put(slot, words, data)
+        self._len += 1
+        if self._len * 2 > self._size:
+            self._grow()
+
+    def _put(self, slot: int, words: Tuple[int, ...], data: bytes):
+        base = slot * self._width
+        for k, word in enumerate(words):
+            self._slots[base + k] = word
+        if self.exact:
+            self._refs[slot] = len(self._arena) + 1
+            self._arena += len(data).to_bytes(4, "little")
+            self._arena += data
+
+    def _grow(self):
+        old_slots, w = self._slots, self._width
+        old_refs = self._refs if self.exact else None
+        old_size = self._size
+        self._init_table(old_size * 2)
+        slots, mask = self._slots, self._mask
+        for j in range(old_size):
+            base = j * w
+            if old_slots[base] == 0:
+                continue
+            i = old_slots[base + w - 1] & mask
+            while slots[i * w] != 0:
+                i = (i + 1) & mask
+            slots[i * w:i * w + w] = old_slots[base:base + w]
+            if old_refs is not None:
+                self._refs[i] = old_refs[j]
+
+    def update(self, keys: Iterable[Key]):
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def nbytes(self) -> int:
+        """表本身（以及 exact 模式下原文）占用的字节数。"""
+        n = self._slots.itemsize * len(self._slots)
+        if self.exact:
+            n += self._refs.itemsize * len(self._refs) + len(self._arena)
+        return n
+
+
+def new_seen(mode: str = "set"):
+    """按 DEDUP 常量创建去重集合。"""
+    if mode == "set":
+        return set()
+    if mode == "digest64":
+        return DigestSet(64)
+    if mode == "digest128":
+        return DigestSet(128)
+    if mode == "exact":
+        return DigestSet(64, exact=True)
+    raise ValueError(f"未知的 DEDUP: {mode!r}（可选 {' / '.join(DEDUP_MODES)}）")
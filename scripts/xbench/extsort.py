@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+"""
+外排序去重：给内存放不下的 *.merged.tsv 做精确去重（例如整份 OpenSubtitles en-hu）。
+
+  1. 逐行读入，算出去重键（默认是 xx 列折叠空白、转小写后的句子），
+     攒够 memory_mb 就把 (键, 原始 id, 行号) 排好序写成一个临时 run 文件（spill）；
+  2. 用 heapq.merge 把所有 run 做 k 路归并，同一个键只保留 id 最小（最先出现）的那一行的行号；
+     保留下来的行号同样分块排序、落盘、归并；
+     一次最多同时打开 MAX_FAN_IN 个 run，run 更多时先把它们每 MAX_FAN_IN 个归并成一个新 run，多趟直到不超过；
+  3. 再顺序读一遍输入，把行号在保留流里的行写出去，输出保持原来的行顺序。
+
+内存只和 memory_mb（以及 MAX_FAN_IN 个文件的读缓冲）有关，和文件大小无关；
+每条记录的大小按 sys.getsizeof(键) 加固定开销估算，非 ASCII 的句子也按实际字节算；结果和用一个 set 按同样的键“保留第一次出现”完全一致。
+"""
+
+import csv
+import heapq
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .bloom import normalize_key
+
+# 估算内存时每条记录在键字符串（sys.getsizeof）之外的额外开销（三元组 + 两个整数 + 列表指针）
+RECORD_OVERHEAD = 128
+ORDINAL_OVERHEAD = 40
+
+# 一次归并最多同时打开的 run 文件数
+MAX_FAN_IN = 64
+
+KeyFunc = Callable[[List[str]], Optional[str]]
+
+
+def xx_key(row: List[str]) -> Optional[str]:
+    """默认的去重键：xx 列（第 3 列）折叠空白、转小写；列数不够的行不参与去重。"""
+    return normalize_key(row[2]) if len(row) >= 3 else None
+
+
+def pair_key(row: List[str]) -> Optional[str]:
+    """en + xx 句对作为去重键（和 *_merge.py 的 seen_pairs 一样的口径）。"""
+    return normalize_key(row[1]) + "\x00" + normalize_key(row[2]) if len(row) >= 3 else None
+
+
+def exact_xx_key(row: List[str]) -> Optional[str]:
+    """和抽样脚本 process_line 里的 seen_* 一样：只去掉 xx 首尾空白。"""
+    return row[2].strip() if len(row) >= 3 else None
+
+
+def _escape(key: str) -> str:
+    # run 文件一行一条记录，键里的反斜杠 / Tab / 换行要转义
+    return key.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _unescape(text: str) -> str:
+    if "\\" not in text:
+        return text
+    out = []
+    it = iter(text)
+    for ch in it:
+        if ch == "\\":
+            nxt = next(it, "")
+            out.append({"t": "\t", "n": "\n", "r": "\r"}.get(nxt, nxt))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+class _Runs:
+    """把有序块写成临时 run 文件（每条记录用 fmt 写成一行、parse 读回），再 k 路归并读回来。"""
+
+    def __init__(self, tmp_dir: str, prefix: str, stats: Dict[str, int],
+                 fmt: Callable[[Any], str], parse: Callable[[str], Any]):
+        self.tmp_dir = tmp_dir
+        self.prefix = prefix
+        self.stats = stats
+        self.fmt = fmt
+        self.parse = parse
+        self.paths: List[str] = []
+        self._count = 0
+
+    def spill(self, records: Iterable[Any]):
+        path = os.path.join(self.tmp_dir, f"{self.prefix}{self._count:05d}.run")
+        self._count += 1
+        with open(path, "w", encoding="utf-8", newline="\n") as out:
+            out.writelines(self.fmt(r) for r in records)
+        self.paths.append(path)
+        self.stats["runs"] += 1
+        self.stats["spill_bytes"] += os.path.getsize(path)
+
+    def read(self, path: str) -> Iterator[Any]:
+        with open(path, "r", encoding="utf-8", newline="\n") as f:
+            for line in f:
+                yield self.parse(line)
+
+    def merged(self, tail: List[Any]) -> Iterator[Any]:
+        """所有 run 和内存里已排序的 tail 归并成一个有序流；run 超过 MAX_FAN_IN 个时先多趟归并成更少的 run。"""
+        while len(self.paths) > MAX_FAN_IN:
+            group, self.paths = self.paths[:MAX_FAN_IN], self.paths[MAX_FAN_IN:]
+            self.spill(heapq.merge(*(self.read(p) for p in group)))
+            for path in group:
+                os.remove(path)
+        return heapq.merge(*(self.read(p) for p in self.paths), iter(tail))
+
+
+def _key_runs(rows: Iterator[List[str]], key_func: KeyFunc, budget: int,
+              runs: _Runs, stats: Dict[str, int]) -> List[Tuple[str, int, int]]:
+    """第 1 步：分块排序 (键, id, 行号)，超过 budget 就落盘；返回留在内存里的最后一块（已排序）。"""
+    chunk: List[Tuple[str, int, int]] = []
+    used = 0
+    for ordinal, row in enumerate(rows):
+        stats["rows"] += 1
+        key = key_func(row)
+        if key is None:
+            continue
+        orig_id = int(row[0]) if row and row[0].isdigit() else ordinal
+        chunk.append((key, orig_id, ordinal))
+        used += sys.getsizeof(key) + RECORD_OVERHEAD
+        if used >= budget:
+            chunk.sort()
+            runs.spill(chunk)
+            chunk, used = [], 0
+    chunk.sort()
+    return chunk
+
+
+def _format_key_line(record: Tuple[str, int, int]) -> str:
+    k, i, o = record
+    return f"{_escape(k)}\t{i}\t{o}\n"
+
+
+def _parse_key_line(line: str) -> Tuple[str, int, int]:
+    k, i, o = line.rstrip("\n").rsplit("\t", 2)
+    return _unescape(k), int(i), int(o)
+
+
+def _kept_ordinals(key_stream: Iterable[Tuple[str, int, int]], budget: int,
+                   runs: _Runs, stats: Dict[str, int]) -> Iterator[int]:
+    """第 2 步：每个键只留第一条的行号，按行号重新排好序后逐个产出。"""
+    chunk: List[int] = []
+    last_key = None
+    first = True
+    for key, _, ordinal in key_stream:
+        if not first and key == last_key:
+            stats["duplicates"] += 1
+            continue
+        first = False
+        last_key = key
+        chunk.append(ordinal)
+        if len(chunk) * ORDINAL_OVERHEAD >= budget:
+            chunk.sort()
+            runs.spill(chunk)
+            chunk = []
+    chunk.sort()
+    return runs.merged(chunk)
+
+
+def external_dedup(input_tsv: str, output_tsv: str, key_func: KeyFunc = xx_key,
+                   memory_mb: float = 512, tmp_dir: Optional[str] = None,
+                   verbose: bool = True) -> Dict[str, int]:
+    """
+    对 input_tsv 做外排序去重，写出 output_tsv（保留表头和原来的行顺序），返回统计信息：
+      rows / kept / duplicates：数据行数、保留行数、去掉的重复行数
+      runs / spill_bytes：落盘的 run 文件个数和总字节数（两步合计，多趟归并写出的 run 也算；0 表示全程没有落盘）
+    key_func(row) 返回 None 的行原样保留、不参与去重。
+    """
+    budget = int(memory_mb * 1024 * 1024)
+    stats = {"rows": 0, "kept": 0, "duplicates": 0, "runs": 0, "spill_bytes": 0}
+    t0 = time.time()
+
+    with tempfile.TemporaryDirectory(prefix="xbench-dedup-", dir=tmp_dir) as work:
+        with open(input_tsv, "r", encoding="utf-8", newline="") as fin:
+            reader = csv.reader(fin, delimiter="\t")
+            header = next(reader, None)
+            if header is None:
+                return stats
+            has_header = bool(header) and header[0].lower().startswith("id")
+            rows = reader if has_header else _chain_first(header, reader)
+
+            key_runs = _Runs(work, "key", stats, _format_key_line, _parse_key_line)
+            tail = _key_runs(rows, key_func, budget, key_runs, stats)
+
+        merged_keys = key_runs.merged(tail)
+
+        ord_runs = _Runs(work, "ord", stats, lambda o: f"{o}\n", int)
+        kept = _kept_ordinals(merged_keys, budget, ord_runs, stats)
+        next_kept = next(kept, None)
+
+        with open(input_tsv, "r", encoding="utf-8", newline="") as fin, \
+             open(output_tsv, "w", encoding="utf-8", newline="") as fout:
+            reader = csv.reader(fin, delimiter="\t")
+            writer = csv.writer(fout, delimiter="\t", lineterminator="\n")
+            first_row = next(reader, None)
+            if has_header:
+                writer.writerow(first_row)
+                rows = reader
+            else:
+                rows = _chain_first(first_row, reader)
+            for ordinal, row in enumerate(rows):
+                if next_kept is not None and ordinal == next_kept:
+                    next_kept = next(kept, None)
+                elif key_func(row) is not None:
+                    continue  # 参与去重但不是第一次出现
+                writer.writerow(row)
+                stats["kept"] += 1
+
+    if verbose:
+        print(f"[INFO] 外排序去重 {input_tsv}：{stats['rows']} 行 -> {stats['kept']} 行，"
+              f"去掉 {stats['duplicates']} 行重复；落盘 {stats['runs']} 个 run，"
+              f"{stats['spill_bytes'] / 1024 / 1024:.1f} MB，用时 {time.time() - t0:.1f}s")
+    return stats
+
+
+def _chain_first(first: List[str], rest: Iterable[List[str]]) -> Iterator[List[str]]:
+    yield first
+    yield from rest
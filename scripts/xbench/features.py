@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""
+按列存放的句子特征表：每句话的词数、字符数、数字比例，一块输入只算一次；
+之后合并阶段的过滤条件都写成对整列的布尔掩码，换阈值时不用再碰句子本身。
+
+    table = FeatureTable.from_features(en_features, xx_features)
+    keep = table.merge_mask(min_words=8, max_words=45, max_digit_ratio=0.3)  # numpy 可用时是 ndarray，否则是 list[bool]
+    rows = table.selected(keep)                     # 通过的行号
+
+合并引擎（merge_engine）每 CHUNK_ROWS 行建一张表再套掩码。抽样脚本本身仍然逐行过滤（流式读、读够就停），
+扫抽样阈值时用 from_texts 建只有 xx 一侧的表：词数、字母数和各文字类别的字母数，
+MIN_TOKENS 和文字比例都写成掩码（见 tools/sweep_samplers.py）。
+
+装了 numpy 就用 ndarray（一次阈值比较是几次向量运算）；没装时退回到 Python list，结果完全相同。
+比较规则和 MergeProfile.accept 逐行一致：
+  - 句子为空（字符数 0）不通过；
+  - 词数在 [min_words, max_words] 内（max_words 为 None 表示不设上限）；
+  - 数字比例 <= max_digit_ratio。
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+from .clean_cache import Features
+from .script_class import ScriptTable
+
+try:
+    import numpy as np
+except ImportError:  # numpy 不是必需的
+    np = None
+
+SIDES = ("en", "xx")
+
+
+def _column(values, dtype: str):
+    if np is not None:
+        return np.asarray(values, dtype=dtype)
+    return list(values)
+
+
+def both(a, b):
+    """两张掩码逐行取与。"""
+    if np is not None:
+        return a & b
+    return [x and y for x, y in zip(a, b)]
+
+
+def _ratio_at_least(count, total, threshold: float):
+    # 和 ScriptTable.at_least 一致：总数为 0 时比例算 0
+    if np is not None:
+        ratio = np.divide(count, total, out=np.zeros(len(count)), where=total > 0)
+        return ratio >= threshold
+    return [(c / t if t else 0.0) >= threshold for c, t in zip(count, total)]
+
+
+def concat(masks: Sequence):
+    """把几段掩码（或整数列）按顺序接成一列。"""
+    if np is not None:
+        return np.concatenate(masks) if len(masks) else np.zeros(0, dtype=bool)
+    return [x for m in masks for x in m]
+
+
+def count_true(mask) -> int:
+    return int(mask.sum()) if np is not None else sum(mask)
+
+
+def first_occurrences(ids: Sequence[int], mask):
+    """
+    掩码为真、并且 ids 相同的行里最靠前的那一行为真，其余为假：
+    即按行顺序只保留第一次出现的键（合并阶段的去重）。ids 是每行去重键的整数编号。
+    """
+    if np is not None:
+        ids = np.asarray(ids)
+        rows = np.flatnonzero(mask)
+        _, first = np.unique(ids[rows], return_index=True)
+        out = np.zeros(len(ids), dtype=bool)
+        out[rows[first]] = True
+        return out
+    seen = set()
+    out = [False] * len(ids)
+    for i, (key, keep) in enumerate(zip(ids, mask)):
+        if keep and key not in seen:
+            seen.add(key)
+            out[i] = True
+    return out
+
+
+class FeatureTable:
+    """
+    列名：<side>_chars / <side>_words / <side>_digit（side 是 en 或 xx）；texts[side] 是对应的句子。
+    from_texts 建的表只有 xx 一侧：xx_chars / xx_words / xx_letters / xx_<类别>。
+    """
+
+    def __init__(self, columns: Dict[str, Sequence], texts: Dict[str, List[str]]):
+        self.columns = columns
+        self.texts = texts
+
+    @classmethod
+    def from_features(cls, en: Sequence[Features], xx: Sequence[Features]) -> "FeatureTable":
+        """en / xx 是 MergeProfile.features 的结果（清洗后的句子, 词数, 数字比例），一行一个。"""
+        columns: Dict[str, Sequence] = {}
+        texts: Dict[str, List[str]] = {}
+        for side, feats in zip(SIDES, (en, xx)):
+            texts[side] = [f[0] for f in feats]
+            columns[f"{side}_chars"] = _column((len(f[0]) for f in feats), "int64")
+            columns[f"{side}_words"] = _column((f[1] for f in feats), "int64")
+            columns[f"{side}_digit"] = _column((f[2] for f in feats), "float64")
+        return cls(columns, texts)
+
+    @classmethod
+    def from_texts(cls, xx: Sequence[str], script: ScriptTable) -> "FeatureTable":
+        """
+        抽样阶段用：xx 是抽样脚本眼里的句子（已 strip），词数按空格分；
+        script 的每个类别一列字母数，xx_letters 是 script 计入的字母总数（ScriptTable.counts）。
+        """
+        counts = [script.counts(text) for text in xx]
+        columns: Dict[str, Sequence] = {
+            "xx_chars": _column((len(text) for text in xx), "int64"),
+            "xx_words": _column((len(text.split()) for text in xx), "int64"),
+            "xx_letters": _column((total for total, _ in counts), "int64"),
+        }
+        for name in script.codes:
+            columns[f"xx_{name}"] = _column((by_class[name] for _, by_class in counts), "int64")
+        return cls(columns, {"xx": list(xx)})
+
+    def add_column(self, name: str, values: Sequence[bool]):
+        """补一列逐行算好的布尔结果（没法写成数值比较的规则），之后和别的掩码一样用 both 组合。"""
+        if len(values) != len(self):
+            raise ValueError(f"列 {name} 有 {len(values)} 行，表有 {len(self)} 行")
+        self.columns[name] = _column(values, "bool")
+
+    def __len__(self) -> int:
+        return len(self.texts["xx"])
+
+    def all_rows(self):
+        return _column([True] * len(self), "bool")
+
+    def side_mask(self, side: str, min_words: int, max_words: Optional[int] = None,
+                  max_digit_ratio: Optional[float] = None):
+        """一侧句子：非空、词数在范围内、数字比例不超过上限。"""
+        chars = self.columns[f"{side}_chars"]
+        words = self.columns[f"{side}_words"]
+        digit = self.columns[f"{side}_digit"]
+        if np is not None:
+            mask = (chars > 0) & (words >= min_words)
+            if max_words is not None:
+                mask &= words <= max_words
+            if max_digit_ratio is not None:
+                mask &= digit <= max_digit_ratio
+            return mask
+        return [
+            c > 0 and w >= min_words
+            and (max_words is None or w <= max_words)
+            and (max_digit_ratio is None or d <= max_digit_ratio)
+            for c, w, d in zip(chars, words, digit)
+        ]
+
+    def token_mask(self, min_tokens: int):
+        """抽样脚本的 empty + min_tokens：xx 非空，且至少 min_tokens 个词。"""
+        chars, words = self.columns["xx_chars"], self.columns["xx_words"]
+        if np is not None:
+            return (chars > 0) & (words >= min_tokens)
+        return [c > 0 and w >= min_tokens for c, w in zip(chars, words)]
+
+    def script_mask(self, name: str, min_ratio: float):
+        """抽样脚本的 script_ratio：name 类字母占全部字母的比例 >= min_ratio（ScriptTable.at_least）。"""
+        return _ratio_at_least(self.columns[f"xx_{name}"], self.columns["xx_letters"], min_ratio)
+
+    def merge_mask(self, min_words: int, max_words: Optional[int] = None,
+                   max_digit_ratio: Optional[float] = None, check_en: bool = True):
+        """合并阶段的过滤（MergeProfile.accept）：xx 一侧，check_en 时 en 一侧也要满足。"""
+        mask = self.side_mask("xx", min_words, max_words, max_digit_ratio)
+        if check_en:
+            mask = both(mask, self.side_mask("en", min_words, max_words, max_digit_ratio))
+        return mask
+
+    def count(self, mask) -> int:
+        return count_true(mask)
+
+    def selected(self, mask) -> List[int]:
+        """掩码为真的行号（升序）。"""
+        if np is not None:
+            return np.flatnonzero(mask).tolist()
+        return [i for i, keep in enumerate(mask) if keep]
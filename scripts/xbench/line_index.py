@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+行偏移索引：扫一遍文件，把每一行的起始字节偏移存成紧凑的 uint64 数组（<文件>.idx），
+之后通过 mmap 按行号 O(1) 取行，不需要再从头读文件。
+
+可以给 *.merged.tsv 建，也可以给 Moses 的 .en / .xx 两侧文件分别建（ParallelIndex）。
+行按物理行（b"\\n"）切分：merged.tsv 里第 N 行（表头是第 0 行）就是 id 为 N 的句对。
+
+索引文件格式（本机字节序）：
+  8 字节 magic | uint64 源文件大小 | uint64 源文件 mtime_ns | uint64 行数 n |
+  (n + 1) 个 uint64：每行起始偏移，最后一个是文件末尾
+源文件大小或 mtime 变了就视为过期，需要重建。
+"""
+
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+MAGIC = b"XBIDX1" + (b"<L" if sys.byteorder == "little" else b">B")
+_HEADER = struct.Struct("=8sQQQ")
+
+
+def index_path_for(path: str) -> str:
+    return path + ".idx"
+
+
+def _source_stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def build_line_index(path: str, index_path: Optional[str] = None) -> str:
+    """扫描一遍 path，写出行偏移索引，返回索引文件路径。"""
+    index_path = index_path or index_path_for(path)
+    offsets = array("Q", [0])
+    pos = 0
+    with open(path, "rb") as f:
+        for line in f:
+            pos += len(line)
+            offsets.append(pos)
+    if len(offsets) > 1 and offsets[-1] == offsets[-2]:
+        offsets.pop()
+    size, mtime_ns = _source_stamp(path)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(MAGIC, size, mtime_ns, len(offsets) - 1))
+        offsets.tofile(out)
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+def is_index_fresh(path: str, index_path: Optional[str] = None) -> bool:
+    """索引存在且和源文件的大小 / mtime 对得上。"""
+    index_path = index_path or index_path_for(path)
+    if not os.path.isfile(index_path) or not os.path.isfile(path):
+        return False
+    with open(index_path, "rb") as f:
+        head = f.read(_HEADER.size)
+    if len(head) < _HEADER.size:
+        return False
+    magic, size, mtime_ns, _ = _HEADER.unpack(head)
+    return magic == MAGIC and (size, mtime_ns) == _source_stamp(path)
+
+
+class LineIndex:
+    """
+    按行号随机读取一个文本文件（行号从 0 开始，返回的行不含换行符）。
+
+        idx = LineIndex.open("OpenSubtitles.en-hu.merged.tsv")
+        idx.row(1234)             # -> ["1234", en, hu]
+        idx.lines(range(10, 20))  # 一批行
+    """
+
+    def __init__(self, path: str, index_path: Optional[str] = None):
+        self.path = path
+        self.index_path = index_path or index_path_for(path)
+        if not is_index_fresh(path, self.index_path):
+            raise ValueError(f"{self.index_path} 不存在或已过期，请先 build_line_index({path!r})")
+
+        self._f_idx = open(self.index_path, "rb")
+        self._m_idx = mmap.mmap(self._f_idx.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, self._n = _HEADER.unpack_from(self._m_idx, 0)
+        self._offsets = memoryview(self._m_idx)[_HEADER.size:].cast("Q")
+
+        self._f_src = open(path, "rb")
+        size = os.fstat(self._f_src.fileno()).st_size
+        self._m_src = mmap.mmap(self._f_src.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @classmethod
+    def open(cls, path: str, index_path: Optional[str] = None, build: bool = True) -> "LineIndex":
+        """打开索引；build=True 时索引缺失或过期会先重建。"""
+        if build and not is_index_fresh(path, index_path):
+            build_line_index(path, index_path)
+        return cls(path, index_path)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def line_bytes(self, n: int) -> bytes:
+        if not 0 <= n < self._n:
+            raise IndexError(f"行号 {n} 超出范围 [0, {self._n})")
+        return self._m_src[self._offsets[n]:self._offsets[n + 1]].rstrip(b"\r\n")
+
+    def line(self, n: int) -> str:
+        return self.line_bytes(n).decode("utf-8")
+
+    def lines(self, ns: Iterable[int]) -> List[str]:
+        return [self.line(n) for n in ns]
+
+    def row(self, n: int) -> List[str]:
+        """把第 n 行按 TSV 解析成字段列表。"""
+        return next(csv.reader([self.line(n)], delimiter="\t"), [])
+
+    def rows(self, ns: Iterable[int]) -> List[List[str]]:
+        return [self.row(n) for n in ns]
+
+    def close(self):
+        self._offsets.release()
+        self._m_idx.close()
+        self._f_idx.close()
+        if isinstance(self._m_src, mmap.mmap):
+            self._m_src.close()
+        self._f_src.close()
+
+    def __enter__(self) -> "LineIndex":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParallelIndex:
+    """Moses 的 .en / .xx 两侧各一份 LineIndex，按行号取句对（行号从 0 开始）。"""
+
+    def __init__(self, en_path: str, xx_path: str, build: bool = True):
+        self.en = LineIndex.open(en_path, build=build)
+        self.xx = LineIndex.open(xx_path, build=build)
+        if len(self.en) != len(self.xx):
+            print(f"警告：{en_path} 和 {xx_path} 行数不一致（{len(self.en)} vs {len(self.xx)}）")
+
+    def __len__(self) -> int:
+        return min(len(self.en), len(self.xx))
+
+    def pair(self, n: int) -> Tuple[str, str]:
+        return self.en.line(n), self.xx.line(n)
+
+    def pairs(self, ns: Sequence[int]) -> List[Tuple[str, str]]:
+        return [self.pair(n) for n in ns]
+
+    def close(self):
+        self.en.close()
+        self.xx.close()
+
+    def __enter__(self) -> "ParallelIndex":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def merged_rows_by_id(input_tsv: str, ids: Iterable[str]) -> List[List[str]]:
+    """
+    按原始 id 从 *.merged.tsv 里取整行（merge_parallel 写出的文件第 N 行就是 id N）。
+    索引缺失或过期时先自动重建。
+    """
+    with LineIndex.open(input_tsv) as idx:
+        has_header = len(idx) > 0 and idx.line(0).lower().startswith("id")
+        out = []
+        for orig_id in ids:
+            n = int(orig_id) if has_header else int(orig_id) - 1
+            row = idx.row(n)
+            if not row or row[0] != str(orig_id):
+                raise ValueError(f"{input_tsv} 第 {n} 行的 id 不是 {orig_id}，文件不是 merge_parallel 的输出？")
+            out.append(row)
+        return out
@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+
+"""
+各语言 *_merge.py 共用的合并引擎：读入各语料的抽样 TSV，清洗 en / xx，按句长、数字比例过滤，
+按句对去重，重新编号后写出 <lang>_all_merged_clean.tsv。
+
+每门语言的差异都写在 xbench.profiles.PROFILES 里；get_profile(lang) 把它编译成 MergeProfile
+（Cleaner、表头规则、阈值）并缓存，所以同一个进程里可以接连合并 6 门语言，
+正则和查表只编译一次（见 tools/merge_all.py）。
+
+    merge_language("bn", INPUT_FILES, OUTPUT_FILE, dedup=DEDUP, min_words=MIN_WORDS)
+"""
+
+import copy
+import csv
+import importlib.util
+import os
+import sys
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+from itertools import chain, islice
+from time import perf_counter_ns
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .clean_cache import CleanCache, Features, profile_version
+from .cleaning import CONTROL, Cleaner
+from .dedup import new_seen
+from .features import SIDES, FeatureTable, both, count_true
+from .profiles import PROFILES
+from .rule_stats import RuleStats, write_rule_report
+from .script_class import DIGIT_TABLE
+
+THRESHOLDS = ("min_words", "max_words", "max_digit_ratio")
+
+# 阈值 -> *_merge.py 里对应的常量（hu 的最少词数叫 HU_MIN_TOKENS）
+SCRIPT_CONSTANTS = {
+    "min_words": ("MIN_WORDS", "HU_MIN_TOKENS"),
+    "max_words": ("MAX_WORDS",),
+    "max_digit_ratio": ("MAX_DIGIT_RATIO",),
+}
+
+# scripts/ 目录（各语言脚本在 scripts/<lang>/ 下）
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 输出文件的写缓冲（字节）
+WRITE_BUFFER = 1 << 20
+
+# jobs > 1 时每次交给子进程清洗的行数
+CHUNK_ROWS = 20000
+
+
+def count_words(text: str) -> int:
+    """按空格统计单词数"""
+    if not text:
+        return 0
+    return len(text.split())
+
+
+def digit_ratio(text: str) -> float:
+    """数字占比：digits / (letters+digits)，两者都为 0 时返回 0"""
+    return DIGIT_TABLE.ratio(text, "digit")
+
+
+def is_header(row: List[str]) -> bool:
+    """固定列的文件用：第一列是 'id' 或以 '#' 开头就认为是表头。"""
+    if not row:
+        return False
+    first = row[0].strip().lower()
+    return first == "id" or first.startswith("#")
+
+
+class MergeProfile:
+    """一门语言编译好的合并配置，由 get_profile(lang) 创建。"""
+
+    def __init__(self, lang: str, spec: Dict[str, Any]):
+        self.lang = lang
+        self.xx = spec["xx"]
+        self.header = ["id", "en", spec.get("xx_header", self.xx)]
+        self.xx_names = tuple(spec.get("xx_names", (self.xx,)))
+        self.columns: Optional[Tuple[int, int]] = spec.get("columns")
+        self.clean = Cleaner(
+            spec["edge"],
+            numbering=spec.get("numbering", False),
+            empty_brackets=spec.get("empty_brackets", False),
+            drop=spec.get("drop", CONTROL),
+            dot_runs=spec.get("dot_runs", False),
+        )
+        self.min_words: int = spec["min_words"]
+        self.max_words: Optional[int] = spec.get("max_words")
+        self.max_digit_ratio: Optional[float] = spec.get("max_digit_ratio")
+        self.check_en: bool = spec.get("check_en", True)
+        self.dedup: bool = spec.get("dedup", True)
+        self.version = profile_version(spec)  # 清洗缓存用
+
+    def with_thresholds(self, **thresholds) -> "MergeProfile":
+        """换掉 min_words / max_words / max_digit_ratio（脚本里的常量），共用已编译的 Cleaner。"""
+        unknown = set(thresholds) - set(THRESHOLDS)
+        if unknown:
+            raise ValueError(f"未知的阈值: {sorted(unknown)}（可选 {' / '.join(THRESHOLDS)}）")
+        profile = copy.copy(self)
+        for name, value in thresholds.items():
+            setattr(profile, name, value)
+        return profile
+
+    def detect_columns(self, header: List[str]) -> Tuple[int, int]:
+        """从表头自动检测 en / xx 列索引；找不到就默认最后两列。"""
+        lower = [h.lower().strip() for h in header]
+        en_idx = None
+        xx_idx = None
+        for i, name in enumerate(lower):
+            if name == "en":
+                en_idx = i
+            elif name in self.xx_names:
+                xx_idx = i
+        if en_idx is not None and xx_idx is not None:
+            return en_idx, xx_idx
+        if len(header) >= 2:
+            return len(header) - 2, len(header) - 1
+        raise ValueError(f"无法从表头中识别 en / {self.xx} 列，请检查输入 TSV 的列名。")
+
+    def _side_ok(self, text: str) -> bool:
+        if not text:
+            return False
+        n = count_words(text)
+        if n < self.min_words or (self.max_words is not None and n > self.max_words):
+            return False
+        if self.max_digit_ratio is not None and digit_ratio(text) > self.max_digit_ratio:
+            return False
+        return True
+
+    def accept(self, en_clean: str, xx_clean: str) -> bool:
+        """清洗后的句对是否通过句长 / 数字比例过滤（不含去重）。"""
+        if self.check_en and not self._side_ok(en_clean):
+            return False
+        return self._side_ok(xx_clean)
+
+    def accept_raw(self, en_raw: str, xx_raw: str) -> bool:
+        """原文先按本语言的规则清洗，再做 accept。"""
+        if self.check_en and not self._side_ok(self.clean(en_raw)):
+            return False
+        return self._side_ok(self.clean(xx_raw))
+
+    def raw_pairs(self, path: str) -> Iterator[Tuple[str, str]]:
+        """逐行读出一个输入 TSV 的 (en, xx) 原文，跳过表头、空行和列数不够的行。"""
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f, delimiter="\t")
+            if self.columns is not None:
+                en_idx, xx_idx = self.columns
+                first = next(reader, None)
+                if first is None:
+                    return
+                rows = reader if is_header(first) else chain([first], reader)
+            else:
+                en_idx = xx_idx = None
+                for row in reader:  # 第一个非空行当表头
+                    if not row:
+                        continue
+                    try:
+                        en_idx, xx_idx = self.detect_columns(row)
+                    except Exception as e:
+                        print(f"[WARN] {path} 自动检测表头失败: {e}")
+                        en_idx, xx_idx = len(row) - 2, len(row) - 1
+                    break
+                if en_idx is None:
+                    return
+                rows = reader
+            for row in rows:
+                if not row:
+                    continue
+                n = len(row)
+                if not (-n <= en_idx < n and -n <= xx_idx < n):
+                    continue
+                yield row[en_idx], row[xx_idx]
+
+    def features(self, raw: str) -> Features:
+        """清洗一句话，连同和阈值无关的特征一起返回：(清洗后的句子, 词数, 数字比例)。"""
+        text = self.clean(raw)
+        return text, count_words(text), digit_ratio(text)
+
+    def mask(self, table: FeatureTable):
+        """accept 的按列版本：table 每一行是否通过过滤。"""
+        return table.merge_mask(self.min_words, self.max_words, self.max_digit_ratio, self.check_en)
+
+    def table(self, raw: List[Tuple[str, str]]) -> FeatureTable:
+        """一块 (en, xx) 原文清洗后的特征表。"""
+        features = self.features
+        return FeatureTable.from_features([features(en) for en, _ in raw], [features(xx) for _, xx in raw])
+
+    def _rule_masks(self, table: FeatureTable) -> Iterator[Tuple[str, Any]]:
+        # 按检查顺序的 (规则名, 掩码)；和 accept 一样，先查 en 一侧（check_en 时），再查 xx 一侧
+        for side in SIDES if self.check_en else ("xx",):
+            yield f"{side}_min_words", table.side_mask(side, self.min_words)
+            if self.max_words is not None:
+                yield f"{side}_max_words", table.side_mask(side, 0, self.max_words)
+            if self.max_digit_ratio is not None:
+                yield f"{side}_digit_ratio", table.side_mask(side, 0, None, self.max_digit_ratio)
+
+    def counted_mask(self, table: FeatureTable, rules: RuleStats):
+        """
+        和 mask 结果相同，同时把每条规则的通过 / 拒绝数和耗时记进 rules：
+        每行算在第一条没通过的规则头上，没有一行走到的规则不出现，和逐行检查的计数一致。
+        """
+        reach = table.all_rows()
+        t0 = perf_counter_ns()
+        for name, mask in self._rule_masks(table):
+            passed = both(reach, mask)
+            n_reach, n_passed = count_true(reach), count_true(passed)
+            now = perf_counter_ns()
+            if n_reach:
+                rules.add(name, n_passed, n_reach - n_passed, now - t0)
+            reach, t0 = passed, now
+        return reach
+
+    def select(self, table: FeatureTable, rules: Optional[RuleStats] = None) -> Iterator[Tuple[str, str]]:
+        """table 里通过过滤的 (en, xx)（清洗后），按行顺序；rules 不为 None 时按规则计数。"""
+        mask = self.mask(table) if rules is None else self.counted_mask(table, rules)
+        en_texts, xx_texts = table.texts["en"], table.texts["xx"]
+        for i in table.selected(mask):
+            yield en_texts[i], xx_texts[i]
+
+    def clean_pairs(self, raw: Iterable[Tuple[str, str]],
+                    rules: Optional[RuleStats] = None) -> Iterator[Tuple[str, str]]:
+        """
+        清洗 (en, xx) 原文，只留下通过过滤的，还没有去重。
+        每 CHUNK_ROWS 行建一张 FeatureTable，阈值比较是按列的掩码运算（见 xbench.features）；
+        rules 不为 None 时整块的清洗时间记作 "clean"，各条阈值规则按掩码计数 / 计时（见 counted_mask）。
+        """
+        for chunk in _chunks(raw, CHUNK_ROWS):
+            t0 = perf_counter_ns()
+            table = self.table(chunk)
+            if rules is not None:
+                rules.rows += len(chunk)
+                rules.add("clean", passed=len(chunk), ns=perf_counter_ns() - t0)
+            yield from self.select(table, rules)
+
+    def pairs(self, path: str, rules: Optional[RuleStats] = None) -> Iterator[Tuple[str, str]]:
+        """一个输入 TSV 里清洗后通过过滤的 (en, xx)，还没有去重。"""
+        return self.clean_pairs(self.raw_pairs(path), rules)
+
+
+@lru_cache(maxsize=None)
+def get_profile(lang: str) -> MergeProfile:
+    if lang not in PROFILES:
+        raise ValueError(f"没有 {lang} 的合并配置（可选 {' / '.join(sorted(PROFILES))}）")
+    return MergeProfile(lang, PROFILES[lang])
+
+
+def script_thresholds(module) -> Dict[str, Any]:
+    """一个 <lang>_merge.py 模块里定义了的阈值常量，按 THRESHOLDS 的名字返回。"""
+    values = {}
+    for name, constants in SCRIPT_CONSTANTS.items():
+        for constant in constants:
+            if hasattr(module, constant):
+                values[name] = getattr(module, constant)
+    return values
+
+
+@lru_cache(maxsize=None)
+def merge_filter(lang: str) -> MergeProfile:
+    """
+    scripts/<lang>/<lang>_merge.py 实际使用的 MergeProfile（阈值取脚本里的常量）。
+    抽样脚本用它在抽样时就按合并阶段的规则过滤，抽中的句对合并时不会再被删掉。
+    """
+    path = os.path.join(SCRIPTS_DIR, lang, f"{lang}_merge.py")
+    spec = importlib.util.spec_from_file_location(f"{lang}_merge", path)
+    module = importlib.util.module_from_spec(spec)
+    saved = list(sys.path)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path[:] = saved  # 脚本开头的 sys.path.insert 不留在抽样脚本的进程里
+    return get_profile(lang).with_thresholds(**script_thresholds(module))
+
+
+def _clean_chunk(task: Tuple[str, Dict[str, Any], List[Tuple[str, str]], bool]
+                 ) -> Tuple[List[Tuple[str, str]], Optional[RuleStats]]:
+    # 子进程里执行：get_profile 在每个子进程里只编译一次；counted 时连同这一块的规则统计一起返回
+    lang, thresholds, raw, counted = task
+    rules = RuleStats() if counted else None
+    return list(get_profile(lang).with_thresholds(**thresholds).clean_pairs(raw, rules)), rules
+
+
+def _featurize(task: Tuple[str, List[str]]) -> List[Features]:
+    # 子进程里执行（清洗缓存没命中的句子）
+    lang, texts = task
+    profile = get_profile(lang)
+    return [profile.features(text) for text in texts]
+
+
+def _chunk_features(lang: str, profile: MergeProfile, chunk: List[Tuple[str, str]],
+                    cache: Optional[CleanCache], pool: Optional[Executor], jobs: int) -> Dict[str, Features]:
+    """一块 (en, xx) 原文里每个不同句子的 Features：先查缓存，没命中的（有进程池时分给子进程）清洗后写回。"""
+    texts = {text for pair in chunk for text in pair}
+    if cache is not None:
+        keys = cache.keys(profile.version, texts)
+        found = cache.get_many(keys)
+        missing = [(key, raw) for key, raw in keys.items() if raw not in found]
+    else:
+        found = {}
+        missing = [(None, raw) for raw in texts]
+    if missing:
+        texts = [raw for _, raw in missing]
+        if pool is None:
+            computed = _featurize((lang, texts))
+        else:
+            step = -(-len(texts) // jobs)
+            parts = [(lang, texts[i:i + step]) for i in range(0, len(texts), step)]
+            computed = [f for part in pool.map(_featurize, parts) for f in part]
+        if cache is not None:
+            cache.put_many(zip((key for key, _ in missing), computed))
+        found.update(zip(texts, computed))
+    return found
+
+
+def cached_pairs(lang: str, thresholds: Dict[str, Any], path: str, cache: CleanCache,
+                 pool: Optional[Executor] = None, jobs: int = 1,
+                 chunk_rows: int = CHUNK_ROWS, rules: Optional[RuleStats] = None) -> Iterator[Tuple[str, str]]:
+    """
+    和 get_profile(lang).pairs(path) 产出完全相同的序列，但先查清洗缓存：
+    每 chunk_rows 行批量查一次，没命中的句子（有进程池时分给子进程）清洗后写回缓存，
+    然后把整块的特征排成 FeatureTable，阈值比较是几次按列的掩码运算。
+    rules 不为 None 时整块的查缓存 / 清洗时间记作 "clean"，阈值规则按掩码计数 / 计时。
+    """
+    profile = get_profile(lang).with_thresholds(**thresholds)
+    for chunk in _chunks(profile.raw_pairs(path), chunk_rows):
+        t0 = perf_counter_ns()
+        found = _chunk_features(lang, profile, chunk, cache, pool, jobs)
+        if rules is not None:
+            rules.rows += len(chunk)
+            rules.add("clean", passed=len(chunk), ns=perf_counter_ns() - t0)
+        yield from profile.select(
+            FeatureTable.from_features([found[en] for en, _ in chunk], [found[xx] for _, xx in chunk]), rules)
+
+
+def feature_table(lang: str, path: str, cache: Optional[CleanCache] = None,
+                  pool: Optional[Executor] = None, jobs: int = 1,
+                  chunk_rows: int = CHUNK_ROWS) -> FeatureTable:
+    """
+    一个输入 TSV 所有 (en, xx) 行的特征表（还没有过滤和去重），行顺序和 raw_pairs 相同。
+    特征和阈值无关，算一次之后可以用任意多组阈值做掩码（见 tools/sweep_thresholds.py）。
+    """
+    profile = get_profile(lang)
+    en_features: List[Features] = []
+    xx_features: List[Features] = []
+    for chunk in _chunks(profile.raw_pairs(path), chunk_rows):
+        found = _chunk_features(lang, profile, chunk, cache, pool, jobs)
+        en_features += [found[en] for en, _ in chunk]
+        xx_features += [found[xx] for _, xx in chunk]
+    return FeatureTable.from_features(en_features, xx_features)
+
+
+def _chunks(raw: Iterable[Tuple[str, str]], size: int) -> Iterator[List[Tuple[str, str]]]:
+    it = iter(raw)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parallel_pairs(lang: str, thresholds: Dict[str, Any], path: str, pool: Executor,
+                   jobs: int, chunk_rows: int = CHUNK_ROWS,
+                   rules: Optional[RuleStats] = None) -> Iterator[Tuple[str, str]]:
+    """
+    和 get_profile(lang).pairs(path) 产出完全相同的序列，但清洗 / 过滤在进程池里做：
+    主进程只解析 TSV、按 chunk_rows 行切块提交，按提交顺序取回结果；
+    同时在途的块不超过 2 * jobs 个，内存不随文件大小增长。
+    rules 不为 None 时子进程各自计数 / 计时，取回结果时累加进来（耗时是各子进程的 CPU 时间之和）。
+    """
+    def collect(future: Future) -> List[Tuple[str, str]]:
+        pairs, chunk_rules = future.result()
+        if rules is not None:
+            rules.update(chunk_rules)
+        return pairs
+
+    pending: Deque[Future] = deque()
+    for chunk in _chunks(get_profile(lang).raw_pairs(path), chunk_rows):
+        pending.append(pool.submit(_clean_chunk, (lang, thresholds, chunk, rules is not None)))
+        if len(pending) >= 2 * jobs:
+            yield from collect(pending.popleft())
+    while pending:
+        yield from collect(pending.popleft())
+
+
+def resolve_input(path: str) -> Optional[str]:
+    if os.path.isfile(path):
+        return path
+    if os.path.isfile(path + ".tsv"):  # 文件名里漏写了 .tsv 后缀
+        return path + ".tsv"
+    return None
+
+
+def merge_language(lang: str, input_files: List[str], output_file: str,
+                   dedup: str = "set", jobs: int = 1, clean_cache: Optional[str] = None,
+                   rule_report: bool = False, **thresholds) -> int:
+    """
+    按 PROFILES[lang] 合并 input_files，写出 output_file，返回保留的句对数。
+    thresholds 可以覆盖 min_words / max_words / max_digit_ratio（脚本里的常量）；
+    dedup 是去重集合的类型（见 xbench.dedup.new_seen）。
+    jobs > 1 时清洗 / 过滤在 jobs 个子进程里做（见 parallel_pairs），去重和编号仍在主进程里
+    按原来的文件顺序、行顺序进行，输出和 jobs=1 逐字节相同。
+    clean_cache 是清洗缓存文件（SQLite，见 xbench.clean_cache）；只改阈值重跑时不用再清洗。
+    rule_report 为 True 时每个输入文件按规则（清洗、两侧词数下限 / 上限、数字比例、去重）计数 / 计时，
+    写出 output_file.rules.json（见 xbench.rule_stats）。
+
+    逐行读、逐行写（带缓冲），内存里只有去重集合，所以同样可以用在整份语料的候选池上；
+    先写到 output_file.tmp，全部写完再换成 output_file。
+    """
+    profile = get_profile(lang).with_thresholds(**thresholds)
+    seen_pairs = new_seen(dedup) if profile.dedup else None
+    final_rows = 0
+    corpora: Dict[str, Dict[str, Any]] = {}
+
+    tmp_path = output_file + ".tmp"
+    with ExitStack() as stack:
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=jobs)) if jobs > 1 else None
+        cache = stack.enter_context(CleanCache(clean_cache)) if clean_cache else None
+        f_out = stack.enter_context(open(tmp_path, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER))
+        writer = csv.writer(f_out, delimiter="\t")
+        writer.writerow(profile.header)
+
+        for path in input_files:
+            found = resolve_input(path)
+            if found is None:
+                print(f"[WARN] 找不到文件: {path}，跳过。")
+                continue
+
+            print(f"[INFO] 读取: {found}")
+            rules = RuleStats(os.path.basename(found)) if rule_report else None
+            kept_before = final_rows
+            if cache is not None:
+                pairs = cached_pairs(lang, thresholds, found, cache, pool, jobs, rules=rules)
+            elif pool is None:
+                pairs = profile.pairs(found, rules)
+            else:
+                pairs = parallel_pairs(lang, thresholds, found, pool, jobs, rules=rules)
+            for en_clean, xx_clean in pairs:
+                if seen_pairs is not None:
+                    t0 = perf_counter_ns() if rules is not None else 0
+                    key = (en_clean.lower(), xx_clean.lower())
+                    duplicate = key in seen_pairs
+                    if not duplicate:
+                        seen_pairs.add(key)
+                    if rules is not None:
+                        rules.add("dedup", int(not duplicate), int(duplicate), perf_counter_ns() - t0)
+                    if duplicate:
+                        continue
+
+                final_rows += 1
+                writer.writerow([str(final_rows), en_clean, xx_clean])
+            if rules is not None:
+                corpora[rules.corpus] = rules.as_dict(final_rows - kept_before)
+
+        if cache is not None:
+            print(f"[INFO] 清洗缓存 {clean_cache}：命中 {cache.hits} 句，新清洗 {cache.misses} 句")
+
+    os.replace(tmp_path, output_file)
+    if rule_report:
+        write_rule_report(output_file + ".rules.json", "merge", corpora, lang=lang, output=output_file, kept=final_rows)
+    print(f"[INFO] 最终保留句对数：{final_rows}")
+    print(f"[INFO] 写出到: {output_file}")
+    return final_rows
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+"""
+近似去重：MinHash 签名 + 分段 LSH，找出几乎相同的句子（只差标点、一两个词的字幕行，
+轻微改过的维基句子……）。*_merge.py 和 extsort 只去掉完全相同的键，这些都会留下来。
+
+  1. 键（默认是 xx 列折叠空白、转小写后的句子，和 extsort.xx_key 相同）切成长度为 shingle 的
+     字符片段，每个片段哈希一次；
+  2. 签名用 one-permutation MinHash：片段哈希的高位决定落进 num_perm 个桶里的哪一个，
+     每个桶记最小值，空桶向右借最近的非空桶（densification）。每句话只哈希一遍，
+     不需要 num_perm 次置换，纯 Python 也跑得动整份语料；两句签名相同位置的比例估计 Jaccard 相似度；
+  3. 签名分成 bands 段，每段 rows 个值；任意一段完全相同的两句成为候选，
+     再用签名相似度 >= threshold 确认（bands / rows 按 threshold 自动选，见 choose_bands）。
+
+按行顺序处理，每个簇由第一次出现的行代表（和精确去重的“保留第一次出现”一致）：
+一行和已有代表近似重复就归进那个簇，否则自己成为新的代表。每行最多和 bands 个代表比较，
+总代价和行数成正比；内存只有代表行的签名和 LSH 桶（每个代表约 1 KB），不存句子本身。
+"""
+
+import csv
+import time
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from .extsort import KeyFunc, _chain_first, xx_key
+from .merge_engine import CHUNK_ROWS, _chunks
+
+# 默认参数：5 个字符的片段，64 个桶，Jaccard >= 0.8 算近似重复
+SHINGLE = 5
+NUM_PERM = 64
+THRESHOLD = 0.8
+
+_MASK64 = (1 << 64) - 1
+_MIX = 0x9E3779B97F4A7C15  # 64 位乘法散列常数（奇数）
+_EMPTY = 0xFFFFFFFF
+_BORROW = 0x6A09E667  # 空桶借值时按距离加的偏移
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    在 bands * rows == num_perm 的分法里，选 LSH 的“拐点”(1/bands)^(1/rows) 最接近 threshold 的一种。
+    相似度为 s 的两句成为候选的概率是 1 - (1 - s^rows)^bands。
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        gap = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or gap < best[0]:
+            best = (gap, bands, rows)
+    return best[1], best[2]
+
+
+class MinHasher:
+    """字符片段的 one-permutation MinHash 签名（num_perm 须是 2 的幂）。"""
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle: int = SHINGLE):
+        if num_perm < 2 or num_perm & (num_perm - 1):
+            raise ValueError(f"num_perm 必须是 2 的幂：{num_perm}")
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self._bin_shift = 64 - (num_perm.bit_length() - 1)
+
+    def shingles(self, text: str) -> set:
+        k = self.shingle
+        if len(text) <= k:
+            return {text}
+        return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+    def signature(self, text: str) -> Optional[array]:
+        """text 的签名（num_perm 个 32 位整数）；空串返回 None。"""
+        if not text:
+            return None
+        sig = [_EMPTY] * self.num_perm
+        shift = self._bin_shift
+        crc32 = zlib.crc32
+        for piece in self.shingles(text):
+            mixed = (crc32(piece.encode("utf-8", "surrogatepass")) * _MIX) & _MASK64
+            b = mixed >> shift
+            v = (mixed >> 16) & _EMPTY
+            if v < sig[b]:
+                sig[b] = v
+        if _EMPTY in sig:
+            self._densify(sig)
+        return array("I", sig)
+
+    def _densify(self, sig: List[int]):
+        # 空桶取右边（循环）最近的非空桶的值，再按距离加偏移（Shrivastava & Li 的 rotation densification，估计仍然无偏）
+        n = len(sig)
+        filled = [v != _EMPTY for v in sig]
+        for j in range(n):
+            if filled[j]:
+                continue
+            for dist in range(1, n):
+                src = (j + dist) % n
+                if filled[src]:
+                    sig[j] = (sig[src] + dist * _BORROW) & _EMPTY
+                    break
+
+
+def similarity(a: array, b: array) -> float:
+    """两个签名相同位置的比例，估计 Jaccard 相似度。"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class NearDupIndex:
+    """
+    按行顺序喂进去，返回每行是不是已有代表的近似重复。
+
+        index = NearDupIndex(threshold=0.8)
+        index.add(1, "the cat sat on the mat")        # -> None（新代表）
+        index.add(2, "the cat sat on the mat .")      # -> (1, 0.86)（归进 1 的簇）
+    """
+
+    def __init__(self, threshold: float = THRESHOLD, num_perm: int = NUM_PERM,
+                 shingle: int = SHINGLE, bands: Optional[int] = None):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle)
+        if bands is None:
+            bands, _ = choose_bands(num_perm, threshold)
+        if num_perm % bands:
+            raise ValueError(f"bands 必须整除 num_perm：{bands} / {num_perm}")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: List[Dict[bytes, int]] = [{} for _ in range(bands)]
+        self._sigs: List[array] = []
+        self._ids: List[int] = []
+
+    def __len__(self) -> int:
+        """代表（簇）的个数。"""
+        return len(self._ids)
+
+    def _band_keys(self, sig: array) -> List[bytes]:
+        r = self.rows
+        return [sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def add(self, row_id: int, text: str) -> Optional[Tuple[int, float]]:
+        """
+        text 和某个已有代表近似重复就返回 (代表的 row_id, 签名相似度)，行本身不进索引；
+        否则登记为新代表，返回 None。空串不参与，返回 None。
+        """
+        return self.add_signature(row_id, self.hasher.signature(text))
+
+    def add_signature(self, row_id: int, sig: Optional[array]) -> Optional[Tuple[int, float]]:
+        """和 add 相同，只是签名已经算好（例如在子进程里算的）。"""
+        if sig is None:
+            return None
+        keys = self._band_keys(sig)
+        candidates = sorted({bucket[key] for bucket, key in zip(self._buckets, keys) if key in bucket})
+        for rep in candidates:
+            sim = similarity(sig, self._sigs[rep])
+            if sim >= self.threshold:
+                return self._ids[rep], sim
+        rep = len(self._ids)
+        self._ids.append(row_id)
+        self._sigs.append(sig)
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, rep)
+        return None
+
+
+def _signatures(task: Tuple[int, int, List[Optional[str]]]) -> List[Optional[array]]:
+    # 子进程里执行：一块键的签名（None 的键没有签名）
+    num_perm, shingle, keys = task
+    hasher = MinHasher(num_perm, shingle)
+    return [hasher.signature(key) if key is not None else None for key in keys]
+
+
+def _signed_chunks(rows: Iterator[List[str]], key_func: KeyFunc, hasher: MinHasher,
+                   pool: Optional[Executor], jobs: int, chunk_rows: int
+                   ) -> Iterator[Tuple[List[List[str]], List[Optional[str]], List[Optional[array]]]]:
+    """按 chunk_rows 行切块，产出 (行, 键, 签名)；有进程池时签名在子进程里算，按提交顺序取回。"""
+    pending: Deque[Tuple[List[List[str]], List[Optional[str]], Future]] = deque()
+    for chunk in _chunks(rows, chunk_rows):
+        keys = [key_func(row) for row in chunk]
+        if pool is None:
+            yield chunk, keys, _signatures((hasher.num_perm, hasher.shingle, keys))
+            continue
+        pending.append((chunk, keys, pool.submit(_signatures, (hasher.num_perm, hasher.shingle, keys))))
+        if len(pending) >= 2 * jobs:
+            chunk, keys, future = pending.popleft()
+            yield chunk, keys, future.result()
+    while pending:
+        chunk, keys, future = pending.popleft()
+        yield chunk, keys, future.result()
+
+
+def near_dedup(input_tsv: str, output_tsv: Optional[str] = None, key_func: KeyFunc = xx_key,
+               threshold: float = THRESHOLD, num_perm: int = NUM_PERM, shingle: int = SHINGLE,
+               bands: Optional[int] = None, clusters_tsv: Optional[str] = None,
+               jobs: int = 1, chunk_rows: int = CHUNK_ROWS, verbose: bool = True) -> Dict[str, int]:
+    """
+    对 input_tsv 做近似去重，返回统计信息：
+      rows / kept / near_duplicates：数据行数、保留行数、归进别的簇的行数
+      clusters：至少有一个近似重复的簇的个数
+    output_tsv 不为 None 时写出去掉近似重复后的 TSV（保留表头和原来的行顺序）；
+    clusters_tsv 不为 None 时写出簇报告：rep_id, id, similarity, text（每个近似重复一行）。
+    key_func(row) 返回 None 的行原样保留、不参与去重。
+    jobs > 1 时签名在 jobs 个子进程里算（最花时间的部分），LSH 查找仍在主进程里按行顺序做，结果和 jobs=1 相同。
+    """
+    index = NearDupIndex(threshold, num_perm, shingle, bands)
+    stats = {"rows": 0, "kept": 0, "near_duplicates": 0, "clusters": 0}
+    reps_with_members = set()
+    t0 = time.time()
+
+    with ExitStack() as stack:
+        fin = stack.enter_context(open(input_tsv, "r", encoding="utf-8", newline=""))
+        reader = csv.reader(fin, delimiter="\t")
+        header = next(reader, None)
+        if header is None:
+            return stats
+        has_header = bool(header) and header[0].lower().startswith("id")
+        rows: Iterator[List[str]] = reader if has_header else _chain_first(header, reader)
+
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=jobs)) if jobs > 1 else None
+        writer = clusters = None
+        if output_tsv:
+            fout = stack.enter_context(open(output_tsv, "w", encoding="utf-8", newline=""))
+            writer = csv.writer(fout, delimiter="\t", lineterminator="\n")
+            if has_header:
+                writer.writerow(header)
+        if clusters_tsv:
+            fclu = stack.enter_context(open(clusters_tsv, "w", encoding="utf-8", newline=""))
+            clusters = csv.writer(fclu, delimiter="\t", lineterminator="\n")
+            clusters.writerow(["rep_id", "id", "similarity", "text"])
+
+        ordinal = 0
+        for chunk, keys, sigs in _signed_chunks(rows, key_func, index.hasher, pool, jobs, chunk_rows):
+            for row, key, sig in zip(chunk, keys, sigs):
+                row_id = int(row[0]) if row and row[0].isdigit() else ordinal
+                ordinal += 1
+                found = index.add_signature(row_id, sig)
+                if found is not None:
+                    rep_id, sim = found
+                    stats["near_duplicates"] += 1
+                    reps_with_members.add(rep_id)
+                    if clusters is not None:
+                        clusters.writerow([rep_id, row_id, f"{sim:.3f}", key])
+                    continue
+                stats["kept"] += 1
+                if writer is not None:
+                    writer.writerow(row)
+        stats["rows"] = ordinal
+
+    stats["clusters"] = len(reps_with_members)
+    if verbose:
+        print(f"[INFO] 近似去重 {input_tsv}：{stats['rows']} 行 -> {stats['kept']} 行，"
+              f"{stats['clusters']} 个簇里共 {stats['near_duplicates']} 行近似重复"
+              f"（threshold={threshold}, bands={index.bands}x{index.rows}），用时 {time.time() - t0:.1f}s")
+    return stats
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+读取 OPUS 下载的 Moses 格式原始文件（*.en / *.xx），并拼成 *.merged.tsv 的行。
+
+支持三种存放方式，按顺序尝试：
+  1) 已经解压好的纯文本文件（旧流程）
+  2) 同名的 .gz 文件
+  3) OPUS 的 Moses 压缩包（如 bn-en.txt.zip），直接从包内流式解压读取
+
+后两种都不需要先把几 GB 的文本解压到磁盘。
+
+iter_moses_rows() 把两侧文件直接拼成和读 *.merged.tsv 完全一样的行流，
+抽样脚本可以跳过合并脚本，不再写出 / 重读整份 merged.tsv。
+merge_moses() 是各原始合并脚本 merge_parallel 的主体，可以定期存断点、被杀后续跑（见 xbench.checkpoint）。
+"""
+
+import csv
+import gzip
+import io
+import os
+import zipfile
+from contextlib import ExitStack, contextmanager
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from .bloom import CorpusBloom, register_lines
+from .checkpoint import Checkpoint
+
+
+def find_zip_member(zf: zipfile.ZipFile, name: str) -> Optional[str]:
+    """在压缩包里按文件名（忽略目录）查找成员，找不到返回 None。"""
+    for member in zf.namelist():
+        if os.path.basename(member) == name:
+            return member
+    return None
+
+
+def open_moses(path: str, archive: Optional[str] = None) -> IO[str]:
+    """
+    以文本模式（utf-8，通用换行，和原来的 open(..., "r") 一致）打开一个 Moses 单语文件。
+
+    path:    期望的文件路径，如 .../OpenSubtitles.bn-en.bn
+    archive: OPUS 的 *.zip 路径；path 和 path.gz 都不存在时，从包里读取同名成员
+    """
+    if os.path.isfile(path):
+        if path.endswith(".gz"):
+            return gzip.open(path, "rt", encoding="utf-8")
+        return open(path, "r", encoding="utf-8")
+
+    if os.path.isfile(path + ".gz"):
+        return gzip.open(path + ".gz", "rt", encoding="utf-8")
+
+    if archive and os.path.isfile(archive):
+        # 成员文件打开后持有底层文件的引用，关掉 ZipFile 本身不影响继续读
+        with zipfile.ZipFile(archive) as zf:
+            member = find_zip_member(zf, os.path.basename(path))
+            if member is None:
+                raise FileNotFoundError(f"{archive} 里找不到 {os.path.basename(path)}")
+            return io.TextIOWrapper(zf.open(member), encoding="utf-8")
+
+    raise FileNotFoundError(f"找不到 {path}（也没有 {path}.gz 或压缩包 {archive}）")
+
+
+@contextmanager
+def open_moses_pair(en_path: str, xx_path: str, archive: Optional[str] = None) -> Iterator[Tuple[IO[str], IO[str]]]:
+    """同时打开 en / xx 两侧文件，退出时一起关闭。"""
+    with ExitStack() as stack:
+        f_en = stack.enter_context(open_moses(en_path, archive))
+        f_xx = stack.enter_context(open_moses(xx_path, archive))
+        yield f_en, f_xx
+
+
+def iter_merged_lines(f_en: Iterable[str], f_xx: Iterable[str], start: int = 1) -> Iterator[str]:
+    """按 merge_parallel 写 *.merged.tsv 的格式逐行产出数据行（不含表头），编号从 start 开始。"""
+    for idx, (en_line, xx_line) in enumerate(zip(f_en, f_xx), start=start):
+        en_line = en_line.rstrip("\n\r")
+        xx_line = xx_line.rstrip("\n\r")
+        yield f"{idx}\t{en_line}\t{xx_line}\n"
+
+
+def merge_moses(en_path: str, xx_path: str, out_path: str, header: Optional[str],
+                zip_path: Optional[str] = None, bloom_file: Optional[str] = None,
+                checkpoint: Optional[Checkpoint] = None, bloom_capacity: Optional[int] = None,
+                bloom_fp_rate: Optional[float] = None) -> Tuple[int, bool]:
+    """
+    原始合并脚本 merge_parallel 的主体：把两侧文件按行拼成 out_path（header 为 None 时不写表头），
+    同时把 xx 句子登记进 bloom_file（见 xbench.bloom.register_lines）。返回 (合并行数, 两侧行数是否一致)。
+    bloom_file 还不存在时按 bloom_capacity / bloom_fp_rate（脚本里的 BLOOM_CAPACITY / BLOOM_FP_RATE）新建。
+
+    checkpoint（xbench.checkpoint.Checkpoint）不为 None 时定期存断点：两侧文件的读取位置、行数和输出长度。
+    能续跑时把 out_path 截回断点时的长度，两侧文件 seek 到断点处接着合并；out_path 比断点时还短（写盘没落地）就从头来。
+    两侧按 readline() 读，这样每行读完时 tell() 都可用。
+    """
+    inputs = [p for p in (en_path, en_path + ".gz", xx_path, xx_path + ".gz", zip_path) if p]
+    params = {"header": header, "bloom_file": bloom_file, "bloom_capacity": bloom_capacity, "bloom_fp_rate": bloom_fp_rate}
+    state = checkpoint.begin(inputs, params) if checkpoint else None
+    if state is not None and (not os.path.isfile(out_path) or os.path.getsize(out_path) < state["out_bytes"]):
+        print(f"[WARN] {out_path} 比断点时短，从头开始")
+        state = None
+    if state is not None:
+        os.truncate(out_path, state["out_bytes"])
+
+    bloom = CorpusBloom.open(bloom_file, bloom_capacity, bloom_fp_rate) if bloom_file else None
+    with open_moses_pair(en_path, xx_path, zip_path) as (f_en, f_xx), \
+         open(out_path, "w" if state is None else "a", encoding="utf-8", newline="\n") as fout:
+        if state is None:
+            count = 0
+            if header:
+                fout.write(header)
+        else:
+            f_en.seek(state["en"])
+            f_xx.seek(state["xx"])
+            count = state["rows"]
+
+        lines = iter_merged_lines(iter(f_en.readline, ""), iter(f_xx.readline, ""), start=count + 1)
+        for line in register_lines(lines, bloom, out_path):
+            fout.write(line)
+            count += 1
+            if checkpoint is not None and checkpoint.due():
+                fout.flush()
+                os.fsync(fout.fileno())
+                if bloom is not None:
+                    bloom.save()
+                checkpoint.save({"en": f_en.tell(), "xx": f_xx.tell(), "rows": count,
+                                 "out_bytes": os.fstat(fout.fileno()).st_size})
+
+        extra_en = f_en.readline()
+        extra_xx = f_xx.readline()
+    if checkpoint is not None:
+        checkpoint.done()
+    return count, not (extra_en or extra_xx)
+
+
+def iter_moses_rows(en_path: str, xx_path: str, lang: str,
+                    zip_path: Optional[str] = None,
+                    debug_tsv: Optional[str] = None) -> Iterator[List[str]]:
+    """
+    合并 + 解析一步完成：直接从 Moses 两侧文件产出 [id, en, xx] 行（第一行是表头）。
+
+    行仍交给 csv.reader 解析，所以引号等边界情况和"先写 merged.tsv 再读回来"完全一致。
+    debug_tsv: 调试用，给出路径时顺带把实际读过的行写成 merged.tsv
+               （抽样只读前 MAX_LINES 行时，这里也只有这部分）。
+    """
+    with open_moses_pair(en_path, xx_path, zip_path) as (f_en, f_xx), ExitStack() as stack:
+        lines: Iterable[str] = iter_merged_lines(f_en, f_xx)
+        header = f"id\ten\t{lang}\n"
+        if debug_tsv:
+            fout = stack.enter_context(open(debug_tsv, "w", encoding="utf-8", newline="\n"))
+            fout.write(header)
+            lines = _tee_lines(lines, fout)
+        yield next(csv.reader([header], delimiter="\t"))
+        yield from csv.reader(lines, delimiter="\t")
+
+
+def _tee_lines(lines: Iterable[str], fout: IO[str]) -> Iterator[str]:
+    for line in lines:
+        fout.write(line)
+        yield line
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+各语言合并阶段（*_merge.py）的声明式配置，由 xbench.merge_engine 编译成 MergeProfile。
+
+原来 6 个 *_merge.py 各抄一份 clean_text / count_words / digit_ratio / 表头检测，
+区别只在下面这些字段：
+  xx                   语言列名；xx_header 是输出表头里的列名（id 用 id_text，避免和编号列混淆）
+  xx_names             输入表头里能认作 xx 列的名字
+  columns              None：按表头里的列名找 en / xx；(en_idx, xx_idx)：固定列（hu），第一行像表头时跳过
+  edge                 首尾要去掉的符号（正则字符类的写法）
+  numbering / empty_brackets / drop / dot_runs   清洗步骤，见 xbench.cleaning.Cleaner
+  min_words / max_words    句长（按空格分词）范围；max_words 为 None 表示不设上限
+  max_digit_ratio      数字 / (字母+数字) 的上限；None 表示不检查
+  check_en             en 一侧是否也要非空、满足句长 / 数字比例
+  dedup                是否按 (en.lower(), xx.lower()) 去重
+"""
+
+from typing import Any, Dict
+
+from .cleaning import CONTROL, EDGE_CHARS, ELLIPSIS, EMOJI
+
+# bn / ur / ms：去编号、emoji、省略号，过滤数字比例
+_FULL = {
+    "numbering": True,
+    "drop": CONTROL + EMOJI + ELLIPSIS,
+    "dot_runs": True,
+    "min_words": 8,
+    "max_words": 45,
+    "max_digit_ratio": 0.3,
+}
+
+# fa / id：只去首尾符号和控制字符
+_LIGHT = {
+    "numbering": False,
+    "drop": CONTROL,
+    "dot_runs": False,
+    "min_words": 8,
+    "max_words": 55,
+    "max_digit_ratio": None,
+}
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "bn": {
+        **_FULL,
+        "xx": "bn",
+        # 加上孟加拉常见句号 "।"
+        "edge": r'\s\-\–\—\·\•\(\)\[\]\{\}"“”‘’\'`…·।!?？！,.;:·',
+    },
+    "ur": {
+        **_FULL,
+        "xx": "ur",
+        # 加上乌尔都语句号 "۔"
+        "edge": r'\s\-\–\—\·\•\(\)\[\]\{\}"“”‘’\'`…·۔۔!?？！,.;:·',
+    },
+    "ms": {
+        **_FULL,
+        "xx": "ms",
+        "edge": EDGE_CHARS,
+    },
+    "fa": {
+        **_LIGHT,
+        "xx": "fa",
+        "edge": EDGE_CHARS,
+    },
+    "id": {
+        **_LIGHT,
+        "xx": "id",
+        "xx_header": "id_text",
+        "xx_names": ("id", "id_text"),
+        "edge": EDGE_CHARS,
+    },
+    "hu": {
+        "xx": "hu",
+        "columns": (1, -1),  # en 在第 2 列，hu 在最后一列
+        "edge": r'\s\(\)\[\]\{\}"“”\'«»„‚…\-–—',
+        "empty_brackets": True,
+        "drop": [],
+        "min_words": 8,
+        "max_words": None,
+        "max_digit_ratio": None,
+        "check_en": False,  # 只看 hu 一侧
+        "dedup": False,
+    },
+}
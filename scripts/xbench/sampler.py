@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+
+"""
+各 *_250.py / *_200.py 抽样脚本共用的流程：读行 -> process_line 过滤 -> 随机抽样 -> 写出。
+
+语言相关的过滤规则仍然写在各脚本自己的 process_line(row, candidates, seen) 里，
+这里只负责把行流喂给它，所以行既可以来自 *.merged.tsv，也可以来自
+xbench.opus.iter_moses_rows()（直接读 Moses 原始文件，不落地 merged.tsv）。
+
+抽样方式（SAMPLE_MODE）：
+  - "prefix"：只看前 MAX_LINES 行，候选全部留在内存里，固定种子打乱后取前 SAMPLE_SIZE 个（原始做法）
+  - "reservoir"：扫完整份语料，用 Algorithm L 蓄水池抽样。蓄水池只占 O(SAMPLE_SIZE)，
+                 但 process_line 的去重集合（DEDUP）会记下每个通过的不同句子，随语料增长：
+                 set 每句是整个字符串，digest64 / digest128 每句 16 / 32 字节（见 xbench.dedup）
+  - "offset"：只用于 *.merged.tsv 文件。随机跳到字节偏移处取所在的那一行，
+              不扫描整个文件，抽够 SAMPLE_SIZE 个通过过滤的行就停
+  - "index"：只用于 *.merged.tsv 文件。借助行偏移索引（xbench.line_index）均匀抽行号直接取行，
+             索引第一次用时建好，之后重复抽样不再扫描文件
+
+从 *.merged.tsv 做 prefix / reservoir 抽样时可以给一个 xbench.checkpoint.Checkpoint：
+定期把读取位置、候选容器和去重集合存成断点，进程被杀后从断点续跑，结果和一次跑完相同。
+"""
+
+import csv
+import math
+import os
+import random
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .checkpoint import Checkpoint
+from .dedup import new_seen
+from .line_index import LineIndex
+
+ProcessLine = Callable[[List[str], list, set], None]
+
+
+def read_merged_rows(input_tsv: str) -> Iterator[List[str]]:
+    """逐行读取 *.merged.tsv（含表头），和原来各脚本里的 csv.reader 用法一致。"""
+    with open(input_tsv, "r", encoding="utf-8") as fin:
+        yield from csv.reader(fin, delimiter="\t")
+
+
+def collect_candidates(rows: Iterable[List[str]], process_line: ProcessLine,
+                       max_lines: Optional[int], candidates=None, seen=None):
+    """
+    把前 max_lines 行（不含表头，None 表示全部）交给 process_line，返回收集候选的容器；
+    输入为空时返回 None。读够之后会关闭行流，不再读后面的内容。
+
+    candidates 默认是 list；也可以传入任何有 append() 的容器（如 Reservoir）。
+    seen 默认是 set；也可以传入 xbench.dedup.DigestSet 之类支持 in / add 的去重集合。
+    """
+    rows = iter(rows)
+    if candidates is None:
+        candidates = []
+    if seen is None:
+        seen = set()
+    try:
+        # 处理表头：如果第一列是 "id" 就跳过
+        first_row = next(rows, None)
+        if first_row is None:
+            return None
+
+        if not first_row[0].lower().startswith("id"):
+            # 没表头，把第一行当数据
+            process_line(first_row, candidates, seen)
+
+        for i, row in enumerate(rows, start=1):
+            if max_lines is not None and i > max_lines:
+                break
+            process_line(row, candidates, seen)
+    finally:
+        close = getattr(rows, "close", None)
+        if close is not None:
+            close()
+    return candidates
+
+
+def shuffle_sample(candidates: list, sample_size: int, seed: int = 42) -> list:
+    """固定种子打乱后取前 sample_size 个（与原来的 random.seed + random.shuffle 结果一致）。"""
+    random.Random(seed).shuffle(candidates)
+    return candidates[:sample_size]
+
+
+class Reservoir:
+    """
+    固定种子的蓄水池抽样（Algorithm L）。
+
+    通过过滤的候选按到达顺序 append 进来，始终只保留 size 个。
+    填满之后不是每来一个候选都抽一次随机数，而是直接算出下一个要替换的位置，
+    中间的候选只计数，随机数调用次数约为 O(size * log(N / size))。
+    同一个 seed、同样的输入顺序，结果完全一样。
+    """
+
+    def __init__(self, size: int, seed: int = 42):
+        self.size = size
+        self.seen = 0  # 一共到达过多少个候选
+        self._rng = random.Random(seed)
+        self._items: list = []
+        self._w = 1.0
+        self._next = 0  # size <= 0 时永远不替换
+        if size > 0:
+            self._w = math.exp(math.log(self._uniform()) / size)
+            self._next = size + self._skip() + 1
+
+    def _uniform(self) -> float:
+        """(0, 1) 上的均匀随机数，避开 log(0)。"""
+        u = self._rng.random()
+        while u == 0.0:
+            u = self._rng.random()
+        return u
+
+    def _skip(self) -> int:
+        return int(math.floor(math.log(self._uniform()) / math.log(1.0 - self._w)))
+
+    def append(self, item):
+        self.seen += 1
+        if self.seen <= self.size:
+            self._items.append(item)
+        elif self.seen == self._next:
+            self._items[self._rng.randrange(self.size)] = item
+            self._w *= math.exp(math.log(self._uniform()) / self.size)
+            self._next += self._skip() + 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def items(self) -> list:
+        """抽中的候选；再用同一个随机源打乱一次，输出顺序和在语料中的位置无关。"""
+        items = list(self._items)
+        self._rng.shuffle(items)
+        return items
+
+
+def _new_candidates(mode: str, sample_size: int, seed: int):
+    """mode 对应的候选容器：prefix 是 list，reservoir 是 Reservoir。"""
+    if mode == "prefix":
+        return []
+    if mode == "reservoir":
+        return Reservoir(sample_size, seed)
+    if mode in ("offset", "index"):
+        raise ValueError(f"SAMPLE_MODE = {mode!r} 需要能随机定位的 *.merged.tsv 文件，不能用于行流")
+    raise ValueError(f"未知的 SAMPLE_MODE: {mode!r}（可选 prefix / reservoir / offset / index）")
+
+
+def _finish(mode: str, candidates, sample_size: int, seed: int) -> Optional[Tuple[int, list]]:
+    if candidates is None:
+        return None
+    if mode == "prefix":
+        return len(candidates), shuffle_sample(candidates, sample_size, seed)
+    return candidates.seen, candidates.items()
+
+
+def draw_sample(rows: Iterable[List[str]], process_line: ProcessLine, mode: str,
+                max_lines: int, sample_size: int, seed: int = 42,
+                dedup: str = "set") -> Optional[Tuple[int, list]]:
+    """
+    按 mode 抽样，返回 (候选总数, 抽中的候选)；输入为空时返回 None。
+    dedup 决定 process_line 拿到的去重集合（见 xbench.dedup.new_seen）。
+    """
+    candidates = _new_candidates(mode, sample_size, seed)
+    limit = max_lines if mode == "prefix" else None
+    return _finish(mode, collect_candidates(rows, process_line, limit, candidates, new_seen(dedup)), sample_size, seed)
+
+
+def collect_candidates_resumable(input_tsv: str, process_line: ProcessLine, max_lines: Optional[int],
+                                 candidates, seen, checkpoint: Checkpoint, params: Dict[str, Any]):
+    """
+    collect_candidates 的 *.merged.tsv 版本，带断点：checkpoint.due() 时存下读取位置、已读行数、
+    candidates 和 seen；checkpoint 有能续的断点时换成断点里的容器，从断点处接着读。
+    行仍由 csv.reader 解析，只是按 readline() 逐行喂给它，这样每条记录读完时 tell() 都可用。
+    """
+    state = checkpoint.begin([input_tsv], params)
+    with open(input_tsv, "r", encoding="utf-8") as fin:
+        rows = csv.reader(iter(fin.readline, ""), delimiter="\t")
+        if state is None:
+            # 处理表头：如果第一列是 "id" 就跳过
+            first_row = next(rows, None)
+            if first_row is None:
+                return None
+            if not first_row[0].lower().startswith("id"):
+                # 没表头，把第一行当数据
+                process_line(first_row, candidates, seen)
+            i = 0
+        else:
+            fin.seek(state["pos"])
+            i, candidates, seen = state["rows"], state["candidates"], state["seen"]
+
+        for row in rows:
+            i += 1
+            if max_lines is not None and i > max_lines:
+                break
+            process_line(row, candidates, seen)
+            if checkpoint.due():
+                checkpoint.save({"pos": fin.tell(), "rows": i, "candidates": candidates, "seen": seen})
+    return candidates
+
+
+def draw_sample_from_tsv(input_tsv: str, process_line: ProcessLine, mode: str,
+                         max_lines: int, sample_size: int, seed: int = 42,
+                         dedup: str = "set", checkpoint: Optional[Checkpoint] = None) -> Optional[Tuple[int, list]]:
+    """
+    和 draw_sample 一样，但输入是 *.merged.tsv 路径，所以额外支持 mode="offset" / "index"。
+    prefix / reservoir 时给了 checkpoint 就定期存断点（能续跑时从断点继续），抽完后删掉断点。
+    """
+    if mode == "offset":
+        return draw_offset_sample(input_tsv, process_line, sample_size, seed, dedup=dedup)
+    if mode == "index":
+        return draw_indexed_sample(input_tsv, process_line, sample_size, seed, dedup=dedup)
+    if checkpoint is None:
+        return draw_sample(read_merged_rows(input_tsv), process_line, mode, max_lines, sample_size, seed, dedup)
+
+    candidates = _new_candidates(mode, sample_size, seed)
+    limit = max_lines if mode == "prefix" else None
+    params = {"mode": mode, "max_lines": limit, "sample_size": sample_size, "seed": seed, "dedup": dedup}
+    candidates = collect_candidates_resumable(input_tsv, process_line, limit, candidates, new_seen(dedup),
+                                              checkpoint, params)
+    result = _finish(mode, candidates, sample_size, seed)
+    checkpoint.done()
+    return result
+
+
+def _line_start(f, pos: int, lo: int) -> int:
+    """返回包含字节偏移 pos 的那一行的起始偏移（不早于 lo）。"""
+    end = pos
+    while end > lo:
+        begin = max(lo, end - 4096)
+        f.seek(begin)
+        chunk = f.read(end - begin)
+        i = chunk.rfind(b"\n")
+        if i >= 0:
+            return begin + i + 1
+        end = begin
+    return lo
+
+
+def draw_offset_sample(input_tsv: str, process_line: ProcessLine, sample_size: int,
+                       seed: int = 42, ref_len: int = 16, max_misses: int = 200000,
+                       dedup: str = "set") -> Optional[Tuple[int, list]]:
+    """
+    随机偏移抽样：反复在文件里随机取一个字节偏移，回退到所在行的行首读出整行，
+    交给 process_line，直到攒够 sample_size 个候选。耗时只和抽到的行数有关，与文件大小无关。
+
+    长行被随机偏移命中的概率和行长成正比，这里按 ref_len / 行长 的概率接受命中的行来抵消，
+    使每一行被选中的概率相同。ref_len 取 16 字节：能通过 MIN_TOKENS = 8 过滤的行
+    （至少 8 个词 + 7 个空格 + 编号 + 两个 Tab）都比它长，所以对候选是严格无偏的。
+    同一行只会被处理一次（不放回）；连续 max_misses 次没有新候选就认为语料已经抽干，提前结束。
+    """
+    with open(input_tsv, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        first = f.readline()
+        if not first:
+            return None
+        # 处理表头：第一列以 "id" 开头就跳过
+        data_start = len(first) if first.lower().startswith(b"id") else 0
+        if data_start >= size:
+            return 0, []
+
+        rng = random.Random(seed)
+        candidates: list = []
+        seen = new_seen(dedup)
+        visited: set = set()
+        misses = 0
+        while len(candidates) < sample_size and misses < max_misses:
+            misses += 1
+            start = _line_start(f, rng.randrange(data_start, size), data_start)
+            if start in visited:
+                continue
+            f.seek(start)
+            raw = f.readline()
+            if rng.random() * len(raw) >= ref_len:
+                continue
+            visited.add(start)
+
+            line = raw.decode("utf-8").rstrip("\n")
+            row = next(csv.reader([line], delimiter="\t"), [])
+            before = len(candidates)
+            process_line(row, candidates, seen)
+            if len(candidates) > before:
+                misses = 0
+
+    if len(candidates) < sample_size:
+        print(f"[WARN] {input_tsv}：连续 {max_misses} 次没有抽到新候选，只得到 {len(candidates)} 句")
+    return len(candidates), candidates
+
+
+def draw_indexed_sample(input_tsv: str, process_line: ProcessLine, sample_size: int,
+                        seed: int = 42, max_misses: int = 200000,
+                        dedup: str = "set") -> Optional[Tuple[int, list]]:
+    """
+    按行号随机抽样：借助行偏移索引（<input_tsv>.idx，缺失或过期时先扫一遍建好）
+    直接均匀抽行号、O(1) 取行，不需要 offset 模式的拒绝采样。其余规则和 draw_offset_sample 相同。
+    """
+    with LineIndex.open(input_tsv) as idx:
+        n_lines = len(idx)
+        if n_lines == 0:
+            return None
+        data_start = 1 if idx.line_bytes(0).lower().startswith(b"id") else 0
+        if data_start >= n_lines:
+            return 0, []
+
+        rng = random.Random(seed)
+        candidates: list = []
+        seen = new_seen(dedup)
+        visited: set = set()
+        misses = 0
+        while len(candidates) < sample_size and misses < max_misses and len(visited) < n_lines - data_start:
+            misses += 1
+            n = rng.randrange(data_start, n_lines)
+            if n in visited:
+                continue
+            visited.add(n)
+
+            before = len(candidates)
+            process_line(idx.row(n), candidates, seen)
+            if len(candidates) > before:
+                misses = 0
+
+    if len(candidates) < sample_size and len(visited) < n_lines - data_start:
+        print(f"[WARN] {input_tsv}：连续 {max_misses} 次没有抽到新候选，只得到 {len(candidates)} 句")
+    return len(candidates), candidates
+
+
+def write_sample(output_tsv: str, header: Sequence[str], sampled: Iterable[tuple]):
+    """写出抽样结果：重新从 1 编号，候选元组第一个元素（原始 id）不输出。"""
+    with open(output_tsv, "w", encoding="utf-8", newline="\n") as fout:
+        writer = csv.writer(fout, delimiter="\t")
+        writer.writerow(header)
+        for new_id, cand in enumerate(sampled, start=1):
+            writer.writerow([new_id, *cand[1:]])
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+"""
+查表式的文字（script）分类：各抽样脚本的文字比例过滤（原来的 bn_char_ratio / fa_char_ratio /
+urdu_ratio / id_char_ratio / latin_ratio / hu_specific_ratio）和合并脚本里的 digit_ratio，
+原来都是逐字符建两个列表再比较码位。
+
+这里把“字符 -> 类别码”预先做成 str.translate 的映射表：
+  - 不参与统计的字符（默认是非字母）映射成 None，translate 时直接删掉；
+  - 参与统计的字符映射成一个单字符类别码（第一个命中的类别，都不命中就是 OTHER）。
+一句话 translate 一次（C 层循环），剩下的字符串长度就是分母，再对每个类别 count 一次就是分子。
+映射表预先填好常用范围，没见过的字符第一次出现时补进表里，之后都走 C 层查表。
+
+判断规则和原来的函数逐字符一致（str.isalpha / str.isdigit + 码位范围），结果完全相同。
+"""
+
+import re
+import string
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+
+# 类别的写法：码位范围列表 [(lo, hi), ...]、字符集合（str / set），或 ch -> bool 的函数
+ClassSpec = Union[Iterable[Tuple[int, int]], str, set, frozenset, Callable[[str], bool]]
+
+OTHER = "~"
+
+# 常用的文字范围（闭区间）
+BENGALI = [(0x0980, 0x09FF)]
+ARABIC = [(0x0600, 0x06FF)]
+URDU = [
+    (0x0600, 0x06FF),  # 基本阿拉伯文块
+    (0x0750, 0x077F),  # 阿拉伯补充
+    (0xFB50, 0xFDFF),  # 阿拉伯呈现形式-A
+    (0xFE70, 0xFEFF),  # 阿拉伯呈现形式-B
+]
+BASIC_LATIN = [(0x41, 0x5A), (0x61, 0x7A)]
+
+
+def _as_predicate(spec: ClassSpec) -> Callable[[str], bool]:
+    if callable(spec):
+        return spec
+    if isinstance(spec, (str, set, frozenset)):
+        chars = frozenset(spec)
+        return chars.__contains__
+    ranges = tuple(spec)
+    return lambda ch: any(lo <= ord(ch) <= hi for lo, hi in ranges)
+
+
+def _char_class(spec: ClassSpec) -> Optional[str]:
+    """把类别写成正则字符类的内容；函数形式的类别没法写成正则，返回 None。"""
+    if callable(spec):
+        return None
+    if isinstance(spec, (str, set, frozenset)):
+        return "".join(re.escape(ch) for ch in sorted(spec))
+    return "".join(f"{re.escape(chr(lo))}-{re.escape(chr(hi))}" for lo, hi in spec)
+
+
+def _is_alnum(ch: str) -> bool:
+    return ch.isdigit() or ch.isalpha()
+
+
+class ScriptTable:
+    """
+    str.translate 用的 字符 -> 类别码 映射表。
+
+        BN_TABLE = ScriptTable({"bn": BENGALI})
+        BN_TABLE.ratio(text, "bn")    # == 孟加拉字母数 / 字母总数，没有字母时为 0.0
+        BN_TABLE.counts(text)         # -> (字母总数, {"bn": n})
+
+    keep 决定哪些字符计入分母（默认 str.isalpha）；classes 按顺序匹配，第一个命中的类别生效。
+    预先填好 U+0000 ~ U+024F 和各类别自己的范围；其它字符第一次出现时会原样留在
+    translate 的结果里，这时把它们补进表再算一次。
+    BMP 内的字符走按码位下标的 list（translate 查 list 比查 dict 快得多），
+    只有含 BMP 以外字符（emoji 等）且第一次见到的句子才退回到 dict。
+    """
+
+    def __init__(self, classes: Dict[str, ClassSpec], keep: Callable[[str], bool] = str.isalpha):
+        if len(classes) > 26:
+            raise ValueError("ScriptTable 最多支持 26 个类别")
+        self.keep = keep
+        self.codes = {name: chr(ord("a") + i) for i, name in enumerate(classes)}
+        self._all_codes = (OTHER, *self.codes.values())
+        self._tests = [(self.codes[name], _as_predicate(spec)) for name, spec in classes.items()]
+
+        self._map: Dict[int, Optional[str]] = {}
+        self._bmp: list = list(range(0x10000))  # 没学过的字符映射成自己，即原样保留
+        self._learn(map(chr, range(0x250)))
+        for spec in classes.values():
+            if isinstance(spec, (str, set, frozenset)):
+                self._learn(spec)
+            elif not callable(spec):
+                for lo, hi in spec:
+                    self._learn(map(chr, range(lo, hi + 1)))
+
+        # at_least(..., 1) 用的预筛正则：[^\W\d_] 覆盖所有字母（外加少量非字母的数字类字符，命中后再核对），
+        # _outside 是“类外的字母”，_inside 是“类内的字符”；_ascii_in 表示 ASCII 字母是否全在类内
+        self._outside: Dict[str, "re.Pattern[str]"] = {}
+        self._inside: Dict[str, "re.Pattern[str]"] = {}
+        self._ascii_in: Dict[str, bool] = {}
+        if keep is str.isalpha:
+            for name, spec in classes.items():
+                body = _char_class(spec)
+                if body is None:
+                    continue
+                self._outside[name] = re.compile(f"[^\\W\\d_{body}]")
+                self._inside[name] = re.compile(f"[{body}]")
+                self._ascii_in[name] = all(self._map[ord(ch)] == self.codes[name] for ch in string.ascii_letters)
+
+    def _learn(self, chars: Iterable[str]):
+        for ch in chars:
+            code = None
+            if self.keep(ch):
+                code = OTHER
+                for c, test in self._tests:
+                    if test(ch):
+                        code = c
+                        break
+            cp = ord(ch)
+            self._map[cp] = code
+            if cp < 0x10000:
+                self._bmp[cp] = code
+
+    def _code_of(self, ch: str) -> Optional[str]:
+        cp = ord(ch)
+        if cp not in self._map:
+            self._learn(ch)
+        return self._map[cp]
+
+    def classify(self, text: str) -> str:
+        """每个计入的字符对应一个类别码，其余字符删掉。"""
+        codes = text.translate(self._bmp)
+        if sum(map(codes.count, self._all_codes)) != len(codes):
+            # 有没见过的字符（原样留在结果里，且都不是 ASCII，不会和类别码混淆）
+            self._learn(set(codes).difference(self._all_codes))
+            codes = text.translate(self._map)
+        return codes
+
+    def counts(self, text: str) -> Tuple[int, Dict[str, int]]:
+        codes = self.classify(text)
+        return len(codes), {name: codes.count(c) for name, c in self.codes.items()}
+
+    def ratio(self, text: str, name: str) -> float:
+        codes = self.classify(text)
+        if not codes:
+            return 0.0
+        return codes.count(self.codes[name]) / len(codes)
+
+    def all_in(self, text: str, name: str) -> bool:
+        """
+        等价于 ratio(text, name) >= 1：至少有一个字母，且所有字母都属于 name 类。
+        碰到第一个类外字母就返回 False，不再数剩下的字符；
+        ASCII 字母全在类内（id / ms 的拉丁字母）且整句是 ASCII 时，直接跳过类外检查。
+        """
+        outside = self._outside.get(name)
+        if outside is None:
+            return self.ratio(text, name) >= 1
+        code = self.codes[name]
+        if not (self._ascii_in[name] and text.isascii()):
+            for m in outside.finditer(text):
+                c = self._code_of(m.group())
+                if c is not None and c != code:
+                    return False
+        for m in self._inside[name].finditer(text):
+            if self._code_of(m.group()) == code:
+                return True
+        return False
+
+    def at_least(self, text: str, name: str, threshold: float) -> bool:
+        """等价于 ratio(text, name) >= threshold；threshold 为 1 时走 all_in 提前退出。"""
+        if threshold > 1:
+            return False
+        if threshold == 1:
+            return self.all_in(text, name)
+        return self.ratio(text, name) >= threshold
+
+
+# digit_ratio 用：数字 / (字母 + 数字)
+DIGIT_TABLE = ScriptTable({"digit": str.isdigit}, keep=_is_alnum)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Build X-Bench: run every raw merge, sampler and language merge as a dependency graph.
+
+Each corpus is a chain (raw merge script -> sampler) that does not depend on
+any other corpus; <lang>_merge.py runs once all of the language's samplers
+have finished. Up to --jobs scripts run at the same time, so a full rebuild
+takes about as long as the slowest chain instead of the sum of all steps.
+When a language's scripts set BLOOM_FILE, each of its samplers waits for all
+of that language's raw merges, so the cross-corpus filter is complete before
+any sampler reads it.
+
+Scripts run inside a pool of --jobs worker processes: each worker loads a
+script and calls its entry point (merge_parallel, sample_from_merged /
+sample_hu_only, main / merge_and_clean), so imports, compiled regexes and
+merge profiles are shared by all the scripts a worker runs. With --isolate
+every script runs as its own `python scripts/<lang>/<script>.py` instead.
+
+Every script's output goes to <log-dir>/<lang>/<script>.log. The build stops
+at the first failing script: nothing new is started (with --isolate, running
+scripts are also terminated), and the end of the failing script's log is printed.
+
+Builds are incremental. After each script succeeds, the fingerprints of its
+code (the script, plus <lang>_merge.py for samplers, plus scripts/xbench),
+its parameters, its input files and its output files are saved to
+<log-dir>/build_state.json. On the next run a script whose fingerprints all
+match is skipped; otherwise the first thing that changed is printed as the
+reason for rerunning it. Files are compared by size and mtime; with --hash, a
+file whose mtime changed but whose content did not still counts as unchanged.
+
+At the end of every build, a per-script performance report is written to
+<log-dir>/build_perf.json, and the same data as a table to build_perf.txt.
+The table is also printed. It covers wall time (and the change against the
+previous report), user / sys CPU, peak RSS, input / output MB and rows in /
+out, sorted by wall time, with per-language totals. --trace-python also
+records each script's peak Python heap via tracemalloc, which slows the
+scripts down. It only applies without --isolate.
+
+Raw merges and samplers save their progress every CHECKPOINT_SECONDS to a
+<output>.ckpt file next to their output: the input read positions, the lines
+written so far and, for samplers, the candidates, the reservoir's random
+state, the dedup set and the rule counters. If a build dies part way (OOM, a
+preempted worker), rerun it with --resume: each failed script continues from
+its checkpoint, and the output is identical to an uninterrupted run. A
+checkpoint is ignored when the script, scripts/xbench, the inputs or the
+sampling parameters changed since it was written.
+
+Examples:
+  python tools/build.py --root /data/xbench --jobs 8
+  python tools/build.py --root /data/xbench --lang bn ur --jobs 4
+  python tools/build.py --root /data/xbench --lang bn --force
+  python tools/build.py --root /data/xbench --hash
+  python tools/build.py --root /data/xbench --isolate
+  python tools/build.py --root /data/xbench --resume
+  python tools/build.py --lang hu --dry-run
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from xbench.build import LANGS, PLACEHOLDER, build_graph, run_graph
+from xbench.build_perf import write_perf_report
+from xbench.build_state import BuildState
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lang", nargs="+", choices=LANGS, default=LANGS, help="languages to build (default: all)")
+    ap.add_argument("--root", default=None,
+                    help=f"replace {PLACEHOLDER} in the scripts' paths with this directory (the scripts on disk are not changed)")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="run up to N scripts at once (default: CPU count)")
+    ap.add_argument("--log-dir", default="build_logs", help="per-script logs go to <log-dir>/<lang>/<script>.log")
+    ap.add_argument("--state", default=None, help="build record for incremental builds (default: <log-dir>/build_state.json)")
+    ap.add_argument("--force", action="store_true", help="rerun every selected script, even if nothing changed")
+    ap.add_argument("--hash", action="store_true", help="also compare input / output files by content hash")
+    ap.add_argument("--isolate", action="store_true", help="run every script in its own python process")
+    ap.add_argument("--perf-report", default=None, help="performance report (default: <log-dir>/build_perf.json)")
+    ap.add_argument("--resume", action="store_true",
+                    help="continue interrupted raw merges / samplers from their <output>.ckpt checkpoints")
+    ap.add_argument("--trace-python", action="store_true", help="also record each script's peak Python heap (slower)")
+    ap.add_argument("--dry-run", action="store_true", help="print the graph and exit")
+    args = ap.parse_args()
+
+    nodes = build_graph(args.lang)
+    if args.dry_run:
+        for node in nodes.values():
+            print(f"{node.name}" + (f"  <- {', '.join(node.deps)}" if node.deps else ""))
+        return
+
+    t0 = time.time()
+    state = BuildState(args.state or os.path.join(args.log_dir, "build_state.json"), args.hash)
+    results = run_graph(nodes, max(1, args.jobs), args.log_dir, args.root, state, args.force, args.isolate,
+                        args.trace_python, args.resume)
+    wall_s = time.time() - t0
+    stages = [result.perf for result in results.values() if result.perf is not None]
+    if stages:
+        perf_path = args.perf_report or os.path.join(args.log_dir, "build_perf.json")
+        print(write_perf_report(perf_path, stages, wall_s, jobs=args.jobs, isolate=args.isolate), end="")
+    ok = sum(result.ok for result in results.values())
+    skipped = sum(result.status == "skipped" for result in results.values())
+    print(f"{ok}/{len(nodes)} scripts succeeded, {skipped} of them unchanged ({wall_s:.2f}s), "
+          f"logs in {args.log_dir}")
+    if ok < len(nodes):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
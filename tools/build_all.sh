@@ -3,13 +3,9 @@ set -euo pipefail
 
 # Build X-Bench for all languages (bn fa hu id ms ur).
 # Usage:
-#   bash tools/build_all.sh
+#   bash tools/build_all.sh [--jobs N] [--root DIR] ...
+#
+# Runs tools/build.py, which builds the corpus chains of all languages in parallel.
+# Extra arguments are passed through (see: python tools/build.py --help).
 
-for lang in bn fa hu id ms ur; do
-  echo "===================="
-  echo "Building ${lang}"
-  echo "===================="
-  bash tools/build_one_lang.sh "${lang}"
-done
-
-echo "All done."
+exec python "$(dirname "$0")/build.py" "$@"
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Build line-offset indexes (<file>.idx) for merged TSVs or Moses files.
+
+The index lets the samplers (SAMPLE_MODE = "index"), the hu English rejoin
+and ad-hoc lookups fetch line N directly via mmap. Indexes are rebuilt
+automatically when stale; this tool just builds them ahead of time.
+
+Examples:
+  python tools/build_line_index.py --input OpenSubtitles.en-hu.merged.tsv
+  python tools/build_line_index.py --input TED2020.en-hu.en TED2020.en-hu.hu --show 10
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from xbench.line_index import LineIndex, build_line_index, is_index_fresh
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", required=True, nargs="+", help="merged TSV or Moses file(s)")
+    ap.add_argument("--force", action="store_true", help="rebuild even if the index is fresh")
+    ap.add_argument("--show", type=int, default=None, help="print line N of each file after indexing")
+    args = ap.parse_args()
+
+    for path in args.input:
+        if args.force or not is_index_fresh(path):
+            build_line_index(path)
+            state = "built"
+        else:
+            state = "fresh"
+        with LineIndex(path) as idx:
+            print(f"[OK] {path}.idx ({state}, {len(idx)} lines)")
+            if args.show is not None:
+                print(idx.line(args.show))
+
+
+if __name__ == "__main__":
+    main()
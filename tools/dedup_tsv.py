@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Exact dedup of a merged TSV that does not fit in memory (external sort).
+
+Rows are keyed, sorted in chunks of at most --memory-mb, spilled to temporary
+run files and k-way merged, at most 64 runs at a time (more runs are merged
+in extra passes). For each key the row with the smallest original
+id is kept; the output keeps the header and the original row order.
+
+Keys:
+  xx     xx column, whitespace-folded and lowercased (default)
+  pair   en + xx, whitespace-folded and lowercased (like seen_pairs)
+  exact  xx column, stripped only (like the samplers' seen_* sets)
+
+Examples:
+  python tools/dedup_tsv.py --input OpenSubtitles.en-hu.merged.tsv --output OpenSubtitles.en-hu.dedup.tsv
+  python tools/dedup_tsv.py --input big.tsv --output big.dedup.tsv --memory-mb 256 --tmp-dir /mnt/scratch
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from xbench.extsort import exact_xx_key, external_dedup, pair_key, xx_key
+
+KEYS = {"xx": xx_key, "pair": pair_key, "exact": exact_xx_key}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", required=True, help="merged TSV (id, en, xx)")
+    ap.add_argument("--output", required=True, help="deduplicated TSV")
+    ap.add_argument("--key", choices=sorted(KEYS), default="xx", help="dedup key (default: xx)")
+    ap.add_argument("--memory-mb", type=float, default=512, help="memory ceiling for in-memory chunks (default: 512)")
+    ap.add_argument("--tmp-dir", default=None, help="directory for spill files (default: system temp)")
+    args = ap.parse_args()
+
+    if os.path.abspath(args.input) == os.path.abspath(args.output):
+        ap.error("--output must differ from --input")
+
+    stats = external_dedup(args.input, args.output, KEYS[args.key], args.memory_mb, args.tmp_dir)
+    print(f"[OK] rows={stats['rows']} kept={stats['kept']} duplicates={stats['duplicates']} "
+          f"runs={stats['runs']} spill_bytes={stats['spill_bytes']}")
+
+
+if __name__ == "__main__":
+    main()
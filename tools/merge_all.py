@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Run the per-language merge step (scripts/<lang>/<lang>_merge.py) for several languages in one process.
+
+Each script keeps its own paths and thresholds; the cleaning rules come from
+scripts/xbench/profiles.py and are compiled once per language, so running all
+six languages back to back does not re-import or recompile anything.
+
+Examples:
+  python tools/merge_all.py
+  python tools/merge_all.py --root /data/xbench --lang bn ur
+  python tools/merge_all.py --root /data/xbench --jobs 8
+  python tools/merge_all.py --root /data/xbench --clean-cache /data/xbench/clean_cache.sqlite
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+LANGS = ["bn", "fa", "hu", "id", "ms", "ur"]
+PLACEHOLDER = "<PATH_TO_XBENCH_ROOT>"
+PATH_CONSTANTS = ("BASE_DIR", "INPUT_FILES", "OUTPUT_FILE", "OUTPUT_TSV")
+
+
+def _with_root(value, root):
+    if isinstance(value, list):
+        return [_with_root(v, root) for v in value]
+    if isinstance(value, str) and PLACEHOLDER in value:
+        value = value.replace(PLACEHOLDER, root)
+        if os.sep == "/":
+            value = value.replace("\\", "/")
+    return value
+
+
+def load_merge_script(lang, root=None):
+    path = os.path.join(SCRIPTS_DIR, lang, f"{lang}_merge.py")
+    spec = importlib.util.spec_from_file_location(f"{lang}_merge", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if root:
+        for name in PATH_CONSTANTS:
+            if hasattr(module, name):
+                setattr(module, name, _with_root(getattr(module, name), root))
+    return module
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lang", nargs="+", choices=LANGS, default=LANGS, help="languages to merge (default: all)")
+    ap.add_argument("--root", default=None, help=f"replace {PLACEHOLDER} in the scripts' paths with this directory")
+    ap.add_argument("--jobs", type=int, default=None, help="clean/filter in N worker processes (overrides each script's JOBS)")
+    ap.add_argument("--clean-cache", default=None, help="SQLite cleaning cache shared by all languages (overrides CLEAN_CACHE)")
+    args = ap.parse_args()
+
+    for lang in args.lang:
+        print(f"==================== {lang}")
+        t0 = time.time()
+        module = load_merge_script(lang, args.root)
+        if args.jobs is not None:
+            module.JOBS = args.jobs
+        if args.clean_cache is not None:
+            module.CLEAN_CACHE = args.clean_cache
+        entry = getattr(module, "main", None) or module.merge_and_clean
+        entry()
+        print(f"[OK] {lang} ({time.time() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
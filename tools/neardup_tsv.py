@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Find (and optionally drop) near-duplicate rows in a merged TSV with MinHash + LSH.
+
+Each key is cut into character shingles and hashed into a one-permutation
+MinHash signature. Signatures are split into bands, and rows that share a band
+are compared. A row whose estimated Jaccard similarity to an earlier kept row
+is at least --threshold joins that row's cluster. Rows are processed in file
+order, so each cluster is represented by its first row. Cost is linear in the
+number of rows, so this also works on full *.merged.tsv candidate pools.
+
+Keys:
+  xx     xx column, whitespace-folded and lowercased (default)
+  pair   en + xx, whitespace-folded and lowercased
+
+Examples:
+  python tools/neardup_tsv.py --input bn_all_merged_clean.tsv --clusters bn.neardup.tsv
+  python tools/neardup_tsv.py --input OpenSubtitles.en-hu.merged.tsv --output OpenSubtitles.en-hu.neardedup.tsv --jobs 8
+  python tools/neardup_tsv.py --input fa_all_merged_clean.tsv --key pair --threshold 0.7 --clusters fa.neardup.tsv
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from xbench.extsort import pair_key, xx_key
+from xbench.neardup import NUM_PERM, SHINGLE, THRESHOLD, near_dedup
+
+KEYS = {"xx": xx_key, "pair": pair_key}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", required=True, help="merged TSV (id, en, xx)")
+    ap.add_argument("--output", default=None, help="write the TSV without near duplicates here (default: report only)")
+    ap.add_argument("--clusters", default=None, help="write one line per near duplicate: rep_id, id, similarity, text")
+    ap.add_argument("--key", choices=sorted(KEYS), default="xx", help="text to compare (default: xx)")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help=f"Jaccard similarity threshold (default: {THRESHOLD})")
+    ap.add_argument("--num-perm", type=int, default=NUM_PERM, help=f"signature length, a power of two (default: {NUM_PERM})")
+    ap.add_argument("--shingle", type=int, default=SHINGLE, help=f"shingle length in characters (default: {SHINGLE})")
+    ap.add_argument("--bands", type=int, default=None, help="LSH bands (default: chosen from --threshold)")
+    ap.add_argument("--jobs", type=int, default=1, help="compute signatures in N worker processes")
+    args = ap.parse_args()
+
+    for path in (args.output, args.clusters):
+        if path and os.path.abspath(path) == os.path.abspath(args.input):
+            ap.error("--output / --clusters must differ from --input")
+
+    stats = near_dedup(args.input, args.output, KEYS[args.key], args.threshold, args.num_perm, args.shingle,
+                       args.bands, args.clusters, args.jobs)
+    print(f"[OK] rows={stats['rows']} kept={stats['kept']} near_duplicates={stats['near_duplicates']} "
+          f"clusters={stats['clusters']}")
+
+
+if __name__ == "__main__":
+    main()
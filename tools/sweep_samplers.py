@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Count how many candidates each sampler would collect under a grid of thresholds.
+
+Each sampler reads its input once: the first MAX_LINES rows of INPUT_TSV, or of
+its Moses files when FROM_MOSES is set. The xx side is laid out as a
+FeatureTable with word count, letter count and per-script letter counts. The
+checks that MIN_TOKENS and the script ratio do not affect are run once per row
+and stored as extra columns:
+  - MERGE_FILTER (the <lang>_merge.py thresholds);
+  - hu's foreign-word check;
+  - the BLOOM_FILE cross-corpus filter.
+Every (MIN_TOKENS, script ratio) combination is then a few column masks plus
+the sampler's dedup, so the whole grid costs about one sampler run.
+
+Output is a TSV with one row per (language, sampler, setting):
+  rows        data rows read
+  passed      rows that pass every filter except dedup
+  candidates  rows left after dedup; in prefix mode this equals the candidate
+              count the sampler prints
+
+The script ratio is MIN_<XX>_RATIO in the script (MIN_HU_SPEC_RATIO for hu).
+The ms and ur samplers hard-code 1 (every letter in script); the grid replaces
+that value too. Settings left out keep each script's own value.
+
+Examples:
+  python tools/sweep_samplers.py --root /data/xbench --lang bn --min-tokens 6 8 10 --min-ratio 0.8 0.9 1
+  python tools/sweep_samplers.py --root /data/xbench --lang hu --min-ratio 0.01 0.02 0.05 --all-rows
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from contextlib import ExitStack
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from xbench.bloom import CorpusBloom
+from xbench.build import LANGS, PIPELINES, load_script
+from xbench.features import FeatureTable, both, count_true, first_occurrences
+from xbench.merge_engine import SCRIPTS_DIR, merge_filter
+from xbench.opus import iter_moses_rows
+from xbench.sampler import collect_candidates, read_merged_rows
+
+# 语言 -> (ScriptTable 常量, 类别名, 比例下限常量；None 表示脚本里写死的 1)
+SCRIPT_RULES = {
+    "bn": ("BN_TABLE", "bn", "MIN_BN_RATIO"),
+    "fa": ("FA_TABLE", "fa", "MIN_FA_RATIO"),
+    "hu": ("HU_TABLE", "hu", "MIN_HU_SPEC_RATIO"),
+    "id": ("ID_TABLE", "latin", "MIN_ID_RATIO"),
+    "ms": ("LATIN_TABLE", "latin", None),
+    "ur": ("UR_TABLE", "ur", None),
+}
+
+
+def sampler_rows(lang, module, all_rows=False):
+    """The rows the sampler would hand to process_line in prefix mode (all rows with all_rows)."""
+    if getattr(module, "FROM_MOSES", False):
+        rows = iter_moses_rows(module.EN_FILE, getattr(module, f"{lang.upper()}_FILE"), lang, module.ZIP_FILE)
+    else:
+        rows = read_merged_rows(module.INPUT_TSV)
+    max_lines = None if all_rows else module.MAX_LINES
+    return collect_candidates(rows, lambda row, out, _: out.append(row), max_lines) or []
+
+
+def sampler_table(lang, module, rows):
+    """FeatureTable of the rows that pass the sampler's "columns" check, with the fixed checks as columns."""
+    table_name, _, _ = SCRIPT_RULES[lang]
+    rows = [row for row in rows if len(row) >= 3]
+    xx = [row[2].strip() for row in rows]
+    table = FeatureTable.from_texts(xx, getattr(module, table_name))
+    if hasattr(module, "has_foreign_like_word"):
+        table.add_column("foreign_ok", [not module.has_foreign_like_word(text) for text in xx])
+    if getattr(module, "MERGE_FILTER", False):
+        profile = merge_filter(lang)
+        table.add_column("merge_ok", profile.mask(profile.table([(row[1], text) for row, text in zip(rows, xx)])))
+    bloom_file = getattr(module, "BLOOM_FILE", None)
+    if bloom_file:
+        if os.path.isfile(bloom_file):
+            bloom = CorpusBloom.open(bloom_file)
+            corpus = os.path.basename(module.INPUT_TSV)
+            table.add_column("cross_ok", [not bloom.seen_earlier(row[2], corpus) for row in rows])
+        else:
+            print(f"[WARN] missing {bloom_file}, cross-corpus filter skipped", file=sys.stderr)
+    return table
+
+
+def sweep_sampler(lang, module, grid, all_rows=False):
+    """Yield (setting, rows, passed, candidates) for every grid point."""
+    _, script, ratio_constant = SCRIPT_RULES[lang]
+    t0 = time.time()
+    rows = sampler_rows(lang, module, all_rows)
+    table = sampler_table(lang, module, rows)
+    print(f"[INFO] {os.path.basename(module.__file__)}: {len(rows)} rows featurized ({time.time() - t0:.2f}s)",
+          file=sys.stderr)
+
+    fixed = table.all_rows()
+    for name in ("foreign_ok", "merge_ok", "cross_ok"):
+        if name in table.columns:
+            fixed = both(fixed, table.columns[name])
+    # 抽样脚本按 strip 后的 xx 去重，编成整数
+    key_ids = {}
+    ids = [key_ids.setdefault(text, len(key_ids)) for text in table.texts["xx"]]
+
+    defaults = {"min_tokens": module.MIN_TOKENS,
+                "min_ratio": getattr(module, ratio_constant) if ratio_constant else 1}
+    axes = [grid[name] if grid[name] is not None else [defaults[name]] for name in defaults]
+    for min_tokens, min_ratio in itertools.product(*axes):
+        mask = both(fixed, both(table.token_mask(min_tokens), table.script_mask(script, min_ratio)))
+        candidates = count_true(first_occurrences(ids, mask))
+        yield {"min_tokens": min_tokens, "min_ratio": min_ratio}, len(rows), count_true(mask), candidates
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lang", nargs="+", choices=LANGS, default=LANGS, help="languages to sweep (default: all)")
+    ap.add_argument("--root", default=None, help="replace <PATH_TO_XBENCH_ROOT> in the scripts' paths with this directory")
+    ap.add_argument("--min-tokens", nargs="+", type=int, default=None, help="MIN_TOKENS values")
+    ap.add_argument("--min-ratio", nargs="+", type=float, default=None, help="script ratio values")
+    ap.add_argument("--all-rows", action="store_true", help="read every row instead of the first MAX_LINES")
+    ap.add_argument("--output", default=None, help="write the TSV here instead of stdout")
+    args = ap.parse_args()
+
+    grid = {"min_tokens": args.min_tokens, "min_ratio": args.min_ratio}
+    with ExitStack() as stack:
+        out = stack.enter_context(open(args.output, "w", encoding="utf-8", newline="")) if args.output else sys.stdout
+        writer = csv.writer(out, delimiter="\t", lineterminator="\n")
+        writer.writerow(["lang", "sampler", "min_tokens", "min_ratio", "rows", "passed", "candidates"])
+        for lang in args.lang:
+            for _, stem in PIPELINES[lang]:
+                module = load_script(os.path.join(SCRIPTS_DIR, lang, stem + ".py"), args.root)
+                for setting, rows, passed, candidates in sweep_sampler(lang, module, grid, args.all_rows):
+                    writer.writerow([lang, stem, *setting.values(), rows, passed, candidates])
+            out.flush()
+
+
+if __name__ == "__main__":
+    main()
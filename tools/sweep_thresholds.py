@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Count how many pairs the merge step would keep under a grid of thresholds.
+
+Each language's input files (the ones its <lang>_merge.py reads) are parsed,
+cleaned and featurized once. Every (MIN_WORDS, MAX_WORDS, MAX_DIGIT_RATIO)
+combination is then evaluated as column masks over the shared feature table,
+including the merge step's cross-corpus dedup. The run costs about one merge,
+no matter how large the grid is.
+
+Output is a TSV with one row per (language, corpus, setting), plus an ALL row
+per (language, setting):
+  passed  pairs that pass the length / digit filters
+  kept    pairs left after dedup; the ALL row equals what <lang>_merge.py would write
+
+Thresholds not given on the command line keep each script's own value.
+Use "none" to drop a MAX_WORDS / MAX_DIGIT_RATIO limit.
+
+Examples:
+  python tools/sweep_thresholds.py --root /data/xbench --lang bn --min-words 5 6 8 --max-words 40 45 60
+  python tools/sweep_thresholds.py --root /data/xbench --max-digit-ratio 0.2 0.3 none --output sweep.tsv
+  python tools/sweep_thresholds.py --root /data/xbench --clean-cache /data/xbench/clean_cache.sqlite
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+from merge_all import LANGS, load_merge_script
+
+from xbench.clean_cache import CleanCache
+from xbench.features import concat, count_true, first_occurrences
+from xbench.merge_engine import SCRIPT_CONSTANTS, feature_table, get_profile, resolve_input, script_thresholds
+
+
+def _optional(cast):
+    def parse(value):
+        return None if value.lower() == "none" else cast(value)
+    return parse
+
+
+def script_inputs(module):
+    if hasattr(module, "INPUT_FILES"):
+        return list(module.INPUT_FILES)
+    return [os.path.join(module.BASE_DIR, name) for name in module.FILES]
+
+
+def sweep_language(lang, module, grid, cache=None, pool=None, jobs=1):
+    """Yield (corpus, setting, passed, kept) for every corpus and grid point, then the ALL rows."""
+    profile = get_profile(lang)
+    defaults = {name: getattr(profile, name) for name in SCRIPT_CONSTANTS}
+    defaults.update(script_thresholds(module))
+    corpora, tables = [], []
+    for path in script_inputs(module):
+        found = resolve_input(path)
+        if found is None:
+            print(f"[WARN] missing input, skipped: {path}", file=sys.stderr)
+            continue
+        t0 = time.time()
+        tables.append(feature_table(lang, found, cache, pool, jobs))
+        corpora.append(os.path.basename(found))
+        print(f"[INFO] {lang} {corpora[-1]}: {len(tables[-1])} rows featurized ({time.time() - t0:.2f}s)",
+              file=sys.stderr)
+
+    # 合并阶段的去重键 (en.lower(), xx.lower()) 编成整数，按文件顺序接成一列
+    key_ids = {}
+    ids = concat([
+        [key_ids.setdefault((en.lower(), xx.lower()), len(key_ids))
+         for en, xx in zip(t.texts["en"], t.texts["xx"])]
+        for t in tables
+    ])
+    bounds = list(itertools.accumulate((len(t) for t in tables), initial=0))
+
+    names = list(SCRIPT_CONSTANTS)
+    axes = [grid[name] if grid[name] is not None else [defaults[name]] for name in names]
+    for values in itertools.product(*axes):
+        setting = dict(zip(names, values))
+        current = profile.with_thresholds(**setting)
+        masks = [current.mask(t) for t in tables]
+        passed = [count_true(m) for m in masks]
+        if current.dedup:
+            first = first_occurrences(ids, concat(masks))
+            kept = [count_true(first[lo:hi]) for lo, hi in zip(bounds, bounds[1:])]
+        else:
+            kept = passed
+        for corpus, p, k in zip(corpora, passed, kept):
+            yield corpus, setting, p, k
+        yield "ALL", setting, sum(passed), sum(kept)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lang", nargs="+", choices=LANGS, default=LANGS, help="languages to sweep (default: all)")
+    ap.add_argument("--root", default=None, help="replace <PATH_TO_XBENCH_ROOT> in the scripts' paths with this directory")
+    ap.add_argument("--min-words", nargs="+", type=int, default=None, help="MIN_WORDS values")
+    ap.add_argument("--max-words", nargs="+", type=_optional(int), default=None, help="MAX_WORDS values (or none)")
+    ap.add_argument("--max-digit-ratio", nargs="+", type=_optional(float), default=None,
+                    help="MAX_DIGIT_RATIO values (or none)")
+    ap.add_argument("--jobs", type=int, default=1, help="clean in N worker processes")
+    ap.add_argument("--clean-cache", default=None, help="SQLite cleaning cache (see tools/merge_all.py)")
+    ap.add_argument("--output", default=None, help="write the TSV here instead of stdout")
+    args = ap.parse_args()
+
+    grid = {"min_words": args.min_words, "max_words": args.max_words, "max_digit_ratio": args.max_digit_ratio}
+    with ExitStack() as stack:
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=args.jobs)) if args.jobs > 1 else None
+        cache = stack.enter_context(CleanCache(args.clean_cache)) if args.clean_cache else None
+        out = stack.enter_context(open(args.output, "w", encoding="utf-8", newline="")) if args.output else sys.stdout
+        writer = csv.writer(out, delimiter="\t", lineterminator="\n")
+        writer.writerow(["lang", "corpus", *SCRIPT_CONSTANTS, "passed", "kept"])
+        for lang in args.lang:
+            module = load_merge_script(lang, args.root)
+            for corpus, setting, passed, kept in sweep_language(lang, module, grid, cache, pool, args.jobs):
+                writer.writerow([lang, corpus, *("none" if v is None else v for v in setting.values()), passed, kept])
+            out.flush()
+
+
+if __name__ == "__main__":
+    main()